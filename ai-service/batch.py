@@ -0,0 +1,279 @@
+"""
+Ascendra - Offline bulk generation
+Runs NDJSON files of endpoint requests (MoodAnalysisRequest, FlashcardGenerateRequest, ...)
+with bounded concurrency under an LLM rate limit, counted per provider call (fan-out
+chunks and failovers included). Small items of packable kinds are micro-batched into one
+LLM call and then stored like the endpoint stores them; results stream to an NDJSON file
+that doubles as the resume checkpoint.
+
+    cd ai-service
+    python batch.py analyze-mood journals.ndjson -o moods.ndjson --rpm 60 --pack-size 8
+
+Input lines are either a bare request payload or {"id": ..., "request": {...}}; the id
+defaults to the line number. Re-running with the same output file skips items that
+already succeeded.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from moods import MoodStats, describe, features
+
+# Rate limiter of the batch being run; provider calls made on its behalf (in this task or
+# in threads it starts) wait on it
+current_limiter = contextvars.ContextVar("batch_limiter", default=None)
+
+
+@dataclass
+class BatchKind:
+    """How one request model is run in bulk"""
+    request_model: type
+    run_one: Callable[[BaseModel], Awaitable[Any]]  # the regular endpoint, also the fallback
+    pack_prompt: Optional[Callable[[List[BaseModel]], str]] = None
+    unpack: Optional[Callable[[str, List[BaseModel]], List[Any]]] = None
+    # Stores a packed item's result as the endpoint would and returns the endpoint's response;
+    # None sends the item through run_one instead
+    finish: Optional[Callable[[BaseModel, Any], Awaitable[Optional[Dict[str, Any]]]]] = None
+    route: str = "batch"
+    max_pack_chars: int = 6000
+
+
+class RateLimiter:
+    """Token bucket: at most `per_minute` acquisitions per minute, with a small burst.
+    Thread-safe; provider calls acquire it on the worker thread they run on."""
+
+    def __init__(self, per_minute: float, burst: int = 1):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token; returns the seconds to wait before using it"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self):
+        time.sleep(self.reserve())
+
+
+# Packed prompts: several independent items answered as one JSON array, in order
+
+def _parse_array(text: str) -> List[Any]:
+    text = text.strip()
+    if "```" in text:
+        text = text.split("```json")[-1] if "```json" in text else text.split("```")[1]
+        text = text.split("```")[0].strip()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        match = re.search(r'\[[\s\S]*\]', text)
+        if not match:
+            raise
+        return json.loads(match.group())
+
+
+def _unpack_by_index(text: str, items: List[BaseModel], field: str) -> List[Any]:
+    """Map a packed answer back to items; raises ValueError unless every item got its entry"""
+    entries = _parse_array(text)
+    by_index = {e.get("index"): e.get(field) for e in entries if isinstance(e, dict)}
+    if any(by_index.get(i) in (None, "", []) for i in range(len(items))):
+        raise ValueError("Packed answer is missing items")
+    return [by_index[i] for i in range(len(items))]
+
+
+def pack_mood_analyses(items: List[BaseModel], trend: Optional[Callable[[BaseModel], Dict[str, Any]]] = None) -> str:
+    """`trend` gives an item's mood trend features; by default they are computed from its recentMoods"""
+    stats = MoodStats()
+    trend = trend or (lambda item: features(stats.replay(item.recentMoods or [])))
+    entries = "\n\n".join(
+        f"--- ENTRY {i} ---\nJournal Entry: {item.journalEntry}\nMood trend: {describe(trend(item))}"
+        for i, item in enumerate(items)
+    )
+    return f"""Analyze each of these {len(items)} independent journal entries for emotional content and provide supportive insights.
+
+{entries}
+
+For each entry write a warm Markdown analysis with the sections
+### 🎭 Emotions Detected, ### 📊 Overall Sentiment, ### ⚠️ Patterns to Note, ### 💭 Reflection, ### 💡 Suggested Action
+
+Return ONLY a valid JSON array (no markdown around it) with exactly {len(items)} objects, in order:
+[{{"index": 0, "analysis": "markdown text"}}, ...]"""
+
+
+def unpack_mood_analyses(text: str, items: List[BaseModel]) -> List[Any]:
+    return [{"success": True, "analysis": a} for a in _unpack_by_index(text, items, "analysis")]
+
+
+def pack_flashcards(items: List[BaseModel]) -> str:
+    topics = "\n".join(f"{i}. {item.topic} ({item.count} flashcards)" for i, item in enumerate(items))
+    return f"""Generate educational flashcards for each of these {len(items)} topics:
+
+{topics}
+
+Each flashcard should have a clear, specific question and a comprehensive but concise answer,
+cover different aspects of its topic and be suitable for revision.
+
+Return ONLY a valid JSON array (no markdown, no code blocks) with exactly {len(items)} objects, in order:
+[{{"index": 0, "flashcards": [{{"question": "What is...?", "answer": "It is..."}}]}}, ...]"""
+
+
+def unpack_flashcards(text: str, items: List[BaseModel]) -> List[Any]:
+    decks = _unpack_by_index(text, items, "flashcards")
+    return [{"success": True, "flashcards": deck, "topic": item.topic} for deck, item in zip(decks, items)]
+
+
+def _packs(items: List[Tuple[str, BaseModel]], kind: BatchKind, pack_size: int) -> Iterable[List[Tuple[str, BaseModel]]]:
+    pack, size = [], 0
+    for item in items:
+        item_chars = len(item[1].model_dump_json())
+        if pack and (len(pack) >= pack_size or size + item_chars > kind.max_pack_chars):
+            yield pack
+            pack, size = [], 0
+        pack.append(item)
+        size += item_chars
+    if pack:
+        yield pack
+
+
+async def run_batch(kind: BatchKind, items: List[Tuple[str, Dict[str, Any]]],
+                    llm: Callable[[str, str], Awaitable[str]], concurrency: int = 4,
+                    limiter: Optional[RateLimiter] = None, pack_size: int = 8) -> AsyncIterator[Dict[str, Any]]:
+    """Yield {"id", "ok", "result" | "error", "packed"} for every item as it completes"""
+    limiter = limiter or RateLimiter(0)
+    results: asyncio.Queue = asyncio.Queue()
+    parsed: List[Tuple[str, BaseModel]] = []
+    for item_id, payload in items:
+        try:
+            parsed.append((item_id, kind.request_model(**payload)))
+        except ValueError as e:
+            await results.put({"id": item_id, "ok": False, "error": f"Invalid request: {e}"})
+
+    can_pack = kind.pack_prompt is not None and pack_size > 1
+    work: asyncio.Queue = asyncio.Queue()
+    for pack in (_packs(parsed, kind, pack_size) if can_pack else ([p] for p in parsed)):
+        work.put_nowait(pack)
+
+    async def run_single(item_id: str, request: BaseModel):
+        try:
+            result = await kind.run_one(request)
+            await results.put({"id": item_id, "ok": bool(result.get("success", True)), "result": result, "packed": False})
+        except Exception as e:
+            await results.put({"id": item_id, "ok": False, "error": str(e), "packed": False})
+
+    async def worker():
+        current_limiter.set(limiter)  # this task's context only
+        while not work.empty():
+            pack = work.get_nowait()
+            unpacked = [None] * len(pack)
+            if len(pack) > 1:
+                try:
+                    answer = await llm(kind.pack_prompt([r for _, r in pack]), kind.route)
+                    unpacked = kind.unpack(answer, [r for _, r in pack])
+                except Exception:
+                    pass  # fall back to one call per item
+            for (item_id, request), result in zip(pack, unpacked):
+                if result is not None and kind.finish is not None:
+                    try:
+                        result = await kind.finish(request, result)
+                    except Exception:
+                        result = None
+                if result is None:
+                    await run_single(item_id, request)
+                else:
+                    await results.put({"id": item_id, "ok": True, "result": result, "packed": True})
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    done = asyncio.gather(*workers)
+    while not (done.done() and results.empty()):
+        getter = asyncio.ensure_future(results.get())
+        finished, _ = await asyncio.wait({getter, done}, return_when=asyncio.FIRST_COMPLETED)
+        if getter in finished:
+            yield getter.result()
+        else:
+            getter.cancel()
+    await done
+
+
+def read_requests(lines: Iterable[str], skip: Set[str] = frozenset()) -> List[Tuple[str, Dict[str, Any]]]:
+    items = []
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if isinstance(record, dict) and "request" in record:
+            item_id, payload = str(record.get("id", number)), record["request"]
+        else:
+            item_id, payload = str(number), record
+        if item_id not in skip:
+            items.append((item_id, payload))
+    return items
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids that already succeeded in an earlier run of the same output file"""
+    done = set()
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line from an interrupted run
+                if record.get("ok"):
+                    done.add(str(record["id"]))
+    return done
+
+
+async def _run_file(args, kinds: Dict[str, BatchKind], llm):
+    skip = completed_ids(args.output)
+    with open(args.input, encoding="utf-8") as f:
+        items = read_requests(f, skip)
+    print(f"{len(items)} items to run ({len(skip)} already done)", file=sys.stderr)
+
+    ok = failed = 0
+    limiter = RateLimiter(args.rpm, burst=args.concurrency)
+    with open(args.output, "a", encoding="utf-8") as out:
+        async for record in run_batch(kinds[args.kind], items, llm, args.concurrency, limiter, args.pack_size):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            ok, failed = ok + record["ok"], failed + (not record["ok"])
+    print(f"done: {ok} ok, {failed} failed -> {args.output}", file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None):
+    import main as service
+
+    parser = argparse.ArgumentParser(description="Bulk-run AI service requests from NDJSON")
+    parser.add_argument("kind", choices=sorted(service.BATCH_KINDS))
+    parser.add_argument("input", help="NDJSON file of requests")
+    parser.add_argument("-o", "--output", required=True, help="NDJSON results file (appended; used to resume)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rpm", type=float, default=float(os.getenv("BATCH_RPM", 60)), help="LLM calls per minute")
+    parser.add_argument("--pack-size", type=int, default=8, help="items per LLM call for packable kinds (1 = off)")
+    args = parser.parse_args(argv)
+
+    asyncio.run(_run_file(args, service.BATCH_KINDS, service.batch_llm_call))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""
+Ascendra - AI Service benchmarks
+Load tests and micro-benchmarks that run against a local Gemini stub
+"""
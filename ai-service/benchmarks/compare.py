@@ -0,0 +1,51 @@
+"""
+Compare two benchmark result files, e.g. main vs a feature branch.
+
+    python -m benchmarks.compare benchmarks/results/loadtest-main-*.json benchmarks/results/loadtest-feature-*.json
+"""
+
+import argparse
+import json
+from typing import Any, Dict, Iterator, Tuple
+
+
+def _flatten(data: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    """Yield (dotted.key, value) for every numeric leaf"""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield from _flatten(value, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        yield prefix, float(data)
+
+
+def compare(base: Dict, other: Dict, skip: Tuple[str, ...] = ("config", "git")) -> Iterator[Tuple[str, float, float, float]]:
+    base_values = {k: v for k, v in _flatten(base) if not k.startswith(skip)}
+    other_values = dict(_flatten(other))
+    for key, before in base_values.items():
+        if key in other_values:
+            after = other_values[key]
+            change = (after - before) / before * 100 if before else 0.0
+            yield key, before, after, change
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two benchmark result files")
+    parser.add_argument("base")
+    parser.add_argument("other")
+    parser.add_argument("--filter", default="", help="only show keys containing this substring")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.other, encoding="utf-8") as f:
+        other = json.load(f)
+
+    print(f"{base.get('label')}  ->  {other.get('label')}\n")
+    print(f"{'metric':<50}{'base':>12}{'other':>12}{'change':>10}")
+    for key, before, after, change in compare(base, other):
+        if args.filter in key:
+            print(f"{key:<50}{before:>12.2f}{after:>12.2f}{change:>9.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Context caching benchmark.
+
+    cd ai-service
+    python -m benchmarks.context_cache --requests 60 --prefill-per-1k 0.2
+
+Sends the same chat and distill-content requests with the static prefixes sent inline as
+system_instruction and with them served from Gemini context caches, and reports input
+tokens the model had to process (prompt minus cached) and latency for both. The stub
+charges --prefill-per-1k seconds per 1k uncached input tokens and a tenth of that for
+cached ones. CONTEXT_CACHE_MIN_CHARS is set to 0 so the short prefixes in this repo are
+cached at all; Gemini itself only caches prefixes of about 1024 tokens or more.
+"""
+
+import argparse
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+from benchmarks.harness import app_server, save_results, stub_server, summarize
+
+MODES = {
+    "inline": {"CONTEXT_CACHE": "false"},
+    "cached": {"CONTEXT_CACHE": "true", "CONTEXT_CACHE_MIN_CHARS": "0"},
+}
+
+CHAT_MESSAGES = [
+    ("I feel stressed about my exams", "mental_health"),
+    ("How do I prepare for a data analyst internship?", "career"),
+    ("Are there scholarships for engineering students?", "finance"),
+    ("How can I find a study group?", "social"),
+    ("Help me plan my assignments this week", "academic"),
+    ("What can you help me with?", "general"),
+]
+DISTILL_FORMATS = ["summary", "bullet-points", "flashcards", "quiz", "mind-map"]
+PASSAGE = ("Photosynthesis converts light energy into chemical energy. Chlorophyll absorbs light, water is split, "
+           "oxygen is released and carbon dioxide is fixed into sugars in the Calvin cycle. ")
+
+
+def requests_for(n: int, seed: int) -> List[Tuple[str, Dict[str, Any]]]:
+    rng = random.Random(seed)
+    batch = []
+    for i in range(n):
+        if i % 2 == 0:
+            message, category = rng.choice(CHAT_MESSAGES)
+            batch.append(("/api/chat", {"message": f"{message} ({i})", "userId": f"bench-{i}", "category": category}))
+        else:
+            batch.append(("/api/distill-content", {"content": PASSAGE * rng.randint(1, 4) + str(i),
+                                                   "format": rng.choice(DISTILL_FORMATS)}))
+    return batch
+
+
+def run_mode(stub_url: str, env: Dict[str, str], batch: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    httpx.post(f"{stub_url}/__stub/reset")
+    latencies, errors = [], 0
+    with app_server(stub_url, env={"RESPONSE_CACHE_TTL": "0", **env}, workers=1) as app_url:
+        with httpx.Client(timeout=60) as client:
+            for path, body in batch:
+                start = time.perf_counter()
+                response = client.post(app_url + path, json=body)
+                latencies.append(time.perf_counter() - start)
+                errors += response.status_code != 200
+            metrics = client.get(f"{app_url}/api/routing/metrics").json()
+    stub = httpx.get(f"{stub_url}/__stub/stats").json()
+    prompt_tokens = stub.get("prompt_tokens", 0)
+    cached_tokens = stub.get("cached_tokens", 0)
+    return {
+        "requests": len(batch),
+        "errors": errors,
+        "llm_calls": stub.get("calls", 0),
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "uncached_tokens": prompt_tokens - cached_tokens,
+        "caches_created": stub.get("caches_created", 0),
+        "latency": summarize(latencies),
+        "context_cache": metrics.get("contextCache"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Input tokens and latency with and without context caching")
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--latency", default="fixed:0.05", help="stub base latency distribution")
+    parser.add_argument("--prefill-per-1k", type=float, default=0.2, help="stub seconds per 1k uncached input tokens")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default=None)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    batch = requests_for(args.requests, args.seed)
+    runs = {}
+    with stub_server(args.latency, fenced_rate=0.0, seed=args.seed, prefill_per_1k=args.prefill_per_1k) as stub_url:
+        for mode, env in MODES.items():
+            runs[mode] = run_mode(stub_url, env, batch)
+
+    print(f"\n{'mode':>8}{'calls':>8}{'input tok':>11}{'cached':>9}{'uncached':>10}{'p50 ms':>9}{'mean ms':>9}")
+    for mode, run in runs.items():
+        print(f"{mode:>8}{run['llm_calls']:>8}{run['prompt_tokens']:>11}{run['cached_tokens']:>9}"
+              f"{run['uncached_tokens']:>10}{run['latency']['p50_ms']:>9}{run['latency']['mean_ms']:>9}")
+    inline, cached = runs["inline"], runs["cached"]
+    savings = {
+        "uncached_tokens_pct": round(100 * (1 - cached["uncached_tokens"] / max(inline["uncached_tokens"], 1)), 1),
+        "mean_latency_pct": round(100 * (1 - cached["latency"]["mean_ms"] / max(inline["latency"]["mean_ms"], 1e-9)), 1),
+    }
+    print(f"\nuncached input tokens -{savings['uncached_tokens_pct']}%, mean latency -{savings['mean_latency_pct']}%")
+
+    data = {"runs": runs, "savings": savings, "config": {k: v for k, v in vars(args).items() if k not in ("out", "label")}}
+    print(f"\nSaved {save_results('context-cache', data, args.out, args.label)}")
+
+
+if __name__ == "__main__":
+    main()
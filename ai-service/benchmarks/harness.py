@@ -0,0 +1,144 @@
+"""
+Shared helpers for the benchmarks: process management, percentiles and result files
+"""
+
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import httpx
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(SERVICE_DIR, "benchmarks", "results")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url: str, timeout: float = 30.0, proc: Optional[subprocess.Popen] = None) -> float:
+    """Poll url until it answers 200; returns the seconds it took"""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"Process exited with code {proc.returncode} before {url} was ready")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+@contextmanager
+def spawn(args: Sequence[str], env: Optional[Dict[str, str]] = None, ready_url: Optional[str] = None,
+          timeout: float = 30.0) -> Iterator[subprocess.Popen]:
+    """Run `python <args>` from the service directory for the duration of the block"""
+    proc_env = dict(os.environ)
+    proc_env.update(env or {})
+    proc = subprocess.Popen([sys.executable, *args], cwd=SERVICE_DIR, env=proc_env)
+    try:
+        if ready_url:
+            wait_ready(ready_url, timeout, proc)
+        yield proc
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+@contextmanager
+def stub_server(latency: str = "lognormal:0.8:0.4", error_rate: float = 0.0, malformed_rate: float = 0.0,
+                fenced_rate: float = 0.3, seed: Optional[int] = None, port: Optional[int] = None,
+                prefill_per_1k: float = 0.0) -> Iterator[str]:
+    """Start the Gemini stub and yield its base URL"""
+    port = port or free_port()
+    args = ["-m", "benchmarks.stub_llm", "--port", str(port), "--latency", latency,
+            "--error-rate", str(error_rate), "--malformed-rate", str(malformed_rate),
+            "--fenced-rate", str(fenced_rate), "--prefill-per-1k", str(prefill_per_1k)]
+    if seed is not None:
+        args += ["--seed", str(seed)]
+    base_url = f"http://127.0.0.1:{port}"
+    with spawn(args, ready_url=f"{base_url}/__stub/stats"):
+        yield base_url
+
+
+@contextmanager
+def app_server(stub_url: str, port: Optional[int] = None, env: Optional[Dict[str, str]] = None,
+               workers: Optional[int] = None) -> Iterator[str]:
+    """Start the AI service against the stub and yield its base URL.
+
+    Without `workers` it runs in-process behind the loop-lag probe; with `workers`
+    it runs plain `uvicorn --workers N` (no probe). Each run gets a fresh DATA_DIR.
+    """
+    port = port or free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    if workers:
+        args = ["-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+                "--workers", str(workers), "--log-level", "warning"]
+    else:
+        args = ["-m", "benchmarks.serve_app", "--port", str(port)]
+    with tempfile.TemporaryDirectory(prefix="ascendra-bench-") as data_dir:
+        app_env = {"GEMINI_API_KEY": "bench-key", "GEMINI_BASE_URL": stub_url, "DATA_DIR": data_dir}
+        app_env.update(env or {})
+        with spawn(args, env=app_env, ready_url=f"{base_url}/health"):
+            yield base_url
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty sample"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100.0 * len(ordered))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    if not latencies:
+        return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    return {
+        "count": len(latencies),
+        "mean_ms": round(1000 * sum(latencies) / len(latencies), 2),
+        "p50_ms": round(1000 * percentile(latencies, 50), 2),
+        "p95_ms": round(1000 * percentile(latencies, 95), 2),
+        "p99_ms": round(1000 * percentile(latencies, 99), 2),
+        "max_ms": round(1000 * max(latencies), 2),
+    }
+
+
+def git_info() -> Dict[str, str]:
+    def run(*args: str) -> str:
+        try:
+            return subprocess.check_output(["git", *args], cwd=SERVICE_DIR, stderr=subprocess.DEVNULL).decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            return "unknown"
+    return {"branch": run("rev-parse", "--abbrev-ref", "HEAD"), "commit": run("rev-parse", "--short", "HEAD")}
+
+
+def save_results(name: str, data: Dict, out_dir: Optional[str] = None, label: Optional[str] = None) -> str:
+    """Write a result document as JSON and return its path"""
+    out_dir = out_dir or RESULTS_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    git = git_info()
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    label = label or f"{git['branch'].replace('/', '-')}-{git['commit']}"
+    document = {"benchmark": name, "label": label, "timestamp": stamp, "git": git, **data}
+    path = os.path.join(out_dir, f"{name}-{label}-{stamp}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
+    return path
@@ -0,0 +1,131 @@
+"""
+Mixed-traffic load test for the AI service against the local Gemini stub.
+
+    cd ai-service
+    python -m benchmarks.loadtest --duration 30 --concurrency 32 --latency lognormal:0.8:0.4
+
+Starts the stub and the app as subprocesses, drives weighted traffic over all
+endpoints and reports throughput, p50/p95/p99 latency per endpoint and the
+app's event-loop lag. Results are written to benchmarks/results/*.json; use
+`python -m benchmarks.compare a.json b.json` to diff two runs.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.harness import app_server, save_results, stub_server, summarize
+from benchmarks.workload import Scenario, select
+
+
+async def drive(base_url: str, scenarios: List[Scenario], duration: float, concurrency: int,
+                warmup: float = 2.0, seed: Optional[int] = None, timeout: float = 120.0,
+                probe_loop_lag: bool = True) -> Dict:
+    """Closed-loop load: `concurrency` workers issue requests back to back for `duration` seconds"""
+    rng = random.Random(seed)
+    weights = [s.weight for s in scenarios]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        loop = asyncio.get_running_loop()
+        measure_from = loop.time() + warmup
+        stop_at = measure_from + duration
+
+        async def worker():
+            while loop.time() < stop_at:
+                scenario = rng.choices(scenarios, weights)[0]
+                payload, headers = scenario.request(rng)
+                start = time.perf_counter()
+                try:
+                    response = await client.post(scenario.path, json=payload, headers=headers)
+                    outcome = str(response.status_code)
+                    if response.status_code == 200 and response.json().get("success") is False:
+                        outcome = "200-unparsed"
+                except httpx.HTTPError as e:
+                    outcome = type(e).__name__
+                elapsed = time.perf_counter() - start
+                if loop.time() - elapsed >= measure_from:
+                    latencies[scenario.name].append(elapsed)
+                    statuses[scenario.name][outcome] += 1
+
+        loop_lag = None
+        if probe_loop_lag:
+            await client.get("/__bench/loop-lag")  # starts the probe
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        await asyncio.sleep(max(0.0, measure_from - loop.time()))
+        if probe_loop_lag:
+            await client.get("/__bench/loop-lag", params={"reset": 1})
+        await asyncio.gather(*workers)
+        if probe_loop_lag:
+            loop_lag = (await client.get("/__bench/loop-lag")).json()
+
+    all_latencies = [v for values in latencies.values() for v in values]
+    per_endpoint = {}
+    for name in sorted(latencies):
+        per_endpoint[name] = {**summarize(latencies[name]), "statuses": dict(statuses[name])}
+    errors = sum(n for s in statuses.values() for code, n in s.items() if not code.startswith("200"))
+
+    return {
+        "requests": len(all_latencies),
+        "errors": errors,
+        "throughput_rps": round(len(all_latencies) / duration, 2),
+        "latency": summarize(all_latencies),
+        "endpoints": per_endpoint,
+        "loop_lag": loop_lag,
+    }
+
+
+def print_report(result: Dict):
+    overall = result["latency"]
+    print(f"\nrequests={result['requests']} errors={result['errors']} throughput={result['throughput_rps']} req/s")
+    print(f"latency  p50={overall['p50_ms']}ms p95={overall['p95_ms']}ms p99={overall['p99_ms']}ms max={overall['max_ms']}ms")
+    lag = result["loop_lag"]
+    if lag:
+        print(f"loop lag p50={lag['p50_ms']}ms p99={lag['p99_ms']}ms max={lag['max_ms']}ms")
+    print()
+    print(f"{'endpoint':<22}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}  statuses")
+    for name, row in result["endpoints"].items():
+        print(f"{name:<22}{row['count']:>7}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}  {row['statuses']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the AI service against the Gemini stub")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds (after warmup)")
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mix", default="", help="weight overrides, e.g. 'chat=10,grant-writer=0'")
+    parser.add_argument("--latency", default="lognormal:0.8:0.4", help="stub latency distribution")
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--malformed-rate", type=float, default=0.02)
+    parser.add_argument("--fenced-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--target", default=None, help="benchmark an already running service instead of spawning one")
+    parser.add_argument("--label", default=None, help="result label (defaults to <branch>-<commit>)")
+    parser.add_argument("--out", default=None, help="results directory")
+    args = parser.parse_args()
+
+    scenarios = select(args.mix)
+    run = lambda url: asyncio.run(drive(url, scenarios, args.duration, args.concurrency, args.warmup, args.seed))
+
+    if args.target:
+        result = run(args.target)
+    else:
+        with stub_server(args.latency, args.error_rate, args.malformed_rate, args.fenced_rate, args.seed) as stub_url:
+            with app_server(stub_url) as app_url:
+                result = run(app_url)
+            result["stub"] = httpx.get(f"{stub_url}/__stub/stats").json()
+
+    result["config"] = {k: v for k, v in vars(args).items() if k not in ("out", "label")}
+    print_report(result)
+    print(f"\nSaved {save_results('loadtest', result, args.out, args.label)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Logging overhead benchmark.
+
+    cd ai-service
+    python -m benchmarks.logging_overhead --duration 20 --concurrency 32
+
+First times one log call on the caller's thread with the queue handler and with a plain
+synchronous file handler. Then runs the same load against the service with logging at
+ERROR (almost nothing written), with every debug line written synchronously, and with
+every debug line written by the background thread (LOG_DEBUG_SAMPLE=1, the worst case),
+and compares latency and event-loop lag.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict
+
+import httpx
+
+import logs
+from benchmarks.harness import app_server, save_results, stub_server
+from benchmarks.loadtest import drive
+from benchmarks.workload import select
+
+MODES = {
+    "off": {"LOG_LEVEL": "ERROR", "LOG_QUEUE": "true"},
+    "sync": {"LOG_LEVEL": "DEBUG", "LOG_DEBUG_SAMPLE": "1", "LOG_QUEUE": "false"},
+    "queued": {"LOG_LEVEL": "DEBUG", "LOG_DEBUG_SAMPLE": "1", "LOG_QUEUE": "true"},
+}
+
+
+def call_cost_us(path: str, use_queue: bool, iterations: int) -> float:
+    logger = logs.setup_logging("DEBUG", debug_sample=1.0, path=path, use_queue=use_queue)
+    start = time.perf_counter()
+    for i in range(iterations):
+        logger.info("Chat message", extra={"userMessage": "I am stressed about my exam", "category": "mental", "i": i})
+    elapsed = time.perf_counter() - start
+    logs.setup_logging("ERROR", path=os.devnull)  # drains the queue and closes the file
+    return round(1e6 * elapsed / iterations, 2)
+
+
+def count_lines(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path, encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency added by structured logging under load")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--iterations", type=int, default=50000, help="log calls for the per-call timing")
+    parser.add_argument("--latency", default="lognormal:0.3:0.3", help="stub latency distribution")
+    parser.add_argument("--mix", default="", help="weight overrides, e.g. 'chat=10,grant-writer=0'")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default=None)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    runs: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="ascendra-logs-") as log_dir:
+        per_call = {
+            "queued_us": call_cost_us(os.path.join(log_dir, "queued.log"), True, args.iterations),
+            "sync_us": call_cost_us(os.path.join(log_dir, "sync.log"), False, args.iterations),
+        }
+        print(f"per log call on the caller's thread: queued {per_call['queued_us']} us, sync {per_call['sync_us']} us")
+
+        scenarios = select(args.mix)
+        with stub_server(args.latency, fenced_rate=0.3, seed=args.seed) as stub_url:
+            for mode, env in MODES.items():
+                path = os.path.join(log_dir, f"{mode}-service.log")
+                httpx.post(f"{stub_url}/__stub/reset")
+                with app_server(stub_url, env={**env, "LOG_FILE": path}) as app_url:
+                    result = asyncio.run(drive(app_url, scenarios, args.duration, args.concurrency,
+                                               args.warmup, args.seed))
+                result["log_lines"] = count_lines(path)
+                runs[mode] = result
+    logging.getLogger("ascendra").handlers.clear()
+
+    print(f"\n{'mode':>8}{'requests':>10}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'lag p99':>9}{'lines':>8}")
+    for mode, run in runs.items():
+        lat, lag = run["latency"], run["loop_lag"] or {}
+        print(f"{mode:>8}{run['requests']:>10}{run['throughput_rps']:>8}{lat['p50_ms']:>9}{lat['p95_ms']:>9}"
+              f"{lat['p99_ms']:>9}{lag.get('p99_ms', '-'):>9}{run['log_lines']:>8}")
+
+    data = {"per_call": per_call, "runs": runs,
+            "config": {k: v for k, v in vars(args).items() if k not in ("out", "label")}}
+    print(f"\nSaved {save_results('logging-overhead', data, args.out, args.label)}")
+
+
+if __name__ == "__main__":
+    main()
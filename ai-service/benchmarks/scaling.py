@@ -0,0 +1,76 @@
+"""
+Multi-worker throughput scaling benchmark.
+
+    cd ai-service
+    python -m benchmarks.scaling --max-workers 4 --duration 20
+
+Runs the same mixed workload against `uvicorn --workers N` for N = 1, 2, 4, ...
+up to --max-workers (default: CPU count) and reports throughput and scaling
+efficiency (throughput(N) / (N * throughput(1))). The response cache is disabled
+by default so the numbers measure raw serving capacity; pass --with-cache to
+also show how hits filled by one worker are served by the others.
+"""
+
+import argparse
+import asyncio
+import os
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.harness import app_server, save_results, stub_server
+from benchmarks.loadtest import drive
+from benchmarks.workload import select
+
+
+def worker_counts(max_workers: int) -> List[int]:
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    return counts + [max_workers]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput scaling across uvicorn workers")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--concurrency-per-worker", type=int, default=16)
+    parser.add_argument("--latency", default="lognormal:0.3:0.3", help="stub latency distribution")
+    parser.add_argument("--mix", default="")
+    parser.add_argument("--with-cache", action="store_true", help="keep the shared response cache enabled")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default=None)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    scenarios = select(args.mix)
+    env = {} if args.with_cache else {"RESPONSE_CACHE_TTL": "0"}
+    runs: Dict[str, Dict] = {}
+
+    with stub_server(args.latency, seed=args.seed) as stub_url:
+        for workers in worker_counts(args.max_workers):
+            httpx.post(f"{stub_url}/__stub/reset")
+            concurrency = args.concurrency_per_worker * workers
+            with app_server(stub_url, env=env, workers=workers) as app_url:
+                result = asyncio.run(drive(app_url, scenarios, args.duration, concurrency, args.warmup,
+                                           args.seed, probe_loop_lag=False))
+            result["stub"] = httpx.get(f"{stub_url}/__stub/stats").json()
+            runs[str(workers)] = result
+
+    baseline = runs["1"]["throughput_rps"] or 1.0
+    print(f"\n{'workers':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'speedup':>10}{'efficiency':>12}")
+    for workers, result in runs.items():
+        speedup = result["throughput_rps"] / baseline
+        result["speedup"] = round(speedup, 2)
+        result["efficiency"] = round(speedup / int(workers), 2)
+        print(f"{workers:>8}{result['throughput_rps']:>10}{result['latency']['p50_ms']:>10}"
+              f"{result['latency']['p99_ms']:>10}{result['speedup']:>10}{result['efficiency']:>12}")
+
+    data = {"runs": runs, "config": {k: v for k, v in vars(args).items() if k not in ("out", "label")}}
+    print(f"\nSaved {save_results('scaling', data, args.out, args.label)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Response serialization benchmark.
+
+    cd ai-service
+    python -m benchmarks.serialization --iterations 2000
+
+Encodes the largest response payloads (a 60-month debt-calculator plan, a long study plan,
+a full scholarship search) the way FastAPI did by default (jsonable_encoder, then
+JSONResponse) and the way FastJSONRoute does now (orjson, or MessagePack when negotiated),
+and reports CPU per response and bytes on the wire raw, gzip and brotli.
+"""
+
+import argparse
+import gzip
+import time
+from typing import Any, Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import serialization
+from benchmarks.harness import save_results
+from benchmarks.stub_llm import _debt_plan, _scholarships, _study_plan
+
+
+def payloads() -> Dict[str, Any]:
+    plan = _debt_plan("")
+    months = []
+    for m in range(1, 61):
+        months.append({
+            "month": m,
+            "payments": [
+                {"loan": "Education Loan", "amount": 10000, "remaining": max(0, 400000 - m * 10000)},
+                {"loan": "Credit Card", "amount": 5000, "remaining": max(0, 100000 - m * 5000)},
+                {"loan": "Personal Loan ₹", "amount": 2500.5, "remaining": max(0.0, 90000 - m * 2500.5)},
+            ],
+            "totalRemaining": max(0, 590000 - m * 17500.5),
+        })
+    plan["monthlyBreakdown"] = months
+    study = _study_plan("")
+    study["sessions"] = study["sessions"] * 3
+    scholarships = _scholarships("")
+    scholarships["scholarships"] = [dict(s, name=f"{s['name']} {i}") for i in range(6) for s in scholarships["scholarships"]]
+    return {
+        "debt-calculator": {"success": True, "plan": plan},
+        "study-plan": {"success": True, "plan": study},
+        "search-scholarships": {"success": True, "data": scholarships},
+    }
+
+
+def per_call_us(fn: Callable[[], Any], iterations: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return round(1e6 * (time.perf_counter() - start) / iterations, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serialization CPU and wire bytes for large responses")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--label", default=None)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    renderers = {"json": lambda c: JSONResponse(jsonable_encoder(c)).body, "orjson": serialization.dumps}
+    if serialization.msgpack is not None:
+        renderers["msgpack"] = lambda c: serialization.msgpack.packb(c, use_bin_type=True)
+
+    results = {}
+    for name, payload in payloads().items():
+        row = {}
+        for fmt, render in renderers.items():
+            body = render(payload)
+            sizes = {"raw": len(body), "gzip": len(gzip.compress(body, compresslevel=6))}
+            cpu = {"render_us": per_call_us(lambda: render(payload), args.iterations),
+                   "gzip_us": per_call_us(lambda: gzip.compress(body, compresslevel=6), args.iterations // 4)}
+            if serialization.brotli is not None:
+                sizes["br"] = len(serialization.brotli.compress(body, quality=4))
+                cpu["br_us"] = per_call_us(lambda: serialization.brotli.compress(body, quality=4), args.iterations // 4)
+            row[fmt] = {"bytes": sizes, **cpu}
+        results[name] = row
+
+    print(f"\n{'payload':>20}{'format':>9}{'render us':>11}{'raw B':>8}{'gzip B':>8}{'gzip us':>9}{'br B':>7}{'br us':>8}")
+    for name, row in results.items():
+        for fmt, r in row.items():
+            print(f"{name:>20}{fmt:>9}{r['render_us']:>11}{r['bytes']['raw']:>8}{r['bytes']['gzip']:>8}"
+                  f"{r['gzip_us']:>9}{r['bytes'].get('br', '-'):>7}{r.get('br_us', '-'):>8}")
+        speedup = row["json"]["render_us"] / max(row["orjson"]["render_us"], 1e-9)
+        print(f"{'':>20}{'':>9} orjson {speedup:.1f}x faster than the FastAPI default")
+
+    data = {"results": results, "config": {"iterations": args.iterations,
+                                           "orjson": serialization.orjson is not None,
+                                           "msgpack": serialization.msgpack is not None,
+                                           "brotli": serialization.brotli is not None}}
+    print(f"\nSaved {save_results('serialization', data, args.out, args.label)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Runs the AI service for benchmarks with an event-loop lag probe in front of it.
+
+The probe samples how late a periodic asyncio.sleep() wakes up. Blocking work on
+the loop (sync LLM calls, JSON parsing, stdout) shows up directly as lag.
+Stats are served on GET /__bench/loop-lag (add ?reset=1 to clear after warmup).
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from urllib.parse import parse_qs
+
+import uvicorn
+
+from benchmarks.harness import summarize
+
+PROBE_PATH = "/__bench/loop-lag"
+
+
+class LoopLagProbe:
+    """ASGI wrapper that measures event-loop lag without touching the wrapped app"""
+
+    def __init__(self, app, interval: float = 0.01, max_samples: int = 200_000):
+        self.app = app
+        self.interval = interval
+        self.samples = deque(maxlen=max_samples)
+        self._task = None
+
+    async def _monitor(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket") and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._monitor())
+
+        if scope["type"] == "http" and scope["path"] == PROBE_PATH:
+            query = parse_qs(scope.get("query_string", b"").decode())
+            body = json.dumps(summarize(list(self.samples))).encode()
+            if query.get("reset"):
+                self.samples.clear()
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        await self.app(scope, receive, send)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the AI service with a loop-lag probe")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    import main as service
+    uvicorn.run(LoopLagProbe(service.app), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Cold-start benchmark and import-time budget.
+
+    cd ai-service
+    python -m benchmarks.startup --budget-ms 500
+
+Runs `python -X importtime -c "import main"` a few times and fails (exit code 1)
+when the median cumulative import time of `main` exceeds the budget or when a
+module that must stay lazy (the google.genai SDK) is imported eagerly. It also
+measures time-to-/health and, with PREWARM_LLM=1, time-to-/ready.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.harness import SERVICE_DIR, free_port, save_results, spawn, wait_ready
+
+LAZY_MODULES = ("google.genai",)
+
+
+def import_profile() -> List[Tuple[str, int, int]]:
+    """One `-X importtime` run: [(module, self_us, cumulative_us)]"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=SERVICE_DIR,
+                          env={**os.environ, "GEMINI_API_KEY": "bench-key"}, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import main failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def time_to(url_path: str, env: Dict[str, str]) -> float:
+    port = free_port()
+    start = time.perf_counter()
+    args = ["-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    with spawn(args, env={"GEMINI_API_KEY": "bench-key", **env}) as proc:
+        wait_ready(f"http://127.0.0.1:{port}{url_path}", timeout=60, proc=proc)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budget and cold-start timings")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", 500)))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--label", default=None)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    profiles = [import_profile() for _ in range(args.runs)]
+    main_ms = statistics.median(next(c for name, _, c in p if name == "main") / 1000 for p in profiles)
+    imported = {name for name, _, _ in profiles[-1]}
+    eager = [m for m in LAZY_MODULES if m in imported]
+    slowest = sorted(profiles[-1], key=lambda row: row[1], reverse=True)[:args.top]
+
+    health_s = time_to("/health", {})
+    ready_s = time_to("/ready", {"PREWARM_LLM": "1"})
+
+    print(f"import main (median of {args.runs}): {main_ms:.1f} ms  (budget {args.budget_ms:.0f} ms)")
+    print(f"time to /health: {health_s * 1000:.0f} ms   time to warm /ready: {ready_s * 1000:.0f} ms\n")
+    print(f"{'module':<50}{'self ms':>10}")
+    for name, self_us, _ in slowest:
+        print(f"{name:<50}{self_us / 1000:>10.1f}")
+
+    data = {
+        "import_main_ms": round(main_ms, 1),
+        "budget_ms": args.budget_ms,
+        "time_to_health_ms": round(health_s * 1000, 1),
+        "time_to_ready_ms": round(ready_s * 1000, 1),
+        "eager_lazy_modules": eager,
+        "slowest_modules": [{"module": n, "self_ms": round(s / 1000, 1)} for n, s, _ in slowest],
+    }
+    print(f"\nSaved {save_results('startup', data, args.out, args.label)}")
+
+    failures = []
+    if main_ms > args.budget_ms:
+        failures.append(f"import main took {main_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    if eager:
+        failures.append(f"modules that must be imported lazily were imported eagerly: {', '.join(eager)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,448 @@
+"""
+Local Gemini stub for benchmarks
+Speaks just enough of the generateContent REST API for google.genai to talk to it.
+
+Run standalone:
+    python -m benchmarks.stub_llm --port 9100 --latency lognormal:0.8:0.4 --error-rate 0.02
+
+Point the AI service at it with GEMINI_BASE_URL=http://127.0.0.1:9100
+
+Context caches (cachedContents) are kept in memory. With --prefill-per-1k each call also
+waits in proportion to its input tokens, cached tokens at a tenth of the rate.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+@dataclass
+class LatencyModel:
+    """Latency distribution in seconds: fixed, uniform, normal or lognormal"""
+    kind: str = "fixed"
+    params: List[float] = field(default_factory=lambda: [0.0])
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """Parse 'kind:p1[:p2]', e.g. 'uniform:0.2:1.5' or 'lognormal:0.8:0.4' (median, sigma)"""
+        kind, *raw = spec.split(":")
+        params = [float(p) for p in raw] or [0.0]
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if kind not in expected or len(params) != expected[kind]:
+            raise ValueError(f"Invalid latency spec '{spec}'")
+        return cls(kind, params)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            value = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            value = rng.gauss(*self.params)
+        elif self.kind == "lognormal":
+            median, sigma = self.params
+            value = median * rng.lognormvariate(0, sigma)
+        else:
+            value = self.params[0]
+        return max(0.0, value)
+
+
+@dataclass
+class StubConfig:
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    error_rate: float = 0.0       # share of calls failing with 429/500/503
+    malformed_rate: float = 0.0   # share of JSON answers that are truncated
+    fenced_rate: float = 0.0      # share of JSON answers wrapped in ```json fences
+    prefill_per_1k: float = 0.0   # extra seconds per 1k uncached input tokens
+    seed: Optional[int] = None
+
+
+config = StubConfig()
+rng = random.Random()
+stats: Counter = Counter()
+caches: Dict[str, Dict[str, Any]] = {}
+
+app = FastAPI(title="Ascendra Gemini Stub")
+
+
+# Canned answers, picked by a marker phrase from the prompt each endpoint sends
+def _flashcards(prompt: str) -> Any:
+    match = re.search(r"Generate (\d+) educational flashcards", prompt)
+    count = int(match.group(1)) if match else 5
+    # Distinct every call, so deck de-duplication keeps them
+    return [{"question": f"Stub {rng.randrange(10 ** 6)} {rng.randrange(10 ** 6)}?", "answer": f"Stub answer {i + 1}."}
+            for i in range(count)]
+
+
+def _debt_plan(prompt: str) -> Any:
+    return {
+        "strategy": "avalanche",
+        "totalDebt": 500000,
+        "monthlyPayment": 15000,
+        "estimatedPayoffMonths": 38,
+        "totalInterestSaved": 42000,
+        "paymentOrder": ["Education Loan", "Credit Card"],
+        "monthlyBreakdown": [
+            {
+                "month": m,
+                "payments": [
+                    {"loan": "Education Loan", "amount": 10000, "remaining": 400000 - m * 10000},
+                    {"loan": "Credit Card", "amount": 5000, "remaining": max(0, 100000 - m * 5000)},
+                ],
+                "totalRemaining": 500000 - m * 15000,
+            }
+            for m in range(1, 13)
+        ],
+        "tips": ["Pay more than the minimum", "Avoid new debt"],
+        "debtFreeDate": "March 2029",
+    }
+
+
+def _scholarships(prompt: str) -> Any:
+    return {
+        "scholarships": [
+            {
+                "name": f"Stub Scholarship {i}",
+                "provider": "Stub Foundation",
+                "amount": "₹50,000/year",
+                "eligibility": ["Family income below ₹8L", "60% in last exam"],
+                "deadline": "Varies",
+                "applicationUrl": "https://scholarships.gov.in",
+                "description": "Benchmark fixture scholarship.",
+                "category": "need-based",
+                "field": "All",
+                "source": "NSP",
+            }
+            for i in range(1, 8)
+        ],
+        "tips": ["Apply early"],
+        "additionalResources": ["https://buddy4study.com", "https://scholarships.gov.in"],
+    }
+
+
+INTERVIEW_QUESTIONS = [
+    "Tell me about a time you disagreed with a teammate and how you resolved it.",
+    "Describe a project you are proud of and your specific contribution.",
+    "How do you prioritise when several deadlines collide?",
+    "Walk me through how you would debug a slow database query.",
+    "What would you do if you realised you would miss a commitment?",
+    "Explain a technical concept to someone without a technical background.",
+    "Why do you want to work in this role?",
+    "Describe a failure and what you learned from it.",
+    "How do you keep your skills up to date?",
+    "Tell me about feedback that changed how you work.",
+    "How would you design a URL shortener?",
+    "What is the difference between a process and a thread?",
+    "Describe how you would estimate the size of a new feature.",
+    "How do you handle ambiguity in requirements?",
+    "Give an example of leading without formal authority.",
+    "What metrics would you track for a student mentoring app?",
+    "How would you explain a recursion bug to a junior developer?",
+    "Tell me about a time you had to learn something quickly.",
+    "How do you make sure your code is maintainable?",
+    "What questions would you ask before starting a data analysis?",
+]
+
+
+def _interview(prompt: str) -> Any:
+    return {
+        "questions": [
+            {
+                "question": question,
+                "lookingFor": ["Ownership", "Clarity"],
+                "modelAnswer": "Use the STAR framework.",
+                "avoid": ["Rambling"],
+            }
+            for question in rng.sample(INTERVIEW_QUESTIONS, 5)
+        ],
+        "tips": ["Be specific"],
+    }
+
+
+def _study_plan(prompt: str) -> Any:
+    sessions = []
+    for i in range(1, 9):
+        if i % 2:
+            sessions.append({"sessionNumber": i, "type": "study", "duration": 25, "focus": f"Subtopic {i}",
+                             "objectives": ["Understand core ideas"], "techniques": ["Active recall"]})
+        else:
+            sessions.append({"sessionNumber": i, "type": "break", "duration": 5, "activity": "Short stretch"})
+    return {"topic": "Stub", "totalDuration": "2 hours", "sessions": sessions, "materials": ["Notes"],
+            "preStudyChecklist": ["Water"], "reviewTasks": ["Summarize"], "groupStudyTips": ["Quiz each other"],
+            "motivationalTip": "You've got this!"}
+
+
+def _grant_section(prompt: str) -> Any:
+    """Every key any section asks for; the service keeps the ones its section owns"""
+    return {
+        "executiveSummary": "Stub summary.",
+        "problemStatement": "Stub problem.",
+        "objectives": ["Objective 1", "Objective 2"],
+        "expectedOutcomes": ["Outcome 1"],
+        "methodology": "Stub approach.",
+        "timeline": [{"phase": "Phase 1", "duration": "3 months", "activities": "Stub activities"}],
+        "evaluationPlan": "Stub evaluation.",
+        "sustainability": "Stub sustainability.",
+        "tips": ["Stub tip"],
+        "budgetBreakdown": [{"category": "Ignored", "amount": 1, "justification": "Not the service's budget"}],
+    }
+
+
+def _skill_project(prompt: str) -> Any:
+    return {"name": "Stub portfolio project", "description": "A small stub project.",
+            "steps": ["Set up", "Build", "Publish"], "estimatedHours": 8}
+
+
+def _generic(prompt: str) -> Any:
+    return {
+        "matches": [{"name": "Study Buddy", "type": "study-group", "matchScore": 85,
+                     "reason": "Shared interests", "activity": "Weekly sessions"}],
+        "gigs": [{"title": "Online tutoring", "platform": "Local", "type": "online",
+                  "earningPotential": "₹300 - ₹500 per hour", "skillMatch": 80}],
+        "items": ["stub"],
+        "tips": ["Stub tip"],
+    }
+
+
+def _packed(prompt: str) -> Any:
+    """Micro-batched prompts (batch.py) ask for one indexed entry per item"""
+    match = re.search(r"exactly (\d+) objects, in order", prompt)
+    count = int(match.group(1)) if match else 1
+    return [{"index": i, "analysis": MARKDOWN_ANSWER, "flashcards": _flashcards("")} for i in range(count)]
+
+
+JSON_PAYLOADS = [
+    ("objects, in order", _packed),
+    ("educational flashcards", _flashcards),
+    ("debt repayment plan", _debt_plan),
+    ("scholarship research expert", _scholarships),
+    ("interview questions", _interview),
+    ("Pomodoro-style study plan", _study_plan),
+    ("grant application section", _grant_section),
+    ("hands-on micro-project", _skill_project),
+]
+
+CHAT_ANSWER = """REASONING: The student needs practical, encouraging guidance broken into small steps.
+ACTIONS: suggest_plan, offer_resources
+RESPONSE: ### Here's a plan
+- **Start small**: pick one task for the next 25 minutes
+- **Take a break** afterwards
+> You're doing better than you think 😊"""
+
+MARKDOWN_ANSWER = """### 📝 Key Summary
+- **Point one**: a stub explanation
+- **Point two**: another stub explanation
+
+> Keep going!"""
+
+
+def _extract_text(body: Dict[str, Any]) -> str:
+    """Concatenate every text part of the request (system instruction + contents)"""
+    texts = []
+    if body.get("cachedContent") in caches:
+        texts.append(_extract_text(caches[body["cachedContent"]]))
+    instruction = body.get("systemInstruction") or body.get("system_instruction")
+    blocks = ([instruction] if instruction else []) + list(body.get("contents") or [])
+    for block in blocks:
+        if isinstance(block, str):
+            texts.append(block)
+            continue
+        for part in block.get("parts", []):
+            if "text" in part:
+                texts.append(part["text"])
+    return "\n".join(texts)
+
+
+def build_answer(prompt: str) -> str:
+    """Pick a canned answer for the prompt and apply fencing / corruption"""
+    if "REASONING:" in prompt and "RESPONSE:" in prompt:
+        return CHAT_ANSWER
+    if "JSON" not in prompt:
+        return MARKDOWN_ANSWER
+
+    factory = next((f for marker, f in JSON_PAYLOADS if marker in prompt), _generic)
+    text = json.dumps(factory(prompt), ensure_ascii=False, indent=2)
+
+    if rng.random() < config.malformed_rate:
+        stats["malformed"] += 1
+        text = text[: max(1, int(len(text) * 0.6))]
+    if rng.random() < config.fenced_rate:
+        stats["fenced"] += 1
+        text = f"```json\n{text}\n```"
+    return text
+
+
+def _error_response() -> JSONResponse:
+    code, status = rng.choice([(429, "RESOURCE_EXHAUSTED"), (500, "INTERNAL"), (503, "UNAVAILABLE")])
+    stats[f"error_{code}"] += 1
+    return JSONResponse(status_code=code, content={"error": {"code": code, "message": f"Stub {status}", "status": status}})
+
+
+@app.post("/{api_version}/models/{model_action:path}")
+async def generate_content(api_version: str, model_action: str, request: Request):
+    """Handles POST /v1beta/models/<model>:generateContent"""
+    body = await request.json()
+    model, _, action = model_action.partition(":")
+    cached = caches.get(body.get("cachedContent")) if body.get("cachedContent") else None
+    if body.get("cachedContent") and cached is None:
+        stats["error_404"] += 1
+        return JSONResponse(status_code=404, content={"error": {"code": 404, "message": "Stub cache not found",
+                                                                "status": "NOT_FOUND"}})
+    prompt = _extract_text(body)
+
+    stats["calls"] += 1
+    stats[f"model:{model}"] += 1
+    stats["prompt_chars"] += len(prompt)
+
+    prompt_tokens = max(1, len(prompt) // 4)
+    cached_tokens = cached["tokens"] if cached else 0
+    await asyncio.sleep(config.latency.sample(rng)
+                        + config.prefill_per_1k * (prompt_tokens - cached_tokens + cached_tokens / 10) / 1000)
+
+    if rng.random() < config.error_rate:
+        return _error_response()
+
+    answer = build_answer(prompt)
+    answer_tokens = max(1, len(answer) // 4)
+    stats["prompt_tokens"] += prompt_tokens
+    stats["cached_tokens"] += cached_tokens
+    stats["completion_tokens"] += answer_tokens
+
+    return {
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": answer}]},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "cachedContentTokenCount": cached_tokens,
+            "candidatesTokenCount": answer_tokens,
+            "totalTokenCount": prompt_tokens + answer_tokens,
+        },
+        "modelVersion": model,
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    """OpenAI-compatible endpoint, standing in for a llama.cpp server (the "local" provider)"""
+    body = await request.json()
+    prompt = "\n".join(m.get("content") or "" for m in body.get("messages", []))
+    stats["local_calls"] += 1
+    stats[f"model:{body.get('model', '')}"] += 1
+    await asyncio.sleep(config.latency.sample(rng))
+    if rng.random() < config.error_rate:
+        return _error_response()
+    answer = build_answer(prompt)
+    return {
+        "object": "chat.completion",
+        "model": body.get("model", ""),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": max(1, len(prompt) // 4), "completion_tokens": max(1, len(answer) // 4)},
+    }
+
+
+def _cache_view(cache: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: cache[k] for k in ("name", "model", "displayName", "createTime", "updateTime", "expireTime")} | {
+        "usageMetadata": {"totalTokenCount": cache["tokens"]}}
+
+
+def _expire_time(ttl: str) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + float(ttl.rstrip("s"))))
+
+
+@app.post("/{api_version}/cachedContents")
+async def create_cache(api_version: str, request: Request):
+    body = await request.json()
+    name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+    now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    cache = {"name": name, "model": body.get("model", ""), "displayName": body.get("displayName", ""),
+             "systemInstruction": body.get("systemInstruction"), "contents": body.get("contents") or [],
+             "createTime": now, "updateTime": now, "expireTime": _expire_time(body.get("ttl", "3600s"))}
+    cache["tokens"] = max(1, len(_extract_text(cache)) // 4)
+    caches[name] = cache
+    stats["caches_created"] += 1
+    return _cache_view(cache)
+
+
+@app.get("/{api_version}/cachedContents")
+async def list_caches(api_version: str):
+    return {"cachedContents": [_cache_view(c) for c in caches.values()]}
+
+
+@app.get("/{api_version}/cachedContents/{cache_id}")
+async def get_cache(api_version: str, cache_id: str):
+    cache = caches.get(f"cachedContents/{cache_id}")
+    if cache is None:
+        return JSONResponse(status_code=404, content={"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+    return _cache_view(cache)
+
+
+@app.patch("/{api_version}/cachedContents/{cache_id}")
+async def update_cache(api_version: str, cache_id: str, request: Request):
+    cache = caches.get(f"cachedContents/{cache_id}")
+    if cache is None:
+        return JSONResponse(status_code=404, content={"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+    body = await request.json()
+    cache["expireTime"] = _expire_time(body.get("ttl", "3600s"))
+    cache["updateTime"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    stats["caches_refreshed"] += 1
+    return _cache_view(cache)
+
+
+@app.delete("/{api_version}/cachedContents/{cache_id}")
+async def delete_cache(api_version: str, cache_id: str):
+    caches.pop(f"cachedContents/{cache_id}", None)
+    stats["caches_deleted"] += 1
+    return {}
+
+
+@app.get("/__stub/stats")
+async def get_stats():
+    return dict(stats)
+
+
+@app.post("/__stub/reset")
+async def reset_stats():
+    stats.clear()
+    caches.clear()
+    return {"success": True}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Local Gemini stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", default="lognormal:0.8:0.4",
+                        help="fixed:S | uniform:LO:HI | normal:MU:SIGMA | lognormal:MEDIAN:SIGMA (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--fenced-rate", type=float, default=0.3)
+    parser.add_argument("--prefill-per-1k", type=float, default=0.0,
+                        help="extra latency in seconds per 1k uncached input tokens")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    config.latency = LatencyModel.parse(args.latency)
+    config.error_rate = args.error_rate
+    config.malformed_rate = args.malformed_rate
+    config.fenced_rate = args.fenced_rate
+    config.prefill_per_1k = args.prefill_per_1k
+    config.seed = args.seed
+    rng.seed(args.seed)
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Realistic mixed traffic for the AI service endpoints
+Weights roughly follow what the Node backend sends in production: chat dominates. Every
+request comes from one of SIMULATED_USERS students, as the backend forwards them.
+"""
+
+import random
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple
+
+SIMULATED_USERS = 500
+
+TOPICS = ["Photosynthesis", "Binary search trees", "Thermodynamics", "Indian Constitution",
+          "Organic chemistry", "Linear algebra", "Operating systems", "Microeconomics"]
+
+CHAT_MESSAGES = [
+    "I'm so stressed about my exam tomorrow and can't sleep",
+    "How do I prepare for a software internship interview?",
+    "I can't afford my tuition fees this semester, any scholarships?",
+    "Looking for a study group for my DBMS course",
+    "Can you help me plan my assignment deadlines this week?",
+    "I feel lonely since moving to a new city for college",
+    "What skills do I need for a data analyst job?",
+    "Hi! What can you do?",
+]
+
+
+@dataclass
+class Scenario:
+    name: str
+    path: str
+    weight: int
+    payload: Callable[[random.Random], Dict[str, Any]]
+
+    def request(self, rng: random.Random) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Body and headers of one request from a random simulated user"""
+        body = self.payload(rng)
+        user_id = body.setdefault("userId", _user(rng))
+        return body, {"X-User-Id": user_id}
+
+
+def _user(rng: random.Random) -> str:
+    return f"user-{rng.randint(1, SIMULATED_USERS)}"
+
+
+def _chat(rng: random.Random) -> Dict[str, Any]:
+    history = []
+    for i in range(rng.randint(0, 10)):
+        role = "user" if i % 2 == 0 else "assistant"
+        history.append({"role": role, "content": rng.choice(CHAT_MESSAGES)})
+    return {
+        "message": rng.choice(CHAT_MESSAGES),
+        "userId": _user(rng),
+        "conversationHistory": history,
+        "userProfile": {"name": "Student", "profile": {"isFirstGen": rng.random() < 0.3, "isMigrant": rng.random() < 0.2}},
+    }
+
+
+def _mood(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "journalEntry": "Today was long. I studied for hours but couldn't focus, and I skipped lunch. " * rng.randint(1, 4),
+        "recentMoods": [rng.randint(1, 10) for _ in range(rng.randint(3, 14))],
+    }
+
+
+def _skills(rng: random.Random) -> Dict[str, Any]:
+    skills = ["Python", "SQL", "Excel", "React", "Statistics", "Git", "Communication"]
+    return {
+        "currentSkills": [{"name": s, "level": rng.randint(10, 90)} for s in rng.sample(skills, rng.randint(2, 5))],
+        "targetRole": rng.choice(["Data Analyst", "Frontend Developer", "ML Engineer"]),
+    }
+
+
+def _distill(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "content": "Photosynthesis converts light energy into chemical energy stored in glucose. " * rng.randint(10, 60),
+        "contentType": "notes",
+        "learningStyle": rng.choice(["visual", "auditory", "reading", "kinesthetic"]),
+        "format": rng.choice([None, "summary", "quiz", "flashcards", "mind-map"]),
+    }
+
+
+def _flashcards(rng: random.Random) -> Dict[str, Any]:
+    return {"topic": rng.choice(TOPICS), "count": rng.choice([5, 5, 10, 20])}
+
+
+def _search_scholarships(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "country": "India",
+        "educationLevel": rng.choice(["undergraduate", "postgraduate"]),
+        "field": rng.choice(["engineering", "medical", "arts", None]),
+        "category": rng.choice(["merit", "need-based", "women", None]),
+    }
+
+
+def _debt(rng: random.Random) -> Dict[str, Any]:
+    loans = [
+        {"name": f"Loan {i}", "amount": rng.randint(20000, 600000), "interestRate": rng.uniform(7, 18),
+         "minPayment": rng.randint(1000, 8000)}
+        for i in range(rng.randint(1, 4))
+    ]
+    return {"loans": loans, "monthlyBudget": rng.randint(5000, 30000), "strategy": rng.choice(["avalanche", "snowball"])}
+
+
+def _interview(rng: random.Random) -> Dict[str, Any]:
+    return {"role": rng.choice(["Software Engineer", "Product Manager", "Data Analyst"]),
+            "experience": rng.choice(["entry", "mid"]), "questionType": rng.choice(["behavioral", "technical"])}
+
+
+def _study_plan(rng: random.Random) -> Dict[str, Any]:
+    return {"topic": rng.choice(TOPICS), "duration": rng.choice(["1 hour", "2 hours", "3 hours"]),
+            "goal": rng.choice(["exam-prep", "deep-learning", "quick-review"])}
+
+
+def _gigs(rng: random.Random) -> Dict[str, Any]:
+    return {"skills": rng.sample(["Python", "Tutoring", "Design", "Writing", "Video editing"], 2),
+            "availability": "10-15 hours/week", "preferredType": rng.choice(["online", "offline", "both"])}
+
+
+def _grant(rng: random.Random) -> Dict[str, Any]:
+    return {"projectTitle": "Low-cost water quality sensor", "grantType": "research",
+            "projectDescription": "A student-built IoT sensor network for monitoring village wells. " * 5,
+            "requestedAmount": rng.choice([50000, 150000, 400000])}
+
+
+def _wellness(rng: random.Random) -> Dict[str, Any]:
+    return {"wellness": {"sleepHours": rng.randint(4, 9), "waterGlasses": rng.randint(2, 10),
+                         "exerciseMinutes": rng.randint(0, 60), "stressLevel": rng.randint(1, 10), "caffeine": rng.randint(0, 5)},
+            "moodHistory": [rng.randint(1, 10) for _ in range(rng.randint(3, 30))], "averageMood": rng.uniform(3, 8)}
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario("chat", "/api/chat", 40, _chat),
+    Scenario("analyze-mood", "/api/analyze-mood", 8, _mood),
+    Scenario("generate-flashcards", "/api/generate-flashcards", 8, _flashcards),
+    Scenario("distill-content", "/api/distill-content", 6, _distill),
+    Scenario("debt-calculator", "/api/debt-calculator", 5, _debt),
+    Scenario("search-scholarships", "/api/search-scholarships", 5, _search_scholarships),
+    Scenario("mock-interview", "/api/mock-interview", 5, _interview),
+    Scenario("study-plan", "/api/study-plan", 5, _study_plan),
+    Scenario("analyze-skills", "/api/analyze-skills", 4, _skills),
+    Scenario("micro-gigs", "/api/micro-gigs", 3, _gigs),
+    Scenario("wellness-insights", "/api/wellness-insights", 3, _wellness),
+    Scenario("ethics-check", "/api/ethics-check", 2, lambda rng: {"text": "My essay on climate policy. " * rng.randint(20, 200)}),
+    Scenario("project-forge", "/api/project-forge", 2, lambda rng: {"skill": rng.choice(["React", "SQL", "Docker"])}),
+    Scenario("grant-writer", "/api/grant-writer", 1, _grant),
+    Scenario("digital-detox", "/api/digital-detox", 1,
+             lambda rng: {"screenTime": {"social": rng.randint(1, 6), "entertainment": rng.randint(1, 4), "productive": 3}}),
+    Scenario("subscription-audit", "/api/subscription-audit", 1,
+             lambda rng: {"subscriptions": [{"name": "Netflix", "cost": 649, "usage": "low"}], "monthlyIncome": 15000}),
+    Scenario("find-peer-matches", "/api/find-peer-matches", 1,
+             lambda rng: {"userId": _user(rng), "interests": ["AI"], "skills": ["Python"], "seekingSkills": ["Design"]}),
+]
+
+
+def select(mix: str = "") -> List[Scenario]:
+    """Apply an optional 'name=weight,...' override; weight 0 drops a scenario"""
+    overrides = {}
+    for item in filter(None, (p.strip() for p in mix.split(","))):
+        name, _, weight = item.partition("=")
+        overrides[name] = int(weight)
+    unknown = set(overrides) - {s.name for s in SCENARIOS}
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    chosen = []
+    for scenario in SCENARIOS:
+        weight = overrides.get(scenario.name, scenario.weight)
+        if weight > 0:
+            chosen.append(Scenario(scenario.name, scenario.path, weight, scenario.payload))
+    return chosen
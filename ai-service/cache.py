@@ -0,0 +1,61 @@
+"""
+Ascendra - Shared response cache
+SQLite (WAL mode) key/value store so every uvicorn worker process sees the same entries
+"""
+
+import sqlite3
+import time
+from typing import Optional
+
+from storage import SQLiteStore
+
+
+class SharedCache(SQLiteStore):
+    """TTL cache backed by a local SQLite file; safe to use from several processes"""
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS cache ("
+        " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires_at)",
+    )
+
+    def __init__(self, path: str, max_entries: int = 50_000, purge_every: int = 500):
+        super().__init__(path)
+        self.max_entries = max_entries
+        self.purge_every = purge_every
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: float):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self._purge(conn)
+
+    def _purge(self, conn: sqlite3.Connection):
+        """Drop expired rows, then the soonest-to-expire ones above max_entries"""
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            " SELECT key FROM cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._connection().execute("DELETE FROM cache")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
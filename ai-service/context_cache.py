@@ -0,0 +1,148 @@
+"""
+Ascendra - Gemini context caching
+Static prompt prefixes (agent system prompts, format instructions) are sent as a
+system_instruction. When a prefix is long enough for Gemini's explicit context caching it is
+uploaded once as a CachedContent per (model, prefix hash) and referenced by name; caches are
+refreshed before their TTL runs out. Live caches of current prefixes made by other workers are
+adopted at startup. Only caches this process created are ever deleted; others (other workers,
+older deployments sharing the key) are left to expire.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+DISPLAY_PREFIX = "ascendra:"
+
+logger = logging.getLogger("ascendra.context_cache")
+
+
+def prefix_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+@dataclass
+class _Entry:
+    name: Optional[str]  # None: creation failed, retry after `expires`
+    expires: float
+
+
+class ContextCacheManager:
+    def __init__(self, client_factory: Callable[[], Any], ttl: int = 3600, refresh_margin: int = 300,
+                 min_chars: int = 4096, enabled: bool = True, retry_after: int = 600):
+        self.client_factory = client_factory
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.min_chars = min_chars      # Gemini rejects caches below ~1024 tokens (~4096 chars)
+        self.enabled = enabled
+        self.retry_after = retry_after
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._pending = set()  # keys being created or refreshed; the lock is not held over the call
+        self._created = set()  # names of caches this process created
+        self._lock = threading.Lock()
+
+    def cached_name(self, model: str, system_instruction: str) -> Optional[str]:
+        """Name of a live cache holding this prefix for this model, creating or refreshing it;
+        None when the prefix should be sent inline"""
+        if not self.enabled or len(system_instruction) < self.min_chars:
+            return None
+        key = (model, prefix_hash(system_instruction))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.expires - now > self.refresh_margin:
+                return entry.name
+            live = entry.name if entry and entry.name and entry.expires > now else None
+            if key in self._pending:
+                return live  # another thread is on it; use the old cache (or inline) meanwhile
+            self._pending.add(key)
+        try:
+            if live:
+                expires = self._refresh(live)
+                entry = _Entry(live, expires)
+            else:
+                entry = self._create(model, system_instruction, key[1])
+        except Exception as e:
+            logger.warning("Context cache error (%s): %s", model, e)
+            entry = _Entry(None, time.time() + self.retry_after)
+        with self._lock:
+            self._pending.discard(key)
+            self._entries[key] = entry
+        return entry.name
+
+    def _create(self, model: str, system_instruction: str, digest: str) -> _Entry:
+        from google.genai import types
+        cache = self.client_factory().caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                system_instruction=system_instruction,
+                display_name=DISPLAY_PREFIX + digest,
+                ttl=f"{self.ttl}s",
+            ),
+        )
+        with self._lock:
+            self._created.add(cache.name)
+        return _Entry(cache.name, time.time() + self.ttl)
+
+    def _refresh(self, name: str) -> float:
+        from google.genai import types
+        self.client_factory().caches.update(name=name, config=types.UpdateCachedContentConfig(ttl=f"{self.ttl}s"))
+        return time.time() + self.ttl
+
+    def _delete(self, name: str):
+        """Delete a cache if this process created it; others are only forgotten"""
+        with self._lock:
+            if name not in self._created:
+                return
+            self._created.discard(name)
+        try:
+            self.client_factory().caches.delete(name=name)
+        except Exception as e:
+            logger.warning("Context cache delete error (%s): %s", name, e)
+
+    def invalidate(self, model: Optional[str] = None):
+        """Forget caches (deleting the ones this process created), e.g. after a cached_content
+        call failed because one expired"""
+        with self._lock:
+            stale = [key for key in self._entries if model is None or key[0] == model]
+            names = [self._entries.pop(key).name for key in stale]
+        for name in filter(None, names):
+            self._delete(name)
+
+    def sync(self, prefixes: Iterable[str]):
+        """Adopt live caches of current prefixes (from other workers or a previous run). Caches
+        of other prefixes, e.g. from before a prompt edit, are deleted only if this process
+        created them, so at startup none are: they expire after their TTL."""
+        if not self.enabled:
+            return
+        prefixes = list(prefixes)
+        wanted = {prefix_hash(p) for p in prefixes if len(p) >= self.min_chars}
+        if not wanted:
+            logger.info("No static prefix reaches %d chars (longest %d); context caching stays idle",
+                        self.min_chars, max(map(len, prefixes), default=0))
+        try:
+            for cache in self.client_factory().caches.list():
+                display = cache.display_name or ""
+                if not display.startswith(DISPLAY_PREFIX):
+                    continue
+                digest = display[len(DISPLAY_PREFIX):]
+                model = (cache.model or "").split("/")[-1]
+                if digest in wanted and cache.expire_time:
+                    with self._lock:
+                        self._entries.setdefault((model, digest), _Entry(cache.name, cache.expire_time.timestamp()))
+                else:
+                    self._delete(cache.name)
+        except Exception as e:
+            logger.warning("Context cache sync error: %s", e)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "minChars": self.min_chars,
+                "caches": [{"model": model, "prefix": digest, "name": e.name, "expiresIn": round(e.expires - time.time())}
+                           for (model, digest), e in self._entries.items()],
+            }
@@ -0,0 +1,191 @@
+"""
+Ascendra - Request deadlines and cancellation
+A caller may send X-Request-Timeout-Ms with the time it is still willing to wait. The request
+runs under a CallBudget. When the deadline passes or the client disconnects, the endpoint task
+is cancelled and the budget is marked so LLM calls that have not started yet are refused:
+queued executor jobs, fan-out branches and follow-up calls. An expired deadline is answered
+with 504; a disconnected client gets nothing.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+HEADER = b"x-request-timeout-ms"
+
+_budget = contextvars.ContextVar("call_budget", default=None)
+
+
+class RequestCancelled(Exception):
+    """Raised instead of starting an LLM call for a request nobody is waiting for"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Request {reason}; LLM call skipped")
+        self.reason = reason
+
+
+class DeadlineStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"with_deadline": 0, "deadline_exceeded": 0, "client_disconnects": 0,
+                       "llm_calls_avoided": 0, "llm_calls_finished_unread": 0}
+
+    def add(self, name: str, n: int = 1):
+        with self._lock:
+            self.counts[name] += n
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+stats = DeadlineStats()
+
+
+class CallBudget:
+    """Deadline and cancellation state of one request; shared with the worker threads its
+    LLM calls run on (asyncio.to_thread copies the context)"""
+
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline  # time.monotonic() value, or None for no deadline
+        self.cancelled: Optional[str] = None
+
+    def remaining(self) -> Optional[float]:
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.cancelled is not None or (self.deadline is not None and self.remaining() <= 0)
+
+    def cancel(self, reason: str):
+        self.cancelled = self.cancelled or reason
+
+    def check(self, min_seconds: float = 0.0):
+        """Raise RequestCancelled (and count an avoided call) if a call should not start now"""
+        if self.cancelled is None and self.deadline is not None and self.remaining() <= min_seconds:
+            self.cancel("deadline exceeded")
+        if self.cancelled is not None:
+            stats.add("llm_calls_avoided")
+            raise RequestCancelled(self.cancelled)
+
+    def finished(self):
+        """A call came back with an answer; count it if nobody is left to read it"""
+        if self.cancelled is not None:
+            stats.add("llm_calls_finished_unread")
+
+    @staticmethod
+    def skipped():
+        """A queued call was cancelled before it reached a worker thread"""
+        stats.add("llm_calls_avoided")
+
+
+def current_budget() -> Optional[CallBudget]:
+    return _budget.get()
+
+
+def detach_budget(timeout: Optional[float]):
+    """Give the current context (a task outliving its request) its own budget of `timeout`
+    seconds from now (None: no deadline), so neither cancelling the request nor its deadline
+    passing stops the task's LLM calls"""
+    _budget.set(CallBudget(time.monotonic() + timeout if timeout is not None else None))
+
+
+class DeadlineMiddleware:
+    """ASGI middleware running each HTTP request as a task it can cancel. It watches the
+    client's connection and the deadline from X-Request-Timeout-Ms (default_timeout seconds
+    when absent, 0 = none, capped at max_timeout)."""
+
+    def __init__(self, app, default_timeout: float = 0.0, max_timeout: float = 300.0,
+                 logger: Optional[logging.Logger] = None):
+        self.app = app
+        self.default_timeout = default_timeout
+        self.max_timeout = max_timeout
+        self.logger = logger or logging.getLogger("ascendra.deadlines")
+
+    def _timeout(self, scope) -> Optional[float]:
+        for name, value in scope.get("headers", []):
+            if name == HEADER:
+                try:
+                    return min(max(0.0, float(value) / 1000), self.max_timeout)
+                except ValueError:
+                    break
+        return self.default_timeout or None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timeout = self._timeout(scope)
+        budget = CallBudget(time.monotonic() + timeout if timeout is not None else None)
+        token = _budget.set(budget)
+        if timeout is not None:
+            stats.add("with_deadline")
+
+        # Read the connection ourselves so a disconnect is seen even while the endpoint is
+        # busy; the endpoint gets the same messages from a queue
+        messages: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+        started = completed = False
+
+        async def pump():
+            while True:
+                try:
+                    message = await receive()
+                except Exception:
+                    message = {"type": "http.disconnect"}
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    return
+
+        async def app_receive():
+            if messages.empty() and disconnected.is_set():
+                return {"type": "http.disconnect"}
+            return await messages.get()
+
+        async def app_send(message):
+            nonlocal started, completed
+            if message["type"] == "http.response.start":
+                started = True
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                completed = True
+            await send(message)
+
+        reader = asyncio.create_task(pump())
+        endpoint = asyncio.create_task(self.app(scope, app_receive, app_send))
+        watch_disconnect = asyncio.create_task(disconnected.wait())
+        try:
+            done, _ = await asyncio.wait({endpoint, watch_disconnect}, timeout=budget.remaining(),
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if endpoint in done or completed:
+                # Finished, or the response is out and only background tasks remain
+                await endpoint
+                return
+            reason = "client disconnected" if disconnected.is_set() else "deadline exceeded"
+            budget.cancel(reason)
+            endpoint.cancel()
+            try:
+                await endpoint
+            except (asyncio.CancelledError, Exception):
+                pass
+            stats.add("client_disconnects" if disconnected.is_set() else "deadline_exceeded")
+            self.logger.warning("Request cancelled: %s", reason,
+                                extra={"path": scope.get("path"), "timeoutMs": round(1000 * timeout) if timeout else None})
+            if not started and not disconnected.is_set():
+                payload = json.dumps({"detail": "Request deadline exceeded", "timeoutMs": round(1000 * timeout)}).encode()
+                await send({"type": "http.response.start", "status": 504, "headers": [
+                    (b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode()),
+                ]})
+                await send({"type": "http.response.body", "body": payload})
+        finally:
+            for task in (endpoint, reader, watch_disconnect):
+                if not task.done():
+                    task.cancel()
+            _budget.reset(token)
+
+
+def metrics() -> Dict[str, Any]:
+    return stats.snapshot()
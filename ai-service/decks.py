@@ -0,0 +1,78 @@
+"""
+Ascendra - Flashcard decks
+Per-topic deck store: cards are generated once, near-duplicate cards are dropped (MinHash
+over the question and answer together) and requests read stable slices by offset.
+"""
+
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from lsh import MinHasher, NearDuplicates
+from storage import SQLiteStore
+
+
+class DeckStore(SQLiteStore):
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS cards ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT NOT NULL, question TEXT NOT NULL,"
+        " answer TEXT NOT NULL, signature BLOB NOT NULL, created_at REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS cards_topic ON cards (topic, id)",
+        "CREATE TABLE IF NOT EXISTS card_bands (topic TEXT NOT NULL, band TEXT NOT NULL, card_id INTEGER NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS card_bands_lookup ON card_bands (topic, band)",
+    )
+
+    def __init__(self, path: str, threshold: float = 0.8, hasher: Optional[MinHasher] = None):
+        super().__init__(path)
+        self.duplicates = NearDuplicates("cards", "card_bands", "card_id", "topic", threshold, hasher)
+
+    @staticmethod
+    def topic_key(topic: str) -> str:
+        """'  Binary Search-Trees!' and 'binary search trees' share a deck"""
+        return " ".join(re.findall(r"[a-z0-9+#]+", topic.lower()))
+
+    def count(self, topic_key: str) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM cards WHERE topic = ?", (topic_key,)).fetchone()[0]
+
+    def add(self, topic_key: str, cards: List[Dict[str, Any]]) -> int:
+        """Append cards that are not near-duplicates of the deck; returns how many were kept"""
+        kept = 0
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for card in cards:
+                    if not isinstance(card, dict) or not card.get("question") or not card.get("answer"):
+                        continue
+                    signature, bands = self.duplicates.signature(f"{card['question']}\n{card['answer']}")
+                    if self.duplicates.is_duplicate(conn, topic_key, signature, bands):
+                        continue
+                    cursor = conn.execute(
+                        "INSERT INTO cards (topic, question, answer, signature, created_at) VALUES (?, ?, ?, ?, ?)",
+                        (topic_key, str(card["question"]), str(card["answer"]),
+                         self.duplicates.hasher.pack(signature), time.time()),
+                    )
+                    self.duplicates.index(conn, topic_key, cursor.lastrowid, bands)
+                    kept += 1
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return kept
+
+    def slice(self, topic_key: str, offset: int, limit: int) -> List[Dict[str, str]]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT question, answer FROM cards WHERE topic = ? ORDER BY id LIMIT ? OFFSET ?",
+                (topic_key, limit, offset),
+            ).fetchall()
+        return [{"question": q, "answer": a} for q, a in rows]
+
+    def questions(self, topic_key: str, limit: int = 30) -> List[str]:
+        """Most recent questions, used to steer generation away from what the deck already has"""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT question FROM cards WHERE topic = ? ORDER BY id DESC LIMIT ?", (topic_key, limit)
+            ).fetchall()
+        return [row[0] for row in rows]
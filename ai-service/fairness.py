@@ -0,0 +1,235 @@
+"""
+Ascendra - Per-user fairness
+Caps how many requests of an endpoint class one user can have in flight and shares a fixed
+number of LLM slots across users with fair queuing: every request gets a virtual finish tag
+(start-time fair queuing), so a user with many queued requests waits behind users with few.
+Clients known only by address (many users behind one NAT or proxy) get their own, larger quotas.
+Per-user state lives in an LRU dict and is evicted once idle, so memory stays bounded.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import json
+import time
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+# Client key of the request being served ("user:<id>" or "ip:<address>"), for accounting
+current_client = contextvars.ContextVar("current_client", default=None)
+
+
+class RateLimitedError(Exception):
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class ClassQuota:
+    max_in_flight: int = 2  # per user, queued requests included
+    cost: float = 1.0       # virtual time one request advances its user by
+
+
+class _UserState:
+    __slots__ = ("in_flight", "finish_tag", "last_seen")
+
+    def __init__(self):
+        self.in_flight: Dict[str, int] = {}
+        self.finish_tag = 0.0
+        self.last_seen = 0.0
+
+
+class FairScheduler:
+    """`quotas` apply to "user:" keys; `anonymous_quotas`, when given, to "ip:" keys"""
+
+    def __init__(self, capacity: int, quotas: Dict[str, ClassQuota], queue_timeout: float = 30.0,
+                 idle_ttl: float = 300.0, max_queue: int = 1000,
+                 anonymous_quotas: Optional[Dict[str, ClassQuota]] = None):
+        if "default" not in quotas or (anonymous_quotas is not None and "default" not in anonymous_quotas):
+            raise ValueError("quotas need a 'default' class")
+        self.capacity = capacity
+        self.quotas = quotas
+        self.anonymous_quotas = anonymous_quotas if anonymous_quotas is not None else quotas
+        self.queue_timeout = queue_timeout
+        self.idle_ttl = idle_ttl
+        self.max_queue = max_queue
+        self._users: "OrderedDict[str, _UserState]" = OrderedDict()
+        self._waiters = []  # heap of (finish tag, seq, future)
+        self._seq = itertools.count()
+        self._active = 0
+        self._virtual = 0.0
+        self.stats = Counter()
+
+    def _user(self, user_id: str, now: float) -> _UserState:
+        state = self._users.get(user_id)
+        if state is None:
+            state = self._users[user_id] = _UserState()
+        else:
+            self._users.move_to_end(user_id)
+        state.last_seen = now
+        self._evict(now)
+        return state
+
+    def _evict(self, now: float):
+        # Oldest first; busy users are rotated to the back instead of dropped
+        for _ in range(len(self._users)):
+            user_id, state = next(iter(self._users.items()))
+            if now - state.last_seen < self.idle_ttl:
+                return
+            if state.in_flight:
+                self._users.move_to_end(user_id)
+                continue
+            del self._users[user_id]
+            self.stats["evicted"] += 1
+
+    def _release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)  # the slot moves to this waiter
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self, user_id: str, endpoint_class: str):
+        """Hold one LLM slot for the duration; raises RateLimitedError when the user is over quota
+        or the queue cannot serve the request in time"""
+        anonymous = user_id.startswith("ip:")
+        quotas = self.anonymous_quotas if anonymous else self.quotas
+        quota = quotas.get(endpoint_class) or quotas["default"]
+        now = time.monotonic()
+        user = self._user(user_id, now)
+        if user.in_flight.get(endpoint_class, 0) >= quota.max_in_flight:
+            self.stats["rejected_in_flight"] += 1
+            raise RateLimitedError(
+                f"Too many concurrent {endpoint_class} requests "
+                f"(limit {quota.max_in_flight} per {'address' if anonymous else 'user'})", retry_after=2)
+
+        start = max(self._virtual, user.finish_tag)
+        user.finish_tag = start + quota.cost
+        user.in_flight[endpoint_class] = user.in_flight.get(endpoint_class, 0) + 1
+        holding = False
+        try:
+            if self._active < self.capacity and not self._waiters:
+                self._active += 1
+            else:
+                if len(self._waiters) >= self.max_queue:
+                    self.stats["rejected_queue_full"] += 1
+                    raise RateLimitedError("AI service is busy, please retry shortly", retry_after=5)
+                future = asyncio.get_running_loop().create_future()
+                heapq.heappush(self._waiters, (user.finish_tag, next(self._seq), future))
+                self.stats["queued"] += 1
+                try:
+                    await asyncio.wait_for(future, self.queue_timeout)
+                except asyncio.TimeoutError:
+                    self.stats["rejected_timeout"] += 1
+                    raise RateLimitedError("AI service is busy, please retry shortly", retry_after=5)
+                except asyncio.CancelledError:
+                    if future.done() and not future.cancelled():
+                        self._release()  # handed a slot just as the client went away
+                    raise
+            holding = True
+            self._virtual = max(self._virtual, start)
+            self.stats["admitted"] += 1
+            yield
+        finally:
+            if holding:
+                self._release()
+            remaining = user.in_flight.get(endpoint_class, 1) - 1
+            if remaining:
+                user.in_flight[endpoint_class] = remaining
+            else:
+                user.in_flight.pop(endpoint_class, None)
+            user.last_seen = time.monotonic()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"capacity": self.capacity, "active": self._active, "queued": len(self._waiters),
+                "users": len(self._users), **self.stats}
+
+
+def client_key(scope, user_id: Optional[str] = None, trusted: bool = False) -> str:
+    """"user:" and the X-User-Id header, else the given (body) userId, for a trusted caller;
+    otherwise, or with neither, "ip:" and the client address. Anyone can send either claim,
+    so an untrusted one would let a client pick its quota bucket or spend someone else's."""
+    if trusted:
+        for name, value in scope.get("headers", []):
+            if name == b"x-user-id" and value:
+                return "user:" + value.decode("latin-1")
+        if user_id:
+            return f"user:{user_id}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def _body_user_id(body: bytes) -> Optional[str]:
+    if body[:1] == b"{":
+        try:
+            user_id = json.loads(body).get("userId")
+            return str(user_id) if user_id else None
+        except (ValueError, AttributeError):
+            pass
+    return None
+
+
+class FairnessMiddleware:
+    """ASGI middleware running classified POST requests inside a FairScheduler slot.
+    Requests are keyed by client_key(); `trusted(scope)` says whether the caller may name the
+    user (without it nobody may, and every client is keyed by address). An optional async
+    budget_check(client_key, endpoint_class) hook may raise RateLimitedError to refuse a
+    request before it queues."""
+
+    def __init__(self, app, scheduler: FairScheduler, classify: Callable[[str], Optional[str]],
+                 budget_check: Optional[Callable[[str, str], Awaitable[None]]] = None,
+                 trusted: Optional[Callable[[Any], bool]] = None):
+        self.app = app
+        self.scheduler = scheduler
+        self.classify = classify
+        self.budget_check = budget_check
+        self.trusted = trusted
+
+    async def __call__(self, scope, receive, send):
+        endpoint_class = self.classify(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if endpoint_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Buffer the body to find the user, then replay it to the endpoint
+        chunks, more = [], True
+        while more:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            more = message.get("more_body", False)
+        body = b"".join(chunks)
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if replayed:
+                return await receive()
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        trusted = self.trusted is not None and self.trusted(scope)
+        client = client_key(scope, _body_user_id(body) if trusted else None, trusted)
+        token = current_client.set(client)
+        try:
+            if self.budget_check is not None:
+                await self.budget_check(client, endpoint_class)
+            async with self.scheduler.slot(client, endpoint_class):
+                await self.app(scope, replay, send)
+        except RateLimitedError as e:
+            payload = json.dumps({"detail": str(e), "retryAfter": e.retry_after}).encode()
+            await send({"type": "http.response.start", "status": 429, "headers": [
+                (b"content-type", b"application/json"), (b"retry-after", str(e.retry_after).encode()),
+                (b"content-length", str(len(payload)).encode()),
+            ]})
+            await send({"type": "http.response.body", "body": payload})
+        finally:
+            current_client.reset(token)
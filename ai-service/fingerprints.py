@@ -0,0 +1,167 @@
+"""
+Ascendra - Submission fingerprints
+Winnowing over word k-grams (as in MOSS): each submission is reduced to a sparse set of
+k-gram hashes with character offsets, kept in an on-disk postings table keyed by hash.
+Any passage of at least k + window - 1 words shared with an earlier submission is found.
+"""
+
+import hashlib
+import re
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from storage import SQLiteStore
+
+_WORD = re.compile(r"\w+")
+
+# (hash, start, end): a selected k-gram and its character span in the text
+Fingerprint = Tuple[int, int, int]
+
+
+class Winnower:
+    def __init__(self, k: int = 5, window: int = 4):
+        self.k = k
+        self.window = window
+
+    @property
+    def guarantee(self) -> int:
+        """Shared runs of at least this many words are always detected"""
+        return self.k + self.window - 1
+
+    def fingerprints(self, text: str) -> List[Fingerprint]:
+        tokens = [(m.group().lower(), m.start(), m.end()) for m in _WORD.finditer(text)]
+        if len(tokens) < self.k:
+            return []
+        grams = []
+        for i in range(len(tokens) - self.k + 1):
+            digest = hashlib.blake2b(" ".join(t[0] for t in tokens[i:i + self.k]).encode(), digest_size=8).digest()
+            # 63 bits so the hash fits a signed SQLite INTEGER
+            grams.append((int.from_bytes(digest, "little") >> 1, tokens[i][1], tokens[i + self.k - 1][2]))
+
+        # Keep the rightmost minimum of every window of consecutive k-grams
+        selected, last = [], -1
+        for i in range(max(1, len(grams) - self.window + 1)):
+            span = range(i, min(i + self.window, len(grams)))
+            j = min(span, key=lambda x: (grams[x][0], -x))
+            if j != last:
+                selected.append(grams[j])
+                last = j
+        return selected
+
+
+class FingerprintIndex(SQLiteStore):
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS documents ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT, doc_key TEXT NOT NULL UNIQUE, owner TEXT,"
+        " length INTEGER NOT NULL, created_at REAL NOT NULL)",
+        # Clustered by hash, so one lookup reads a contiguous postings list
+        "CREATE TABLE IF NOT EXISTS postings ("
+        " hash INTEGER NOT NULL, doc_id INTEGER NOT NULL, start INTEGER NOT NULL, end INTEGER NOT NULL,"
+        " PRIMARY KEY (hash, doc_id, start)) WITHOUT ROWID",
+    )
+
+    def __init__(self, path: str, winnower: Optional[Winnower] = None, max_df: int = 50, min_hits: int = 2,
+                 gap: int = 16):
+        super().__init__(path)
+        self.winnower = winnower or Winnower()
+        self.max_df = max_df      # hashes with more postings than this are boilerplate
+        self.min_hits = min_hits  # fingerprints a passage needs, so one common phrase is not a match
+        self.gap = gap            # characters between fingerprints that still join one passage
+
+    def add(self, doc_key: str, owner: Optional[str], text: str,
+            fingerprints: Optional[List[Fingerprint]] = None) -> bool:
+        """Index a submission; False when doc_key is already indexed"""
+        fingerprints = self.winnower.fingerprints(text) if fingerprints is None else fingerprints
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO documents (doc_key, owner, length, created_at) VALUES (?, ?, ?, ?)",
+                    (doc_key, owner, len(text), time.time()),
+                )
+                if cursor.rowcount:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO postings (hash, doc_id, start, end) VALUES (?, ?, ?, ?)",
+                        [(h, cursor.lastrowid, start, end) for h, start, end in fingerprints],
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return bool(cursor.rowcount)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def _postings(self, hashes: List[int], doc_key: Optional[str],
+                  exclude_owner: Optional[str]) -> Iterable[Tuple[int, str, int, int]]:
+        with self._lock:
+            conn = self._connection()
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                # Boilerplate hashes (more than max_df postings) are dropped by SQLite, not fetched
+                query = (f"SELECT p.hash, d.doc_key, p.start, p.end FROM postings p JOIN documents d ON d.id = p.doc_id"
+                         f" WHERE p.hash IN ({placeholders}) AND p.hash NOT IN ("
+                         f"SELECT hash FROM postings WHERE hash IN ({placeholders}) GROUP BY hash HAVING COUNT(*) > ?)")
+                params = [*chunk, *chunk, self.max_df]
+                if doc_key is not None:
+                    query += " AND d.doc_key != ?"
+                    params.append(doc_key)
+                if exclude_owner is not None:
+                    query += " AND (d.owner IS NULL OR d.owner != ?)"
+                    params.append(exclude_owner)
+                yield from conn.execute(query, params).fetchall()
+
+    def matches(self, fingerprints: List[Fingerprint], doc_key: Optional[str] = None,
+                exclude_owner: Optional[str] = None, limit: int = 5) -> List[Dict[str, Any]]:
+        """Earlier documents sharing passages with these fingerprints, most overlapping first; the
+        submission's own doc_key (when it was indexed before) never matches.
+        Passages carry character offsets in the query (start/end) and the source (sourceStart/sourceEnd)."""
+        positions = defaultdict(list)
+        for h, start, end in fingerprints:
+            positions[h].append((start, end))
+
+        hits = defaultdict(list)
+        for h, doc_key, source_start, source_end in self._postings(list(positions), doc_key, exclude_owner):
+            for start, end in positions[h]:
+                hits[doc_key].append((start, end, source_start, source_end))
+
+        results = []
+        for doc_key, doc_hits in hits.items():
+            passages = self._passages(doc_hits)
+            if passages:
+                results.append({
+                    "documentId": doc_key,
+                    "matchedChars": sum(p["end"] - p["start"] for p in passages),
+                    "passages": passages,
+                })
+        results.sort(key=lambda r: r["matchedChars"], reverse=True)
+        return results[:limit]
+
+    def _passages(self, doc_hits: List[Tuple[int, int, int, int]]) -> List[Dict[str, int]]:
+        passages, current, count = [], None, 0
+        for start, end, source_start, source_end in sorted(doc_hits):
+            if current and start <= current[1] + self.gap:
+                current = [current[0], max(current[1], end), min(current[2], source_start), max(current[3], source_end)]
+                count += 1
+                continue
+            if current and count >= self.min_hits:
+                passages.append(current)
+            current, count = [start, end, source_start, source_end], 1
+        if current and count >= self.min_hits:
+            passages.append(current)
+        return [{"start": p[0], "end": p[1], "sourceStart": p[2], "sourceEnd": p[3]} for p in passages]
+
+
+def covered(intervals: Iterable[Tuple[int, int]]) -> int:
+    """Characters covered by the union of [start, end) intervals"""
+    total, reach = 0, -1
+    for start, end in sorted(intervals):
+        if end > reach:
+            total += end - max(start, reach)
+            reach = end
+    return total
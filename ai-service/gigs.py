@@ -0,0 +1,173 @@
+"""
+Ascendra - Micro-gig catalog
+A curated list of student gigs (gigs_catalog.json) with skill synonyms, indexed by skill.
+Matching, hour filtering, online/offline facets and earnings-based ranking run locally, so
+the same profile always gets the same gigs; the model only adds optional tips. The file is
+re-read when it changes.
+"""
+
+import hashlib
+import heapq
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from skills import normalize
+
+logger = logging.getLogger("ascendra.gigs")
+
+OPEN_GIG_MATCH = 0.5  # gigs anyone can do rank as a half match
+GIG_FIELDS = ("id", "title", "platform", "type", "earningPotential", "requirements", "howToStart", "pros", "cons")
+
+
+def parse_hours(availability: str, default: float = 10.0) -> float:
+    """Weekly hours from "10-15 hours/week", "20+ hours/week" or "2 hours/day" (upper bound)"""
+    numbers = [float(n) for n in re.findall(r"\d+(?:\.\d+)?", availability or "")]
+    if not numbers:
+        return default
+    hours = max(numbers)
+    return hours * 7 if "day" in availability.lower() else hours
+
+
+def _rupees(amount: float) -> str:
+    return f"₹{round(amount, -1 if amount < 1000 else -2):,.0f}"
+
+
+class _Index:
+    """One loaded version of the catalog"""
+
+    def __init__(self, data: Dict[str, Any], version: str):
+        self.version = version
+        self.tips: List[str] = data.get("tips", [])
+        self.aliases: Dict[str, str] = {}
+        for skill, aliases in data.get("skills", {}).items():
+            for alias in (skill, *aliases):
+                self.aliases.setdefault(normalize(alias), skill)
+
+        self.gigs: List[Dict[str, Any]] = []
+        self.by_skill: Dict[str, List[int]] = {}
+        self.open: List[int] = []  # gigs with no skill requirement
+        for gig in data["gigs"]:
+            if gig.get("type") not in ("online", "offline"):
+                raise ValueError(f"gig {gig.get('id')!r}: type must be online or offline")
+            i = len(self.gigs)
+            required = tuple(self.skill(s) or normalize(s) for s in gig.get("skills", ()))
+            any_of = frozenset(self.skill(s) or normalize(s) for s in gig.get("anySkills", ()))
+            low, high = gig.get("rate", (0, 0))
+            min_hours, max_hours = gig.get("hours", (0, 40))
+            self.gigs.append({**gig, "_required": required, "_any": any_of, "_rate": (low + high) / 2,
+                              "_hours": (min_hours, max_hours)})
+            for skill in set(required) | any_of:
+                self.by_skill.setdefault(skill, []).append(i)
+            if not required and not any_of:
+                self.open.append(i)
+
+    def skill(self, name: str) -> Optional[str]:
+        key = normalize(name)
+        if key in self.aliases:
+            return self.aliases[key]
+        # "Python (pandas)" or "basic video editing": the longest known alias inside
+        words = f" {key} "
+        found = [(len(alias), skill) for alias, skill in self.aliases.items() if len(alias) > 2 and f" {alias} " in words]
+        return max(found)[1] if found else None
+
+
+class GigCatalog:
+    """Skill-indexed gig catalog, reloaded when the file's mtime changes (checked at most
+    every reload_interval seconds). A broken file keeps the previous version."""
+
+    def __init__(self, path: str, reload_interval: float = 5.0, min_match: float = 0.5):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.min_match = min_match
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self._index: Optional[_Index] = None
+        self._reload()
+
+    def _reload(self):
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.path.getmtime(self.path)
+            if mtime == self._mtime:
+                return
+            self._mtime = mtime
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            index = _Index(json.loads(raw), hashlib.sha1(raw).hexdigest()[:12])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if self._index is None:
+                raise
+            logger.error("Gig catalog error, keeping version %s: %s", self._index.version, e)
+            return
+        self._index = index
+        logger.info("Gig catalog loaded: %d gigs, version %s", len(index.gigs), index.version)
+
+    def index(self) -> _Index:
+        with self._lock:
+            if time.monotonic() - self._checked_at > self.reload_interval:
+                self._reload()
+            return self._index
+
+    def match(self, skills: List[str], availability: str = "", preferred_type: str = "both",
+              limit: int = 10) -> Dict[str, Any]:
+        """Top gigs for a profile, ranked by skill match times expected weekly earnings"""
+        index = self.index()
+        held = {index.skill(s) or normalize(s) for s in skills if str(s).strip()}
+        hours = parse_hours(availability)
+
+        candidates = set(index.open)
+        for skill in held:
+            candidates.update(index.by_skill.get(skill, ()))
+
+        facets = {"online": 0, "offline": 0}
+        ranked: List[Tuple[float, float, str, int, float]] = []
+        for i in candidates:
+            gig = index.gigs[i]
+            required, any_of = gig["_required"], gig["_any"]
+            slots = len(required) + (1 if any_of else 0)
+            if slots:
+                have = sum(1 for s in required if s in held) + (1 if any_of & held else 0)
+                match = have / slots
+            else:
+                match = OPEN_GIG_MATCH
+            min_hours, max_hours = gig["_hours"]
+            if match < self.min_match or min_hours > hours:
+                continue
+            facets[gig["type"]] += 1
+            if preferred_type in ("online", "offline") and gig["type"] != preferred_type:
+                continue
+            weekly_hours = min(hours, max_hours)
+            ranked.append((match * gig["_rate"] * weekly_hours, match, gig["id"], i, weekly_hours))
+
+        top = heapq.nlargest(limit, ranked)
+        gigs = []
+        for _, match, _, i, weekly_hours in top:
+            gig = index.gigs[i]
+            low, high = gig.get("rate", (0, 0))
+            gigs.append({
+                **{k: gig[k] for k in GIG_FIELDS if k in gig},
+                "skillMatch": round(100 * match),
+                "matchedSkills": sorted(s for s in (*gig["_required"], *gig["_any"]) if s in held),
+                "missingSkills": [s for s in gig["_required"] if s not in held],
+                "weeklyHours": weekly_hours,
+                "weeklyEarnings": [round(low * weekly_hours), round(high * weekly_hours)],
+            })
+        best = gigs[0] if gigs else None
+        return {
+            "gigs": gigs,
+            "topRecommendation": f"{best['title']} ({best['platform']})" if best else
+                                 "No catalog gig fits this profile yet; try adding more skills or hours",
+            "weeklyEarningEstimate": (f"{_rupees(best['weeklyEarnings'][0])} - {_rupees(best['weeklyEarnings'][1])}"
+                                      if best else "₹0"),
+            "tips": list(index.tips),
+            "facets": {"type": facets},
+            "availableHours": hours,
+            "recognizedSkills": sorted(s for s in held if s in index.by_skill),
+            "catalogVersion": index.version,
+        }
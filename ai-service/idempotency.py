@@ -0,0 +1,281 @@
+"""
+Ascendra - Idempotency keys
+A POST carrying an Idempotency-Key header runs at most once per key, user and path within a
+TTL. The first request generates. A retry that arrives while it runs waits for the same
+answer: through the running task in this worker, or by polling the shared store in another.
+Later retries get the stored response at once. A generation keeps running when the client
+that started it disconnects or its X-Request-Timeout-Ms deadline passes (the client gets its 504),
+bounded by generation_timeout, so its retry still finds the answer. Only answers that depend on
+the request alone (2xx, 400, 404, 422) are kept; a 429, 408 or 5xx is not, so retrying after
+a rejection or failure runs again.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from deadlines import detach_budget
+from fairness import _body_user_id, client_key
+from serialization import render_json
+from storage import SQLiteStore
+
+HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+STORED_ERRORS = frozenset({400, 404, 422})  # same body, same answer
+
+
+def _storable(status: int) -> bool:
+    return 200 <= status < 300 or status in STORED_ERRORS
+
+
+class IdempotencyStore(SQLiteStore):
+    """Responses by idempotency key, shared by all worker processes. A row whose status is
+    NULL is a generation in progress, owned by a worker until lease_until."""
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS idempotency ("
+        " key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, status INTEGER, headers TEXT, body BLOB,"
+        " lease_until REAL, expires_at REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS idempotency_expires ON idempotency (expires_at)",
+    )
+
+    def __init__(self, path: str, max_entries: int = 10_000, purge_every: int = 200):
+        super().__init__(path)
+        self.max_entries = max_entries
+        self.purge_every = purge_every
+        self._writes = 0
+
+    def begin(self, key: str, fingerprint: str, lease: float, ttl: float) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """("run", None) when the caller should generate (it now holds the lease), ("wait", None)
+        while another worker does, ("done", response) for a stored response and ("conflict", None)
+        when the key was used for a different request"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT fingerprint, status, headers, body, lease_until FROM idempotency"
+                    " WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row and row[0] != fingerprint:
+                    state, response = "conflict", None
+                elif row and row[1] is not None:
+                    state, response = "done", {"status": row[1], "headers": json.loads(row[2]), "body": row[3]}
+                elif row and row[4] > now:
+                    state, response = "wait", None
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO idempotency (key, fingerprint, lease_until, expires_at)"
+                        " VALUES (?, ?, ?, ?)", (key, fingerprint, now + lease, now + ttl)
+                    )
+                    self._writes += 1
+                    if self._writes % self.purge_every == 0:
+                        self._purge(conn)
+                    state, response = "run", None
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return state, response
+
+    def extend(self, key: str, lease: float):
+        with self._lock:
+            self._connection().execute(
+                "UPDATE idempotency SET lease_until = ? WHERE key = ? AND status IS NULL", (time.time() + lease, key)
+            )
+
+    def finish(self, key: str, response: Dict[str, Any], ttl: float):
+        with self._lock:
+            self._connection().execute(
+                "UPDATE idempotency SET status = ?, headers = ?, body = ?, lease_until = NULL, expires_at = ?"
+                " WHERE key = ?",
+                (response["status"], json.dumps(response["headers"]), response["body"], time.time() + ttl, key),
+            )
+
+    def abandon(self, key: str):
+        """Forget a generation that failed so the next retry runs it again"""
+        with self._lock:
+            self._connection().execute("DELETE FROM idempotency WHERE key = ? AND status IS NULL", (key,))
+
+    def _purge(self, conn: sqlite3.Connection):
+        conn.execute("DELETE FROM idempotency WHERE expires_at <= ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM idempotency WHERE key IN ("
+            " SELECT key FROM idempotency ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+class IdempotencyStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"generated": 0, "replayed": 0, "attached": 0, "waited_on_other_worker": 0,
+                       "conflicts": 0, "not_stored": 0}
+
+    def add(self, name: str, n: int = 1):
+        with self._lock:
+            self.counts[name] += n
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+stats = IdempotencyStats()
+
+
+async def _respond(send, response: Dict[str, Any], replayed: bool = False):
+    headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in response["headers"]]
+    if replayed:
+        headers.append((b"idempotent-replayed", b"true"))
+    await send({"type": "http.response.start", "status": response["status"], "headers": headers})
+    await send({"type": "http.response.body", "body": response["body"]})
+
+
+def _error(status: int, detail: str) -> Dict[str, Any]:
+    payload = json.dumps({"detail": detail}).encode()
+    return {"status": status, "body": payload,
+            "headers": [("content-type", "application/json"), ("content-length", str(len(payload)))]}
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware for POST requests with an Idempotency-Key on paths accepted by
+    `applies`. Responses are kept for ttl seconds; a worker holds a generation's lease for
+    `lease` seconds at a time while it runs. Responses are generated and kept as JSON; an
+    outer EncodingMiddleware renders each replay as MessagePack for a client asking for it.
+    Keys are scoped to client_key(), with the user named only when `trusted(scope)`."""
+
+    def __init__(self, app, store: IdempotencyStore, applies: Callable[[str], bool], ttl: float = 86400.0,
+                 lease: float = 60.0, max_body: int = 1 << 20, poll_interval: float = 0.25,
+                 generation_timeout: Optional[float] = 300.0, logger: Optional[logging.Logger] = None,
+                 trusted: Optional[Callable[[Any], bool]] = None):
+        self.app = app
+        self.trusted = trusted
+        self.store = store
+        self.applies = applies
+        self.ttl = ttl
+        self.lease = lease
+        self.generation_timeout = generation_timeout
+        self.max_body = max_body
+        self.poll_interval = poll_interval
+        self.logger = logger or logging.getLogger("ascendra.idempotency")
+        self._running: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self._tasks = set()
+
+    async def __call__(self, scope, receive, send):
+        key = None
+        if scope["type"] == "http" and scope["method"] == "POST" and self.applies(scope["path"]):
+            key = next((value.decode("latin-1") for name, value in scope.get("headers", []) if name == HEADER), None)
+        if not key:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            await _respond(send, _error(400, f"Idempotency-Key is longer than {MAX_KEY_LENGTH} characters"))
+            return
+
+        chunks, more = [], True
+        while more:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            more = message.get("more_body", False)
+        body = b"".join(chunks)
+        trusted = self.trusted is not None and self.trusted(scope)
+        client = client_key(scope, _body_user_id(body) if trusted else None, trusted)
+        store_key = f"{client} {scope['path']} {key}"
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        while True:
+            running = self._running.get(store_key)
+            if running is not None:
+                state = "conflict" if running[0] != fingerprint else "attach"
+                break
+            state, stored = self.store.begin(store_key, fingerprint, self.lease, self.ttl)
+            if state != "wait":
+                break
+            stats.add("waited_on_other_worker")
+            await asyncio.sleep(self.poll_interval)
+
+        if state == "conflict":
+            stats.add("conflicts")
+            await _respond(send, _error(422, "Idempotency-Key was already used with a different request"))
+        elif state == "done":
+            stats.add("replayed")
+            await _respond(send, stored, replayed=True)
+        elif state == "attach":
+            stats.add("attached")
+            await _respond(send, await asyncio.shield(running[1]), replayed=True)
+        else:
+            stats.add("generated")
+            future = asyncio.get_running_loop().create_future()
+            self._running[store_key] = (fingerprint, future)
+            task = asyncio.create_task(self._generate(scope, body, store_key, future))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            # Shielded: if this client goes away the generation finishes for its retry
+            await _respond(send, await asyncio.shield(future))
+
+    async def _generate(self, scope, body: bytes, store_key: str, future: asyncio.Future):
+        detach_budget(self.generation_timeout)
+        render_json()  # stored once, served to every retry in the format it asks for
+        delivered = False
+        start, chunks = None, []
+
+        async def app_receive():
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await asyncio.Event().wait()  # nobody to disconnect: the answer is kept for retries
+
+        async def app_send(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        keeper = asyncio.create_task(self._keep_leased(store_key))
+        try:
+            await asyncio.wait_for(self.app(scope, app_receive, app_send), self.generation_timeout)
+            response = {"status": start["status"], "body": b"".join(chunks),
+                        "headers": [(name.decode("latin-1"), value.decode("latin-1")) for name, value in start["headers"]]}
+        except asyncio.TimeoutError:
+            self.logger.warning("Idempotent generation timed out", extra={"path": scope.get("path")})
+            response = _error(504, "Generation timed out")
+        except asyncio.CancelledError:
+            self.store.abandon(store_key)
+            future.cancel()
+            raise
+        except Exception:
+            self.logger.exception("Idempotent request failed", extra={"path": scope.get("path")})
+            response = _error(500, "Internal Server Error")
+        finally:
+            keeper.cancel()
+            del self._running[store_key]
+
+        try:
+            if _storable(response["status"]) and len(response["body"]) <= self.max_body:
+                self.store.finish(store_key, response, self.ttl)
+            else:
+                stats.add("not_stored")
+                self.store.abandon(store_key)
+        except sqlite3.Error as e:
+            self.logger.error("Idempotency store error: %s", e)
+        future.set_result(response)
+
+    async def _keep_leased(self, store_key: str):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            self.store.extend(store_key, self.lease)
+
+
+def metrics() -> Dict[str, int]:
+    return stats.snapshot()
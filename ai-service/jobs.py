@@ -0,0 +1,218 @@
+"""
+Ascendra - Background jobs
+SQLite-backed job queue with a bounded worker pool for long-running generators.
+Jobs survive restarts: a job is leased while it runs, and an expired lease (crashed or
+restarted worker) puts it back in the queue.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from storage import SQLiteStore
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class JobStore(SQLiteStore):
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS jobs ("
+        " id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL,"
+        " status TEXT NOT NULL, result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0,"
+        " created_at REAL NOT NULL, started_at REAL, finished_at REAL, lease_until REAL)",
+        "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)",
+        # Who submitted each job (a fairness client key), for the per-client cap
+        "CREATE TABLE IF NOT EXISTS job_clients (id TEXT PRIMARY KEY, client TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS job_clients_client ON job_clients (client)",
+    )
+
+    def submit(self, kind: str, payload: Dict[str, Any], max_queued: int, client: Optional[str] = None,
+               max_per_client: Optional[int] = None) -> str:
+        """Queue a job; QueueFullError when max_queued jobs are waiting, or when `client` already
+        has max_per_client jobs queued or running"""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+                if queued >= max_queued:
+                    raise QueueFullError(f"Job queue is full ({queued} queued)")
+                if client is not None and max_per_client is not None:
+                    active = conn.execute(
+                        "SELECT COUNT(*) FROM job_clients c JOIN jobs j USING (id)"
+                        " WHERE c.client = ? AND j.status IN ('queued', 'running')", (client,)
+                    ).fetchone()[0]
+                    if active >= max_per_client:
+                        raise QueueFullError(f"Too many unfinished jobs (limit {max_per_client})")
+                conn.execute(
+                    "INSERT INTO jobs (id, kind, payload, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                    (job_id, kind, json.dumps(payload), time.time()),
+                )
+                if client is not None:
+                    conn.execute("INSERT INTO job_clients (id, client) VALUES (?, ?)", (job_id, client))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def claim(self, lease: float) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest queued job (or one whose lease expired)"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id, kind, payload FROM jobs"
+                    " WHERE status = 'queued' OR (status = 'running' AND lease_until < ?)"
+                    " ORDER BY created_at LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', started_at = ?, lease_until = ?,"
+                        " attempts = attempts + 1 WHERE id = ?",
+                        (now, now + lease, row[0]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if not row:
+            return None
+        return {"id": row[0], "kind": row[1], "payload": json.loads(row[2])}
+
+    def extend(self, job_id: str, lease: float):
+        with self._lock:
+            self._connection().execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = 'running'", (time.time() + lease, job_id)
+            )
+
+    def finish(self, job_id: str, result: Any = None, error: Optional[str] = None):
+        with self._lock:
+            self._connection().execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL WHERE id = ?",
+                ("failed" if error else "done", None if error else json.dumps(result), error, time.time(), job_id),
+            )
+
+    def requeue(self, job_id: str):
+        """Hand a job back to the queue (e.g. interrupted by shutdown)"""
+        with self._lock:
+            self._connection().execute(
+                "UPDATE jobs SET status = 'queued', lease_until = NULL, attempts = MAX(attempts - 1, 0)"
+                " WHERE id = ? AND status = 'running'",
+                (job_id,),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT id, kind, status, result, error, attempts, created_at, started_at, finished_at"
+                " FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if not row:
+            return None
+        job = dict(zip(("id", "kind", "status", "result", "error", "attempts",
+                        "createdAt", "startedAt", "finishedAt"), row))
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def purge(self, older_than: float):
+        """Drop finished jobs older than the retention window"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (time.time() - older_than,)
+            )
+            conn.execute("DELETE FROM job_clients WHERE id NOT IN (SELECT id FROM jobs)")
+
+
+class JobRunner:
+    """Bounded pool of asyncio workers executing jobs from a JobStore.
+    Handlers are `async def handler(payload) -> result` registered per kind."""
+
+    def __init__(self, store: JobStore, workers: int = 2, lease: float = 300.0, max_attempts: int = 3,
+                 poll_interval: float = 1.0, retention: float = 86400.0):
+        self.store = store
+        self.workers = workers
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks = []
+        self._running = set()
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any]], Awaitable[Any]]):
+        self.handlers[kind] = handler
+
+    def notify(self):
+        """Wake an idle worker after a local submit instead of waiting for the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _keep_leased(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            await asyncio.to_thread(self.store.extend, job_id, self.lease)
+
+    async def _run(self, job: Dict[str, Any]):
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            self.store.finish(job["id"], error=f"Unknown job kind '{job['kind']}'")
+            return
+        keeper = asyncio.create_task(self._keep_leased(job["id"]))
+        self._running.add(job["id"])
+        try:
+            result = await handler(job["payload"])
+            await asyncio.to_thread(self.store.finish, job["id"], result)
+        except asyncio.CancelledError:
+            raise  # shutdown: stop() puts the job back in the queue
+        except Exception as e:
+            await asyncio.to_thread(self.store.finish, job["id"], None, str(e) or type(e).__name__)
+        finally:
+            keeper.cancel()
+            self._running.discard(job["id"])
+
+    async def _worker(self):
+        while True:
+            job = await asyncio.to_thread(self.store.claim, self.lease)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            stored = await asyncio.to_thread(self.store.get, job["id"])
+            if stored and stored["attempts"] > self.max_attempts:
+                await asyncio.to_thread(self.store.finish, job["id"], None, "Gave up after repeated interruptions")
+                continue
+            await self._run(job)
+
+    async def _janitor(self):
+        while True:
+            await asyncio.to_thread(self.store.purge, self.retention)
+            await asyncio.sleep(3600)
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._janitor()))
+
+    async def stop(self):
+        interrupted = list(self._running)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job_id in interrupted:
+            self.store.requeue(job_id)
@@ -0,0 +1,335 @@
+"""
+Ascendra - Journal similarity index
+Journal entries are embedded locally (signed feature hashing of stemmed words and word pairs,
+so no entry text leaves the service) and appended to one float16 file per user, read back
+through mmap. Entry ids, dates and up to `keywords` words of each entry (its most frequent
+non-stopwords, used to label themes) live in SQLite. The full text is not stored, but those
+words are the user's own, so the index is personal data; drop() deletes it. Top-k "entries
+like this one" is a scan of the user's vectors; themes come from spherical k-means over them.
+"""
+
+import hashlib
+import heapq
+import math
+import mmap
+import operator
+import os
+import random
+import re
+import struct
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from storage import SQLiteStore
+
+try:
+    import numpy
+except ImportError:  # optional: vectors are decoded with struct and scored in pure Python
+    numpy = None
+
+_WORD = re.compile(r"[a-z][a-z']+")
+_SUFFIXES = ("ing", "ness", "ed", "s")
+STOPWORDS = frozenset("""
+a about after again all also am an and any are as at be because been before being but by can could
+did do does doing don't down during each even ever every feel feeling felt few for from get got had has
+have having he her here him his how i i'm i've if in into is it it's its just like made make many me
+more most much my myself no not now of off on once one only or other our out over own really same
+she should so some still such than that that's the their them then there these they thing things this
+those through to today too under until up very was we went were what when where which while who why
+will with would yesterday you your
+""".split())
+
+
+def tokens(text: str, surface: Optional[Dict[str, str]] = None) -> List[str]:
+    """Lower-cased content words with a light suffix strip ("exams" and "exam" match);
+    `surface` collects the first spelling seen for each stripped form"""
+    words = []
+    for word in _WORD.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        stem = word
+        for suffix in _SUFFIXES:
+            if len(word) > len(suffix) + 3 and word.endswith(suffix) and not word.endswith(("ss", "us", "is")):
+                stem = word[:-len(suffix)]
+                break
+        if surface is not None:
+            surface.setdefault(stem, word)
+        words.append(stem)
+    return words
+
+
+class HashingEmbedder:
+    """Unit vectors from signed feature hashing of words (weight 1) and adjacent word pairs
+    (weight 0.5), with log-scaled counts"""
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _slot(self, feature: str) -> Tuple[int, float]:
+        h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+        return h % self.dim, (1.0 if (h >> 63) & 1 else -1.0)
+
+    def embed(self, words: Sequence[str]) -> List[float]:
+        features = Counter(words)
+        for pair in zip(words, words[1:]):
+            features[" ".join(pair)] += 0.5
+        vector = [0.0] * self.dim
+        for feature, count in features.items():
+            slot, sign = self._slot(feature)
+            vector[slot] += sign * (1.0 + math.log(count) if count >= 1 else count)
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+
+def _dot(a: Sequence[float], b: Sequence[float]) -> float:
+    return sum(map(operator.mul, a, b))
+
+
+class JournalIndex(SQLiteStore):
+    """Per-user journal vectors: <vectors_dir>/<user hash>.f16 holds row-major float16 rows;
+    SQLite maps rows to entries. Rows are written before their metadata commits, under the
+    same write transaction, so readers in any worker only see complete rows. Removed entries
+    are zeroed and skipped."""
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS journals ("
+        " user_id TEXT PRIMARY KEY, file TEXT NOT NULL, dim INTEGER NOT NULL, rows INTEGER NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS journal_entries ("
+        " user_id TEXT NOT NULL, row INTEGER NOT NULL, entry_id TEXT NOT NULL, at REAL NOT NULL,"
+        " keywords TEXT NOT NULL, removed INTEGER NOT NULL DEFAULT 0,"
+        " PRIMARY KEY (user_id, row), UNIQUE (user_id, entry_id))",
+    )
+
+    def __init__(self, path: str, vectors_dir: str, dim: int = 256, min_words: int = 4,
+                 keywords: int = 8, cache_users: int = 64):
+        super().__init__(path)
+        self.vectors_dir = vectors_dir
+        self.dim = dim
+        self.min_words = min_words          # shorter entries ("Mood logged: Happy") are not indexed
+        self.keywords = keywords
+        self.cache_users = cache_users
+        self._embedders: Dict[int, HashingEmbedder] = {}
+        self._decoded: "OrderedDict[str, Tuple[tuple, Any]]" = OrderedDict()  # user -> ((rows, live), vectors)
+        self._cache_lock = threading.Lock()
+
+    def embedder(self, dim: int) -> HashingEmbedder:
+        if dim not in self._embedders:
+            self._embedders[dim] = HashingEmbedder(dim)
+        return self._embedders[dim]
+
+    def _journal(self, conn, user_id: str) -> Tuple[str, int, int]:
+        row = conn.execute("SELECT file, dim, rows FROM journals WHERE user_id = ?", (user_id,)).fetchone()
+        if row:
+            return row
+        name = hashlib.sha256(user_id.encode()).hexdigest()[:24] + ".f16"
+        conn.execute("INSERT INTO journals (user_id, file, dim, rows) VALUES (?, ?, ?, 0)", (user_id, name, self.dim))
+        return name, self.dim, 0
+
+    def add(self, user_id: str, entries: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Index entries ({"entryId", "text", "at"}); ids already indexed and entries too short
+        to say anything are skipped"""
+        prepared = []
+        for entry in entries:
+            surface: Dict[str, str] = {}
+            words = tokens(entry.get("text") or "", surface)
+            if len(words) < self.min_words or not entry.get("entryId"):
+                continue
+            keywords = [surface[w] for w, _ in Counter(words).most_common(self.keywords)]
+            prepared.append((str(entry["entryId"]), float(entry.get("at") or time.time()), words, keywords))
+
+        added = 0
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                name, dim, rows = self._journal(conn, user_id)
+                embedder = self.embedder(dim)
+                known = {r[0] for r in conn.execute(
+                    "SELECT entry_id FROM journal_entries WHERE user_id = ? AND entry_id IN (%s)"
+                    % ",".join("?" * len(prepared)), (user_id, *(p[0] for p in prepared)))} if prepared else set()
+                block, metadata = [], []
+                for entry_id, at, words, keywords in prepared:
+                    if entry_id in known:
+                        continue
+                    known.add(entry_id)
+                    block.extend(embedder.embed(words))
+                    metadata.append((user_id, rows + len(metadata), entry_id, at, " ".join(keywords)))
+                if metadata:
+                    os.makedirs(self.vectors_dir, exist_ok=True)
+                    fd = os.open(os.path.join(self.vectors_dir, name), os.O_RDWR | os.O_CREAT, 0o600)
+                    try:
+                        os.pwrite(fd, struct.pack(f"<{len(block)}e", *block), rows * dim * 2)
+                    finally:
+                        os.close(fd)
+                    conn.executemany("INSERT INTO journal_entries (user_id, row, entry_id, at, keywords)"
+                                     " VALUES (?, ?, ?, ?, ?)", metadata)
+                    conn.execute("UPDATE journals SET rows = ? WHERE user_id = ?", (rows + len(metadata), user_id))
+                    added = len(metadata)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return {"added": added, "skipped": len(entries) - added}
+
+    def remove(self, user_id: str, entry_id: str) -> bool:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT j.row, f.file, f.dim FROM journal_entries j JOIN journals f USING (user_id)"
+                                   " WHERE j.user_id = ? AND j.entry_id = ? AND j.removed = 0",
+                                   (user_id, entry_id)).fetchone()
+                if row:
+                    fd = os.open(os.path.join(self.vectors_dir, row[1]), os.O_WRONLY)
+                    try:
+                        os.pwrite(fd, bytes(2 * row[2]), row[0] * row[2] * 2)
+                    finally:
+                        os.close(fd)
+                    conn.execute("UPDATE journal_entries SET removed = 1, keywords = '' WHERE user_id = ? AND row = ?",
+                                 (user_id, row[0]))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return row is not None
+
+    def drop(self, user_id: str) -> bool:
+        """Delete a user's whole index"""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT file FROM journals WHERE user_id = ?", (user_id,)).fetchone()
+            conn.execute("DELETE FROM journal_entries WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM journals WHERE user_id = ?", (user_id,))
+        if row:
+            try:
+                os.remove(os.path.join(self.vectors_dir, row[0]))
+            except FileNotFoundError:
+                pass
+        return row is not None
+
+    def _load(self, user_id: str) -> Tuple[List[Tuple[int, str, float, str]], Any, int]:
+        """Live entries (row, entryId, at, keywords), the user's vectors and their dimension"""
+        with self._lock:
+            conn = self._connection()
+            journal = conn.execute("SELECT file, dim, rows FROM journals WHERE user_id = ?", (user_id,)).fetchone()
+            if not journal:
+                return [], None, self.dim
+            entries = conn.execute("SELECT row, entry_id, at, keywords FROM journal_entries"
+                                   " WHERE user_id = ? AND removed = 0 ORDER BY row", (user_id,)).fetchall()
+        name, dim, rows = journal
+        with self._cache_lock:
+            cached = self._decoded.get(user_id)
+            if cached and cached[0] == (rows, len(entries)):
+                self._decoded.move_to_end(user_id)
+                return entries, cached[1], dim
+        vectors = None
+        if rows:
+            with open(os.path.join(self.vectors_dir, name), "rb") as f, \
+                    mmap.mmap(f.fileno(), rows * dim * 2, access=mmap.ACCESS_READ) as mapped:
+                if numpy is not None:
+                    vectors = numpy.frombuffer(mapped, dtype="<f2", count=rows * dim).astype(numpy.float32).reshape(rows, dim)
+                else:
+                    flat = struct.unpack_from(f"<{rows * dim}e", mapped)
+                    vectors = [flat[i * dim:(i + 1) * dim] for i in range(rows)]
+        with self._cache_lock:
+            self._decoded[user_id] = ((rows, len(entries)), vectors)
+            self._decoded.move_to_end(user_id)
+            while len(self._decoded) > self.cache_users:
+                self._decoded.popitem(last=False)
+        return entries, vectors, dim
+
+    def search(self, user_id: str, text: Optional[str] = None, entry_id: Optional[str] = None, k: int = 5,
+               min_score: float = 0.0) -> Optional[List[Dict[str, Any]]]:
+        """Entries most similar to `text` or to the indexed entry `entry_id` (excluded from the
+        results); None when entry_id is not indexed"""
+        entries, vectors, dim = self._load(user_id)
+        if entry_id is not None:
+            row = next((e[0] for e in entries if e[1] == entry_id), None)
+            if row is None:
+                return None
+            query = vectors[row]
+        else:
+            query = self.embedder(dim).embed(tokens(text or ""))
+        if not entries:
+            return []
+        if numpy is not None:
+            rows = numpy.fromiter((e[0] for e in entries), dtype=numpy.int64, count=len(entries))
+            scores = (vectors[rows] @ numpy.asarray(query, dtype=numpy.float32)).tolist()
+        else:
+            scores = [_dot(vectors[e[0]], query) for e in entries]
+        ranked = heapq.nlargest(k, ((s, i) for i, s in enumerate(scores)
+                                    if s >= min_score and entries[i][1] != entry_id))
+        return [{"entryId": entries[i][1], "at": entries[i][2], "score": round(s, 4),
+                 "keywords": entries[i][3].split()} for s, i in ranked]
+
+    def themes(self, user_id: str, max_clusters: int = 8, min_size: int = 2, iterations: int = 20,
+               sample: int = 5) -> Dict[str, Any]:
+        """Recurring themes: spherical k-means (k-means++ start, seeded per user so reruns agree),
+        k ~ sqrt(n / 2) up to max_clusters. Each theme is labelled with the keywords most
+        over-represented in it and lists the entries closest to its centre."""
+        entries, vectors, dim = self._load(user_id)
+        n = len(entries)
+        if n < max(2, min_size):
+            return {"entries": n, "themes": []}
+        points = ([vectors[e[0]].tolist() for e in entries] if numpy is not None
+                  else [vectors[e[0]] for e in entries])
+        k = max(1, min(max_clusters, round(math.sqrt(n / 2)), n))
+        rng = random.Random(user_id)
+
+        centres = [points[rng.randrange(n)]]
+        closest = [1.0 - _dot(p, centres[0]) for p in points]
+        while len(centres) < k:
+            total = sum(max(d, 0.0) for d in closest)
+            if total <= 0:
+                break
+            pick, target = 0, rng.random() * total
+            for pick, d in enumerate(closest):
+                target -= max(d, 0.0)
+                if target <= 0:
+                    break
+            centres.append(points[pick])
+            closest = [min(c, 1.0 - _dot(p, centres[-1])) for c, p in zip(closest, points)]
+
+        assignment = [-1] * n
+        for _ in range(iterations):
+            changed = False
+            for i, p in enumerate(points):
+                best = max(range(len(centres)), key=lambda c: _dot(p, centres[c]))
+                if best != assignment[i]:
+                    assignment[i], changed = best, True
+            if not changed:
+                break
+            sums = [[0.0] * dim for _ in centres]
+            for i, p in enumerate(points):
+                sums[assignment[i]] = list(map(operator.add, sums[assignment[i]], p))
+            for c, s in enumerate(sums):
+                norm = math.sqrt(sum(v * v for v in s))
+                if norm:
+                    centres[c] = [v / norm for v in s]
+
+        document_frequency = Counter(w for e in entries for w in set(e[3].split()))
+        themes = []
+        for c, centre in enumerate(centres):
+            members = [i for i in range(n) if assignment[i] == c]
+            if len(members) < min_size:
+                continue
+            counts = Counter(w for i in members for w in set(entries[i][3].split()))
+            lift = sorted(counts, key=lambda w: (-counts[w] * math.log(1 + n / document_frequency[w]), w))
+            similarity = {i: _dot(points[i], centre) for i in members}
+            closest_members = sorted(members, key=lambda i: -similarity[i])[:sample]
+            dates = [entries[i][2] for i in members]
+            themes.append({
+                "label": ", ".join(lift[:3]),
+                "keywords": lift[:8],
+                "size": len(members),
+                "share": round(len(members) / n, 3),
+                "cohesion": round(sum(similarity.values()) / len(members), 3),
+                "firstAt": min(dates),
+                "lastAt": max(dates),
+                "entries": [{"entryId": entries[i][1], "at": entries[i][2], "score": round(similarity[i], 4)}
+                            for i in closest_members],
+            })
+        themes.sort(key=lambda t: -t["size"])
+        return {"entries": n, "clusters": len(centres), "themes": themes}
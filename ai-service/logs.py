@@ -0,0 +1,159 @@
+"""
+Ascendra - Structured logging
+Log records become JSON lines written by a background thread: handlers on the request path
+only put the record on a queue. Every line carries the id of the request it belongs to,
+debug output is sampled per request, and fields holding student text (journal entries,
+chat messages, model responses) are redacted unless LOG_REDACT is turned off.
+"""
+
+import atexit
+import contextvars
+import hashlib
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+import uuid
+from typing import Iterable, Optional
+
+# Fields that may hold what a student wrote or what the model said about it
+REDACTED_FIELDS = frozenset({
+    "journalEntry", "userMessage", "content", "text", "prompt", "response", "reply", "history", "entry",
+})
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+class ContextFilter(logging.Filter):
+    """Stamps the request id and drops DEBUG records outside the sampled requests.
+    Attached to the handler callers log through (the QueueHandler when queued), so it runs on
+    the caller's thread, before the record is queued, and reads the request's context there."""
+
+    def __init__(self, debug_sample: float = 0.01):
+        super().__init__()
+        self.debug_sample = debug_sample
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        if record.levelno > logging.DEBUG or self.debug_sample >= 1:
+            return True
+        if self.debug_sample <= 0:
+            return False
+        # Keyed on the request, so a sampled request keeps all of its debug lines
+        key = record.request_id or f"{record.name}:{record.lineno}:{time.monotonic_ns()}"
+        return int(hashlib.blake2b(key.encode(), digest_size=4).hexdigest(), 16) / 0xFFFFFFFF < self.debug_sample
+
+
+class JSONFormatter(logging.Formatter):
+    def __init__(self, redact: bool = True, redacted_fields: Iterable[str] = REDACTED_FIELDS):
+        super().__init__()
+        self.redact = redact
+        self.redacted_fields = frozenset(redacted_fields)
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["requestId"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key in _RECORD_ATTRS or key.startswith("_"):
+                continue
+            if self.redact and key in self.redacted_fields and value is not None:
+                value = f"<redacted {len(str(value))} chars>"
+            entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock handler formats here, on the caller's thread; leave that to the writer
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(level: str = "INFO", debug_sample: float = 0.01, redact: bool = True,
+                  path: Optional[str] = None, use_queue: bool = True) -> logging.Logger:
+    """Route the 'ascendra' logger (and module loggers under it) to JSON lines on stdout or
+    `path`. Safe to call more than once; the last call wins."""
+    global _listener
+    sink = logging.FileHandler(path, encoding="utf-8") if path else logging.StreamHandler(sys.stdout)
+    sink.setFormatter(JSONFormatter(redact=redact))
+
+    root = logging.getLogger("ascendra")
+    root.setLevel(level.upper())
+    root.propagate = False
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+    if use_queue:
+        handler = _QueueHandler(queue.SimpleQueue())
+        _listener = logging.handlers.QueueListener(handler.queue, sink, respect_handler_level=True)
+        _listener.start()
+    else:
+        handler = sink
+    handler.addFilter(ContextFilter(debug_sample))
+    root.addHandler(handler)
+    return root
+
+
+@atexit.register
+def _flush():
+    if _listener is not None:
+        _listener.stop()
+
+
+class RequestIdMiddleware:
+    """ASGI middleware giving every request an id (X-Request-Id if the caller sent one),
+    echoing it back and logging one access line per request"""
+
+    def __init__(self, app, logger: Optional[logging.Logger] = None):
+        self.app = app
+        self.logger = logger or logging.getLogger("ascendra.access")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id" and value:
+                request_id = value.decode("latin-1")[:64]
+        request_id = request_id or uuid.uuid4().hex[:16]
+        token = _request_id.set(request_id)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", request_id.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            self.logger.info("request", extra={"method": scope["method"], "path": scope["path"], "status": status,
+                                               "ms": round(1000 * (time.perf_counter() - start), 1)})
+            _request_id.reset(token)
@@ -0,0 +1,95 @@
+"""
+Ascendra - Near-duplicate detection
+MinHash signatures over word shingles with banded LSH lookups, shared by the stores that
+drop paraphrases (question bank, flashcard decks). Stopwords are left out of the shingles, so
+short template questions ("What is a stack?" / "What is a queue?") differ in what they ask
+about. A store keeps each item's packed signature next to the item and its band keys in a
+side table.
+"""
+
+import hashlib
+import random
+import re
+import sqlite3
+import struct
+from typing import List, Optional, Tuple
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+STOPWORDS = frozenset(
+    "a an the is are was were be been am of to in on at for from by with and or but not no it its this that these"
+    " those what which who whom whose when where why how do does did can could would should will shall may might"
+    " i me my we our you your he she they them their there here as if then than so".split()
+)
+
+
+class MinHasher:
+    """MinHash signatures over word shingles, banded for LSH lookups"""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, shingle_size: int = 2, seed: int = 7):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)]
+
+    def shingles(self, text: str) -> set:
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        words = [w for w in words if w not in STOPWORDS] or words
+        if len(words) < self.shingle_size:
+            return {" ".join(words)}
+        return {" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> List[int]:
+        hashes = [struct.unpack("<Q", hashlib.blake2b(s.encode(), digest_size=8).digest())[0] & _MAX_HASH
+                  for s in self.shingles(text)]
+        return [min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in self._perms]
+
+    def band_keys(self, signature: List[int]) -> List[str]:
+        return [
+            f"{band}:" + hashlib.blake2b(struct.pack(f"<{self.rows}Q", *signature[band * self.rows:(band + 1) * self.rows]),
+                                         digest_size=8).hexdigest()
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def similarity(a: List[int], b: List[int]) -> float:
+        """Estimated Jaccard similarity of the underlying shingle sets"""
+        return sum(x == y for x, y in zip(a, b)) / len(a)
+
+    def pack(self, signature: List[int]) -> bytes:
+        return struct.pack(f"<{self.num_perm}I", *signature)
+
+    def unpack(self, blob: bytes) -> List[int]:
+        return list(struct.unpack(f"<{self.num_perm}I", blob))
+
+
+class NearDuplicates:
+    """LSH lookups for one store: `items` holds (id, signature) rows and `bands` maps
+    (group, band) to `item_column`. Runs inside the caller's transaction, so a batch of
+    inserts also de-duplicates against itself."""
+
+    def __init__(self, items: str, bands: str, item_column: str, group_column: str,
+                 threshold: float = 0.8, hasher: Optional[MinHasher] = None):
+        self.hasher = hasher or MinHasher()
+        self.threshold = threshold
+        self._candidates = (f"SELECT DISTINCT i.signature FROM {bands} b JOIN {items} i ON i.id = b.{item_column}"
+                            f" WHERE b.{group_column} = ? AND b.band IN ({{}})")
+        self._insert = f"INSERT INTO {bands} ({group_column}, band, {item_column}) VALUES (?, ?, ?)"
+
+    def signature(self, text: str) -> Tuple[List[int], List[str]]:
+        """MinHash signature of a text and its band keys"""
+        signature = self.hasher.signature(text)
+        return signature, self.hasher.band_keys(signature)
+
+    def is_duplicate(self, conn: sqlite3.Connection, group: str, signature: List[int], bands: List[str]) -> bool:
+        candidates = conn.execute(self._candidates.format(",".join("?" * len(bands))), (group, *bands)).fetchall()
+        return any(self.hasher.similarity(signature, self.hasher.unpack(row[0])) >= self.threshold
+                   for row in candidates)
+
+    def index(self, conn: sqlite3.Connection, group: str, item_id: int, bands: List[str]):
+        conn.executemany(self._insert, [(group, band, item_id) for band in bands])
@@ -4,38 +4,253 @@ Main FastAPI application with Gemini-powered agents
 """
 
 import os
-from fastapi import FastAPI, HTTPException
+import asyncio
+import functools
+import hashlib
+import hmac
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from dotenv import load_dotenv
-from google import genai
+from cache import SharedCache
+from memory import ConversationMemory
+from moods import MoodSeriesStore, features as mood_features, describe as describe_mood
+from fairness import ClassQuota, FairScheduler, FairnessMiddleware, RateLimitedError, client_key, current_client
+from context_cache import ContextCacheManager
+from logs import setup_logging, RequestIdMiddleware, current_request_id
+from deadlines import DeadlineMiddleware, RequestCancelled, current_budget, metrics as deadline_metrics
+from idempotency import IdempotencyMiddleware, IdempotencyStore, metrics as idempotency_stats
+from serialization import FastJSONResponse, FastJSONRoute, EncodingMiddleware, json_line
+from usage import UsageLedger, UsageRecord, window_bounds, GROUPS as USAGE_GROUPS
+from providers import GeminiProvider, LlamaCppProvider, Cassette, CassetteProvider, ProviderError
+from batch import (BatchKind, RateLimiter, current_limiter, run_batch, read_requests,
+                   pack_mood_analyses, unpack_mood_analyses, pack_flashcards, unpack_flashcards)
 
 load_dotenv()
 
+# JSON-lines logs written by a background thread; student text in log fields is redacted
+logger = setup_logging(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    debug_sample=float(os.getenv("LOG_DEBUG_SAMPLE", 0.01)),
+    redact=os.getenv("LOG_REDACT", "true").lower() in ("1", "true", "yes"),
+    path=os.getenv("LOG_FILE"),
+    use_queue=os.getenv("LOG_QUEUE", "true").lower() in ("1", "true", "yes")
+)
+
 # Configure Gemini - check both possible env var names
 api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    print("WARNING: No Gemini API key found! Set GEMINI_API_KEY or GOOGLE_API_KEY in .env")
 
-# Initialize the new Genai client
-client = genai.Client(api_key=api_key)
+# Optional endpoint override, e.g. the local stub used by the benchmarks
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+
+# Build the Gemini client during startup instead of on the first request
+PREWARM_LLM = os.getenv("PREWARM_LLM", "false").lower() in ("1", "true", "yes")
+LLM_THREADS = int(os.getenv("LLM_THREADS", 32))
+
+# The google.genai SDK is slow to import, so the client is built on first use
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Return the shared Gemini client, importing the SDK and building it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from google import genai
+                if not api_key:
+                    logger.warning("No Gemini API key found! Set GEMINI_API_KEY or GOOGLE_API_KEY in .env")
+                _client = genai.Client(
+                    api_key=api_key,
+                    http_options={"base_url": GEMINI_BASE_URL} if GEMINI_BASE_URL else None
+                )
+    return _client
+
+def _lazy(factory):
+    """Build a subsystem on first use, once per process. Its module is imported then too, so
+    starting a worker does not pay for features it may never serve."""
+    built = []
+    lock = threading.Lock()
+
+    @functools.wraps(factory)
+    def get():
+        if not built:
+            with lock:
+                if not built:
+                    built.append(factory())
+        return built[0]
+    return get
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the job workers and optionally warm the LLM client; /health answers right away"""
+    # Gemini calls run in the default executor; size it so it is not the bottleneck
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=LLM_THREADS))
+    if PREWARM_LLM:
+        app.state.prewarm = asyncio.create_task(asyncio.to_thread(get_client))
+    if context_caches.enabled and api_key:
+        app.state.cache_sync = asyncio.create_task(asyncio.to_thread(context_caches.sync, static_prefixes()))
+    get_job_runner().start()
+    yield
+    await get_job_runner().stop()
 
 app = FastAPI(
     title="Ascendra AI Service",
     description="Agentic AI backend for student companion platform",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
+)
+app.router.route_class = FastJSONRoute
+
+# Local data directory for on-disk stores (cache, indexes, ...)
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+
+# Stored per-user mental-health data (mood series, journal index) is only read or written for the Ascendra
+# backend, which sends X-Service-Token: AI_SERVICE_TOKEN. Without a token configured nobody is
+# trusted: those endpoints answer 403 and a userId in other requests is not used to look data up.
+AI_SERVICE_TOKEN = os.getenv("AI_SERVICE_TOKEN", "")
+
+def is_service_caller(request: Optional[Request]) -> bool:
+    """True for the backend, and for in-process calls (jobs, batch) that have no HTTP request"""
+    if request is None:
+        return True
+    token = request.headers.get("x-service-token", "")
+    return bool(AI_SERVICE_TOKEN) and hmac.compare_digest(token.encode(), AI_SERVICE_TOKEN.encode())
+
+def require_service_caller(request: Request):
+    if not is_service_caller(request):
+        raise HTTPException(status_code=403, detail="Only available to the Ascendra backend (X-Service-Token)")
+
+def is_service_scope(scope) -> bool:
+    """is_service_caller for middleware, which sees the raw ASGI scope: only the backend may
+    name the user a request counts against"""
+    return is_service_caller(Request(scope))
+
+# Per-user fairness in front of the LLM: in-flight quotas per endpoint class and fair
+# queuing across users for FAIR_CAPACITY slots per worker. Users are identified by the
+# X-User-Id header or a userId in the body when the backend sends them (X-Service-Token), else by
+# the client address; an address may be many users (NAT, campus proxy), so anonymous clients get
+# the larger FAIRNESS_ANON_QUOTAS.
+FAIRNESS_CLASSES = {
+    "/api/chat": "chat",
+    "/api/grant-writer": "generate",
+    "/api/grant-writer/stream": "generate",
+    "/api/project-forge": "generate",
+    "/api/study-plan": "generate",
+    "/api/distill-content": "generate",
+    "/api/generate-flashcards": "generate",
+    "/api/mock-interview": "generate",
+    "/api/search-scholarships": "generate",
+    "/api/debt-calculator": "generate",
+}
+FAIRNESS_QUOTAS = {
+    "chat": ClassQuota(max_in_flight=2, cost=1),
+    "generate": ClassQuota(max_in_flight=1, cost=3),
+    "batch": ClassQuota(max_in_flight=1, cost=5),
+    "default": ClassQuota(max_in_flight=4, cost=1),
+}
+FAIRNESS_ANON_QUOTAS = {
+    "chat": ClassQuota(max_in_flight=8, cost=1),
+    "generate": ClassQuota(max_in_flight=4, cost=3),
+    "batch": ClassQuota(max_in_flight=2, cost=5),
+    "default": ClassQuota(max_in_flight=16, cost=1),
+}
+# e.g. FAIR_QUOTAS='{"chat": {"maxInFlight": 3, "cost": 1}}' (FAIR_ANON_QUOTAS likewise)
+for _quotas, _env in ((FAIRNESS_QUOTAS, "FAIR_QUOTAS"), (FAIRNESS_ANON_QUOTAS, "FAIR_ANON_QUOTAS")):
+    for _name, _quota in json.loads(os.getenv(_env, "{}")).items():
+        _quotas[_name] = ClassQuota(max_in_flight=int(_quota.get("maxInFlight", 2)), cost=float(_quota.get("cost", 1)))
+
+def classify_endpoint(path: str) -> Optional[str]:
+    """Fairness class of a POST path; None for routes that never wait on the LLM inline"""
+    if path in FAIRNESS_CLASSES:
+        return FAIRNESS_CLASSES[path]
+    if path.startswith("/api/batch/"):
+        return "batch"
+    if path.startswith(("/api/jobs/", "/api/moods/", "/api/schedule", "/api/journal/")):
+        return None
+    return "default" if path.startswith("/api/") else None
+
+fair_scheduler = FairScheduler(
+    capacity=int(os.getenv("FAIR_CAPACITY", 8)),
+    quotas=FAIRNESS_QUOTAS,
+    anonymous_quotas=FAIRNESS_ANON_QUOTAS,
+    queue_timeout=float(os.getenv("FAIR_QUEUE_TIMEOUT", 30)),
+    idle_ttl=float(os.getenv("FAIR_IDLE_TTL", 300))
+)
+
+# Optional spend cap per user: USAGE_BUDGET_USD per USAGE_BUDGET_WINDOW (hour, day or month), 0 = off
+USAGE_BUDGET_USD = float(os.getenv("USAGE_BUDGET_USD", 0))
+USAGE_BUDGET_WINDOW = os.getenv("USAGE_BUDGET_WINDOW", "day")
+
+async def usage_budget_check(client_key: str, endpoint_class: str):
+    """Refuse LLM-backed requests from a user whose estimated spend this window is over budget"""
+    if USAGE_BUDGET_USD <= 0 or not client_key.startswith("user:"):
+        return
+    since, until = window_bounds(USAGE_BUDGET_WINDOW)
+    user_id = client_key[len("user:"):]
+    spent = usage_ledger.cached_spent(user_id, since)
+    if spent is None:  # first request in refresh_interval: the ledger query runs off the event loop
+        spent = await asyncio.to_thread(usage_ledger.spent, user_id, since)
+    if spent >= USAGE_BUDGET_USD:
+        raise RateLimitedError(f"AI usage budget for this {USAGE_BUDGET_WINDOW} is used up",
+                               retry_after=max(1, int(until - time.time())))
+
+app.add_middleware(FairnessMiddleware, scheduler=fair_scheduler, classify=classify_endpoint,
+                   budget_check=usage_budget_check, trusted=is_service_scope)
+
+# Idempotency-Key on POSTs: a retry waits for the running generation or gets the stored response
+# (kept IDEMPOTENCY_TTL seconds) instead of starting another one. Outside fairness so a waiting
+# retry holds no LLM slot; streamed responses are not covered.
+def idempotent_path(path: str) -> bool:
+    return path.startswith("/api/") and not path.endswith(("/stream", "/events")) and not path.startswith("/api/batch/")
+
+app.add_middleware(
+    IdempotencyMiddleware,
+    store=IdempotencyStore(os.getenv("IDEMPOTENCY_DB_PATH", os.path.join(DATA_DIR, "idempotency.db")),
+                           max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", 10000))),
+    applies=idempotent_path,
+    ttl=float(os.getenv("IDEMPOTENCY_TTL", 86400)),
+    lease=float(os.getenv("IDEMPOTENCY_LEASE", 60)),
+    generation_timeout=float(os.getenv("IDEMPOTENCY_GENERATION_TIMEOUT", 300)) or None,
+    trusted=is_service_scope
 )
 
-# CORS
+# orjson bodies (MessagePack with Accept: application/msgpack), brotli/gzip above COMPRESS_MIN_BYTES;
+# outside idempotency so replayed responses are encoded and compressed for the client asking
+app.add_middleware(EncodingMiddleware, minimum_size=int(os.getenv("COMPRESS_MIN_BYTES", 1024)))
+
+# Deadlines and cancel-on-disconnect, outside fairness so queued requests are dropped too: callers
+# send X-Request-Timeout-Ms; an expired deadline gets 504 and a cancelled request starts no new LLM calls
+app.add_middleware(
+    DeadlineMiddleware,
+    default_timeout=float(os.getenv("REQUEST_TIMEOUT_DEFAULT_MS", 0)) / 1000,
+    max_timeout=float(os.getenv("REQUEST_TIMEOUT_MAX_MS", 300000)) / 1000
+)
+# An LLM call is not started with less than this left before the deadline
+LLM_MIN_BUDGET = float(os.getenv("LLM_MIN_BUDGET_MS", 500)) / 1000
+
+# CORS (added after fairness and deadlines so it wraps 429 and 504 responses too)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://localhost:5173", "http://localhost:5175", "http://localhost:5000"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-Id", "Idempotent-Replayed"],
 )
 
+# Request ids (X-Request-Id) on every log line and response, plus one access line per request
+app.add_middleware(RequestIdMiddleware)
+
 # Pydantic Models
 class Message(BaseModel):
     role: str
@@ -46,6 +261,8 @@ class ChatRequest(BaseModel):
     userId: str
     conversationHistory: Optional[List[Dict[str, Any]]] = []
     userProfile: Optional[Dict[str, Any]] = None
+    # With a conversationId the history is kept server-side; conversationHistory only seeds a new one
+    conversationId: Optional[str] = None
 
 class ChatResponse(BaseModel):
     content: str
@@ -54,10 +271,37 @@ class ChatResponse(BaseModel):
     category: str
     sentiment: Optional[str] = None
     urgency: Optional[str] = None
+    memory: bool = False  # the service kept this turn; the caller need not resend the history
 
 class MoodAnalysisRequest(BaseModel):
     journalEntry: str
     recentMoods: Optional[List[int]] = []
+    userId: Optional[str] = None  # use the stored mood series instead of recentMoods
+    entryId: Optional[str] = None  # journal entry id for the similarity index (hash of the text if omitted)
+
+class JournalEntry(BaseModel):
+    entryId: str
+    text: str
+    at: Optional[float] = None  # epoch seconds, defaults to now
+
+class JournalEntriesRequest(BaseModel):
+    entries: List[JournalEntry]
+
+class JournalSearchRequest(BaseModel):
+    text: Optional[str] = None
+    entryId: Optional[str] = None  # find entries like this indexed one
+    k: int = 5
+    minScore: float = 0.1
+
+class JournalThemesRequest(BaseModel):
+    userId: str
+    maxClusters: int = 8
+    minSize: int = 2
+
+class MoodEntryRequest(BaseModel):
+    score: float  # 1-10
+    at: Optional[float] = None  # epoch seconds, defaults to now
+    history: Optional[List[float]] = None  # earlier scores, only used to seed a new series
 
 class SkillGapRequest(BaseModel):
     currentSkills: List[Dict[str, Any]]
@@ -84,6 +328,7 @@ class ScholarshipSearchRequest(BaseModel):
 class FlashcardGenerateRequest(BaseModel):
     topic: str
     count: int = 5
+    offset: int = 0  # position in the topic's deck, to page through it
 
 # System prompts for different agent personalities
 SYSTEM_PROMPTS = {
@@ -139,36 +384,300 @@ Your role is to optimize academic success:
 Be supportive but also help students maintain academic honesty."""
 }
 
+# Reply format for /api/chat, sent with the agent's system prompt as one static prefix
+CHAT_FORMAT_INSTRUCTIONS = """Please respond with:
+1. REASONING: Explain your thought process (what the user needs, what context matters, what approach to take)
+2. ACTIONS: List any actions you're taking or recommending (as a comma-separated list)
+3. RESPONSE: Your actual response to the user
+
+IMPORTANT - Format your RESPONSE section using proper Markdown:
+- Use **bold** for emphasis and key points
+- Use bullet points (•) for lists
+- Use numbered lists for steps or sequences
+- Use ### for section headers when appropriate
+- Use > for important callouts or quotes
+- Use emojis sparingly for warmth and visual appeal 😊
+- Keep paragraphs short and readable
+
+Format:
+REASONING: [your reasoning]
+ACTIONS: [action1, action2, ...]
+RESPONSE: [your well-formatted markdown response]"""
+
+DISTILL_FORMAT_INSTRUCTIONS = {
+    "summary": "Create a concise summary with:\n### 📝 Key Summary\nUse **bold** for key terms, bullet points for main ideas, and a brief conclusion.",
+    "bullet-points": "Create a structured outline:\n### 📋 Main Topics\nUse • for main points, ◦ for sub-points, and **bold** for key terms.",
+    "flashcards": "Create 5-7 flashcard Q&A pairs:\n### 🎴 Flashcards\nFormat each as:\n**Q:** Question here\n**A:** Answer here\n---",
+    "mind-map": "Create a text-based mind map:\n### 🧠 Mind Map\nUse indentation and arrows (→) to show relationships between concepts.",
+    "quiz": "Create a 5-question quiz:\n### 📝 Quiz\n**Q1.** Question\na) Option b) Option c) Option d) Option\n✅ **Answer:** Correct option with explanation",
+    "visual": "Create visual-friendly content:\n### 👁️ Visual Summary\nUse diagrams (described in text), **bold headers**, color-coded sections (🔴🟡🟢), and structured layouts.",
+    "auditory": "Write conversationally:\n### 🎧 Audio-Style Explanation\nUse 'Imagine...', 'Think of it like...', analogies, and a friendly tone as if explaining to a friend.",
+    "reading": "Provide detailed explanations:\n### 📖 Detailed Notes\nUse headers, **bold definitions**, examples in *italics*, and numbered references.",
+    "kinesthetic": "Include hands-on content:\n### ✋ Practice Activities\nProvide exercises, step-by-step tutorials, and 'Try this:' prompts for active learning."
+}
+
+# classify_message categories whose agent prompt is stored under another name
+AGENT_PROMPT_KEYS = {"mental": "mental_health"}
+
+# Final pass of a multi-agent chat reply: merges the specialists' answers into one
+CHAT_MERGE_INSTRUCTIONS = """You are Ascendra, an empathetic AI companion for students.
+Several specialist modules have each answered the same student message from their own angle.
+Merge their answers into ONE reply to the student:
+- Address the most pressing concern first, then the others
+- Keep every concrete suggestion, drop repetition and contradictions
+- Use Markdown: **bold** for key points, bullet points for lists, ### headers per concern if helpful
+- Keep it warm and concise; do not mention the modules or that answers were merged
+Return only the reply."""
+
+def chat_system_instruction(category: str) -> str:
+    prompt = SYSTEM_PROMPTS.get(AGENT_PROMPT_KEYS.get(category, category), SYSTEM_PROMPTS['general'])
+    return f"{prompt}\n\n{CHAT_FORMAT_INSTRUCTIONS}"
+
+def distill_system_instruction(output_format: str) -> str:
+    instruction = DISTILL_FORMAT_INSTRUCTIONS.get(output_format, DISTILL_FORMAT_INSTRUCTIONS["summary"])
+    return f"""You distill content for a student.
+
+Task: {instruction}
+
+Format your response using proper Markdown:
+- Use **bold** for key terms and concepts
+- Use bullet points (•) for lists
+- Use numbered lists (1. 2. 3.) for sequential steps
+- Use ### headers for sections
+- Use > blockquotes for important notes
+- Use `code` formatting for technical terms
+
+Provide clear, well-organized, visually appealing output that helps the student learn effectively."""
+
+def static_prefixes() -> List[str]:
+    """Every static system instruction, so stale context caches can be told apart"""
+    return ([chat_system_instruction(c) for c in SYSTEM_PROMPTS] + [CHAT_MERGE_INSTRUCTIONS]
+            + [distill_system_instruction(f) for f in DISTILL_FORMAT_INSTRUCTIONS])
+
 # Model configuration - can be overridden via environment variable
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 
-def get_gemini_response(prompt: str) -> str:
-    """Generate content using Gemini API with the new google.genai package"""
+# Response cache shared by all worker processes (0 disables caching)
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 3600))
+response_cache = SharedCache(os.getenv("CACHE_DB_PATH", os.path.join(DATA_DIR, "cache.db")))
+
+# Server-side chat memory: recent turns verbatim, older ones folded into a rolling summary
+conversation_memory = ConversationMemory(
+    os.getenv("MEMORY_DB_PATH", os.path.join(DATA_DIR, "memory.db")),
+    recent_turns=int(os.getenv("MEMORY_RECENT_TURNS", 6))
+)
+_folding = set()
+_folding_lock = threading.Lock()
+
+# Interview question bank, refilled in the background until a combination holds QUESTION_BANK_TARGET
+@_lazy
+def get_question_bank():
+    from question_bank import QuestionBank
+    return QuestionBank(os.getenv("QUESTION_BANK_DB_PATH", os.path.join(DATA_DIR, "question_bank.db")),
+                        served_retention=float(os.getenv("QUESTION_SERVED_DAYS", 90)) * 86400)
+
+QUESTION_BANK_TARGET = int(os.getenv("QUESTION_BANK_TARGET", 60))
+_bank_refills = set()
+_bank_refills_lock = threading.Lock()
+
+# Per-topic flashcard decks: only the cards a request needs beyond the deck are generated
+@_lazy
+def get_flashcard_decks():
+    from decks import DeckStore
+    return DeckStore(os.getenv("FLASHCARD_DB_PATH", os.path.join(DATA_DIR, "flashcards.db")))
+
+FLASHCARD_CHUNK_SIZE = int(os.getenv("FLASHCARD_CHUNK_SIZE", 10))
+FLASHCARD_MAX_COUNT = int(os.getenv("FLASHCARD_MAX_COUNT", 50))
+
+# Winnowing fingerprints of earlier submissions; only overlap between the two ratios goes to Gemini
+@_lazy
+def get_fingerprint_index():
+    from fingerprints import FingerprintIndex
+    return FingerprintIndex(os.getenv("FINGERPRINT_DB_PATH", os.path.join(DATA_DIR, "fingerprints.db")))
+
+ETHICS_OVERLAP_LOW = float(os.getenv("ETHICS_OVERLAP_LOW", 0.05))
+ETHICS_OVERLAP_HIGH = float(os.getenv("ETHICS_OVERLAP_HIGH", 0.4))
+
+# Study schedules from the local deadline-aware scheduler, kept so a changed task re-plans incrementally
+@_lazy
+def get_schedule_plans():
+    from scheduler import PlanStore
+    return PlanStore(os.getenv("SCHEDULE_DB_PATH", os.path.join(DATA_DIR, "schedules.db")))
+
+# Per-user mood series with incrementally updated trend statistics
+mood_series = MoodSeriesStore(
+    os.getenv("MOOD_DB_PATH", os.path.join(DATA_DIR, "moods.db")),
+    keep_points=int(os.getenv("MOOD_KEEP_POINTS", 90))
+)
+
+# Per-user journal similarity index: local hashed embeddings in float16 files plus a few keywords
+# per entry (not the text). Entries the backend analyses with a userId are added when JOURNAL_INDEX is on.
+JOURNAL_INDEX = os.getenv("JOURNAL_INDEX", "true").lower() in ("1", "true", "yes")
+JOURNAL_MAX_BATCH = 500
+@_lazy
+def get_journal_index():
+    from journal_index import JournalIndex
+    return JournalIndex(
+        os.getenv("JOURNAL_DB_PATH", os.path.join(DATA_DIR, "journal.db")),
+        vectors_dir=os.getenv("JOURNAL_VECTORS_DIR", os.path.join(DATA_DIR, "journal")),
+        dim=int(os.getenv("JOURNAL_EMBED_DIM", 256))
+    )
+
+# Chat messages scoring on several categories are answered by those agents concurrently
+CHAT_FANOUT = os.getenv("CHAT_FANOUT", "true").lower() in ("1", "true", "yes")
+CHAT_FANOUT_MIN_SCORE = int(os.getenv("CHAT_FANOUT_MIN_SCORE", 1))
+CHAT_FANOUT_MAX_AGENTS = int(os.getenv("CHAT_FANOUT_MAX_AGENTS", 3))
+CHAT_FANOUT_DEADLINE = float(os.getenv("CHAT_FANOUT_DEADLINE", 20))
+
+# Per-request model choice across Gemini tiers, configured in routing.json (read on the first LLM call)
+@_lazy
+def get_model_router():
+    from router import ModelRouter
+    return ModelRouter(
+        os.getenv("ROUTING_CONFIG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "routing.json")),
+        default_model=GEMINI_MODEL
+    )
+
+# Append-only ledger of every LLM call (user, route, model, tokens, latency, estimated cost)
+usage_ledger = UsageLedger(os.getenv("USAGE_DB_PATH", os.path.join(DATA_DIR, "usage.db")))
+
+# Static prompt prefixes go out as system_instruction; long ones are uploaded once as
+# Gemini context caches (below ~1024 tokens Gemini refuses to cache them)
+context_caches = ContextCacheManager(
+    get_client,
+    ttl=int(os.getenv("CONTEXT_CACHE_TTL", 3600)),
+    min_chars=int(os.getenv("CONTEXT_CACHE_MIN_CHARS", 4096)),
+    enabled=os.getenv("CONTEXT_CACHE", "true").lower() in ("1", "true", "yes")
+)
+
+# LLM backends by name; routing.json tiers pick one with "provider" (default gemini)
+llm_providers = {
+    "gemini": GeminiProvider(get_client, context_caches),
+    "local": LlamaCppProvider(
+        os.getenv("LOCAL_LLM_URL", "http://127.0.0.1:8080"),
+        timeout=float(os.getenv("LOCAL_LLM_TIMEOUT", 60)),
+        max_tokens=int(os.getenv("LOCAL_LLM_MAX_TOKENS", 1024))
+    ),
+}
+
+# Record/replay: with LLM_CASSETTE set, responses are replayed by prompt hash; in record mode
+# misses are sent to the real provider and appended, in replay mode they fail
+if os.getenv("LLM_CASSETTE"):
+    _cassette = Cassette(os.getenv("LLM_CASSETTE"))
+    _recording = os.getenv("LLM_CASSETTE_MODE", "replay").lower() == "record"
+    llm_providers = {name: CassetteProvider(_cassette, provider, record=_recording)
+                     for name, provider in llm_providers.items()}
+
+def _provider_call(choice: Dict[str, str], route: str, prompt: str, system_instruction: Optional[str],
+                   in_chars: int) -> str:
+    provider = llm_providers.get(choice["provider"])
+    if provider is None:
+        raise ProviderError(f"Unknown LLM provider '{choice['provider']}' for tier {choice['tier']}")
+    limiter = current_limiter.get()
+    if limiter is not None:
+        limiter.acquire()  # bulk runs: every provider call counts against the batch rate
+    budget = current_budget()
+    if budget is not None:
+        budget.check(LLM_MIN_BUDGET)
+    start = time.perf_counter()
+    completion = None
     try:
-        response = client.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=prompt
-        )
-        return response.text
+        completion = provider.generate(choice["model"], prompt, system_instruction,
+                                       budget.remaining() if budget is not None else None)
+        if budget is not None:
+            budget.finished()
+    finally:
+        latency = time.perf_counter() - start
+        usage = completion.usage() if completion is not None else {}
+        if completion is None and budget is not None and budget.expired():
+            cost = 0.0  # cut off by the caller's deadline, not the model's fault
+        else:
+            cost = get_model_router().record(route, choice["model"], choice["tier"], latency, completion is not None,
+                                       in_chars, len(completion.text or "") if completion is not None else 0, **usage)
+            if completion is not None and completion.replayed:
+                cost = 0.0  # cassette replay: the recorded usage was paid for once, when it was recorded
+        client = current_client.get()
+        usage_ledger.record(UsageRecord(
+            at=time.time(), user_id=client[len("user:"):] if client and client.startswith("user:") else client,
+            route=route, model=choice["model"], tier=choice["tier"], provider=choice["provider"],
+            prompt_tokens=usage.get("prompt_tokens") or 0, completion_tokens=usage.get("completion_tokens") or 0,
+            cached_tokens=usage.get("cached_tokens") or 0, latency_ms=round(1000 * latency, 1), cost_usd=cost,
+            ok=completion is not None, request_id=current_request_id()
+        ))
+    return completion.text
+
+def get_gemini_response(prompt: str, cache_ttl: int = 0, route: str = "default",
+                        category: Optional[str] = None, urgency: Optional[str] = None,
+                        system_instruction: Optional[str] = None) -> str:
+    """Generate content with the provider the model router picks for this route (Gemini
+    unless routing.json says otherwise), retrying once on the tier's failover if it has one."""
+    in_chars = len(prompt) + len(system_instruction or "")
+    choice = get_model_router().choose(route, in_chars, category, urgency)
+    cache_key = None
+    if cache_ttl > 0:
+        cache_key = hashlib.sha256(f"{choice['model']}\0{system_instruction or ''}\0{prompt}".encode()).hexdigest()
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    try:
+        try:
+            text = _provider_call(choice, route, prompt, system_instruction, in_chars)
+        except RequestCancelled:
+            raise
+        except Exception as e:
+            failover = get_model_router().failover(choice)
+            if failover is None:
+                raise
+            logger.warning("LLM error on %s tier (%s), failing over to %s", choice["tier"], e, failover["tier"])
+            text = _provider_call(failover, route, prompt, system_instruction, in_chars)
+        if cache_key and text:
+            response_cache.set(cache_key, text, cache_ttl)
+        return text
+    except RequestCancelled:
+        raise
     except Exception as e:
-        print(f"Gemini API error: {e}")
+        budget = current_budget()
+        if budget is not None and budget.expired():
+            logger.info("LLM call cut off by the request deadline: %s", e)
+            raise
+        logger.error("LLM error: %s", e)
         # If quota exceeded, provide helpful error
         if "RESOURCE_EXHAUSTED" in str(e) or "429" in str(e):
             raise Exception(f"Gemini API quota exceeded. Please wait or get a new API key from https://aistudio.google.com/app/apikey")
         raise e
 
-def get_gemini_model():
-    """Legacy wrapper - returns a mock model object for backwards compatibility"""
+def get_gemini_model(cache_ttl: int = 0, route: str = "default",
+                     category: Optional[str] = None, urgency: Optional[str] = None,
+                     system_instruction: Optional[str] = None):
+    """Legacy wrapper - returns a mock model object for backwards compatibility.
+    Pass cache_ttl for endpoints whose prompt holds no personal data, so identical
+    prompts are answered from the shared response cache. route, category and urgency
+    feed the model router; system_instruction is a static prefix shared across calls."""
     class GeminiModelWrapper:
         def generate_content(self, prompt: str):
             class Response:
                 def __init__(self, text):
                     self.text = text
-            return Response(get_gemini_response(prompt))
+            return Response(get_gemini_response(prompt, cache_ttl, route, category, urgency, system_instruction))
+        
+        async def generate_content_async(self, prompt: str):
+            # Off the event loop, so other requests keep flowing while Gemini answers
+            started = False
+            def run():
+                nonlocal started
+                started = True
+                return self.generate_content(prompt)
+            try:
+                return await asyncio.to_thread(run)
+            except asyncio.CancelledError:
+                budget = current_budget()
+                if budget is not None and budget.cancelled and not started:
+                    budget.skipped()  # still queued for a thread: the executor drops it
+                raise
     return GeminiModelWrapper()
 
-def classify_message(message: str) -> str:
-    """Classify the message into a category"""
+def category_scores(message: str) -> Dict[str, int]:
+    """Keyword hits per category"""
     message_lower = message.lower()
     
     mental_keywords = ['stress', 'anxious', 'anxiety', 'depressed', 'sad', 'overwhelmed', 
@@ -183,17 +692,28 @@ def classify_message(message: str) -> str:
     academic_keywords = ['assignment', 'exam', 'study', 'deadline', 'professor', 'course',
                          'homework', 'project', 'grade', 'class', 'learn', 'quiz', 'test']
     
-    scores = {
+    return {
         'mental': sum(1 for kw in mental_keywords if kw in message_lower),
         'career': sum(1 for kw in career_keywords if kw in message_lower),
         'finance': sum(1 for kw in finance_keywords if kw in message_lower),
         'social': sum(1 for kw in social_keywords if kw in message_lower),
         'academic': sum(1 for kw in academic_keywords if kw in message_lower)
     }
-    
+
+def classify_message(message: str) -> str:
+    """Classify the message into a category"""
+    scores = category_scores(message)
     max_category = max(scores, key=scores.get)
     return max_category if scores[max_category] > 0 else 'general'
 
+def fanout_categories(message: str) -> List[str]:
+    """Categories worth a specialist each: at least CHAT_FANOUT_MIN_SCORE hits and half the
+    top score, strongest first (so the first one is classify_message's choice)"""
+    scores = category_scores(message)
+    top = max(scores.values())
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [c for c in ranked if scores[c] >= CHAT_FANOUT_MIN_SCORE and 2 * scores[c] >= top][:CHAT_FANOUT_MAX_AGENTS]
+
 def detect_urgency(message: str) -> str:
     """Detect urgency level of the message"""
     message_lower = message.lower()
@@ -224,6 +744,123 @@ def analyze_sentiment(message: str) -> str:
         return 'negative'
     return 'neutral'
 
+def fold_conversation_summary(user_id: str, conversation_id: str):
+    """Background task: fold turns that left the recent ring into the conversation summary"""
+    key = (user_id, conversation_id)
+    with _folding_lock:
+        if key in _folding:
+            return
+        _folding.add(key)
+    try:
+        pending = conversation_memory.pending_fold(user_id, conversation_id)
+        if not pending:
+            return
+        summary, upto, turns = pending
+        turns_text = "\n".join(
+            f"{'User' if t['role'] == 'user' else 'Assistant'}: {t['content']}" for t in turns
+        )
+        prompt = f"""You maintain the running memory of a conversation between a student and Ascendra, their AI companion.
+
+Current summary:
+{summary or '(empty)'}
+
+New messages to fold in:
+{turns_text}
+
+Write the updated summary in at most 150 words. Keep the student's goals, worries, deadlines,
+facts about their situation and any advice or commitments already given. Drop small talk.
+Return only the summary text."""
+        new_summary = get_gemini_response(prompt, route="chat-summary").strip()
+        conversation_memory.store_summary(user_id, conversation_id, upto, turns[-1]["seq"], new_summary)
+    except Exception:
+        logger.exception("Conversation summary error for %s/%s", user_id, conversation_id)
+    finally:
+        with _folding_lock:
+            _folding.discard(key)
+
+def remember_chat_turn(request: ChatRequest, reply: str, background_tasks: BackgroundTasks, use_memory: bool):
+    """Store the exchange in server-side memory and schedule summary folding"""
+    if not use_memory:
+        return
+    conversation_memory.append(request.userId, request.conversationId, [
+        {"role": "user", "content": request.message},
+        {"role": "assistant", "content": reply},
+    ])
+    background_tasks.add_task(fold_conversation_summary, request.userId, request.conversationId)
+
+def parse_agent_reply(response_text: str):
+    """Split an agent reply into (reasoning, actions, content)"""
+    reasoning = ""
+    actions = []
+    content = response_text
+    
+    if "REASONING:" in response_text:
+        parts = response_text.split("REASONING:")
+        if len(parts) > 1:
+            rest = parts[1]
+            if "ACTIONS:" in rest:
+                reasoning = rest.split("ACTIONS:")[0].strip()
+                rest = rest.split("ACTIONS:")[1]
+                if "RESPONSE:" in rest:
+                    actions_text = rest.split("RESPONSE:")[0].strip()
+                    actions = [a.strip() for a in actions_text.split(",") if a.strip()]
+                    content = rest.split("RESPONSE:")[1].strip()
+                else:
+                    content = rest.strip()
+            elif "RESPONSE:" in rest:
+                reasoning = rest.split("RESPONSE:")[0].strip()
+                content = rest.split("RESPONSE:")[1].strip()
+    return reasoning, actions, content
+
+async def fanout_chat(categories: List[str], prompt: str, urgency: str):
+    """Ask each category's agent concurrently, then merge the answers in one lite-tier pass.
+    Agents still running at CHAT_FANOUT_DEADLINE are dropped; the merge gets whatever time is
+    left and falls back to stacking the answers. Returns (reasoning, actions, content)."""
+    deadline = time.monotonic() + CHAT_FANOUT_DEADLINE
+    
+    async def ask(category):
+        model = get_gemini_model(route="chat", category=category, urgency=urgency,
+                                 system_instruction=chat_system_instruction(category))
+        return parse_agent_reply((await model.generate_content_async(prompt)).text)
+    
+    tasks = {asyncio.ensure_future(ask(c)): c for c in categories}
+    done, pending = await asyncio.wait(tasks, timeout=CHAT_FANOUT_DEADLINE)
+    for task in pending:
+        task.cancel()
+        logger.warning("Chat fan-out: %s agent missed the deadline", tasks[task])
+    
+    replies, errors = {}, []
+    for task in done:
+        if task.exception():
+            logger.error("Chat fan-out error (%s)", tasks[task], exc_info=task.exception())
+            errors.append(task.exception())
+        else:
+            replies[tasks[task]] = task.result()
+    answered = [c for c in categories if c in replies]
+    if not answered:
+        raise errors[0] if errors else TimeoutError("No agent answered before the deadline")
+    if len(answered) == 1:
+        return replies[answered[0]]
+    
+    reasoning = " ".join(f"[{c}] {replies[c][0]}" for c in answered if replies[c][0])
+    actions = list(dict.fromkeys(a for c in answered for a in replies[c][1]))
+    answers = "\n\n".join(f"### {c} answer\n{replies[c][2]}" for c in answered)
+    merge_prompt = f"""{prompt}
+
+Specialist answers:
+{answers}"""
+    try:
+        model = get_gemini_model(route="chat-merge", urgency=urgency, system_instruction=CHAT_MERGE_INSTRUCTIONS)
+        merged = await asyncio.wait_for(model.generate_content_async(merge_prompt),
+                                        timeout=max(deadline - time.monotonic(), 1.0))
+        content = merged.text.strip()
+        if content.startswith("RESPONSE:"):
+            content = content[len("RESPONSE:"):].strip()
+    except Exception as e:
+        logger.warning("Chat merge error, stacking the answers: %s", e)
+        content = "\n\n---\n\n".join(replies[c][2] for c in answered)
+    return reasoning, actions + [f"consulted_{c}_agent" for c in answered], content
+
 @app.get("/")
 async def root():
     return {"message": "Ascendra AI Service is running", "version": "1.0.0"}
@@ -232,18 +869,31 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness, reported separately from liveness: llm is 'warm' once the client exists.
+    With PREWARM_LLM enabled the service reports 503 until warming has finished."""
+    llm = "warm" if _client is not None else "cold"
+    if PREWARM_LLM and llm == "cold":
+        return JSONResponse(status_code=503, content={"status": "warming", "llm": llm})
+    return {"status": "ready", "llm": llm}
+
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    """Main chat endpoint with agentic reasoning"""
+async def chat(request: ChatRequest, background_tasks: BackgroundTasks, http_request: Request = None):
+    """Main chat endpoint with agentic reasoning. Server-side memory (keyed by userId and
+    conversationId) is only used for the backend, which has checked who the user is."""
+    use_memory = bool(request.conversationId) and is_service_caller(http_request)
     try:
         # Classify and analyze the message
         category = classify_message(request.message)
         urgency = detect_urgency(request.message)
         sentiment = analyze_sentiment(request.message)
+        logger.debug("Chat message", extra={"userMessage": request.message, "category": category,
+                                             "urgency": urgency, "sentiment": sentiment})
         
         # Handle critical urgency (crisis)
         if urgency == 'critical':
-            return ChatResponse(
+            crisis_response = ChatResponse(
                 content="""I'm really concerned about what you've shared. Your feelings are valid, and I want you to know you're not alone.
 
 Please reach out to a crisis helpline right now:
@@ -256,83 +906,60 @@ I'm here for you, but trained professionals can provide immediate support. Would
                 actions=["crisis_alert_triggered", "hotline_numbers_provided", "flag_for_counselor_review"],
                 category="mental",
                 sentiment="negative",
-                urgency="critical"
+                urgency="critical",
+                memory=use_memory
             )
+            remember_chat_turn(request, crisis_response.content, background_tasks, use_memory)
+            return crisis_response
         
-        # Build conversation context
-        system_prompt = SYSTEM_PROMPTS.get(category, SYSTEM_PROMPTS["general"])
-        
-        # Add user context if available
+        # Add user context if available (the agent's system prompt is a static prefix)
+        user_context = ""
         if request.userProfile:
             name = request.userProfile.get('name', 'there')
-            system_prompt += f"\n\nYou're speaking with {name}."
+            user_context = f"You're speaking with {name}."
             if request.userProfile.get('profile'):
                 profile = request.userProfile['profile']
                 if profile.get('isFirstGen'):
-                    system_prompt += " They are a first-generation college student."
+                    user_context += " They are a first-generation college student."
                 if profile.get('isMigrant'):
-                    system_prompt += " They are studying away from their home city."
+                    user_context += " They are studying away from their home city."
+            user_context += "\n\n"
+        
+        # Build chat history - from server-side memory when the backend sends a conversationId
+        summary = ""
+        history = request.conversationHistory[-5:]  # Last 5 messages
+        if use_memory:
+            if request.conversationHistory and not conversation_memory.exists(request.userId, request.conversationId):
+                conversation_memory.append(request.userId, request.conversationId, [
+                    {"role": m.get('role', 'user'), "content": m.get('content', '')}
+                    for m in request.conversationHistory
+                ])
+            summary, history = conversation_memory.context(request.userId, request.conversationId)
         
-        # Build chat history
         history_text = ""
-        for msg in request.conversationHistory[-5:]:  # Last 5 messages
+        for msg in history:
             role = "User" if msg.get('role') == 'user' else "Assistant"
             history_text += f"{role}: {msg.get('content', '')}\n"
         
-        # Construct the prompt with reasoning chain
-        full_prompt = f"""{system_prompt}
-
-Previous conversation:
+        summary_text = f"Summary of earlier conversation:\n{summary}\n\n" if summary else ""
+        
+        # Construct the prompt; the reasoning-chain format lives in the system instruction
+        full_prompt = f"""{user_context}{summary_text}Previous conversation:
 {history_text}
 
-Current user message: {request.message}
-
-Please respond with:
-1. REASONING: Explain your thought process (what the user needs, what context matters, what approach to take)
-2. ACTIONS: List any actions you're taking or recommending (as a comma-separated list)
-3. RESPONSE: Your actual response to the user
-
-IMPORTANT - Format your RESPONSE section using proper Markdown:
-- Use **bold** for emphasis and key points
-- Use bullet points (•) for lists
-- Use numbered lists for steps or sequences
-- Use ### for section headers when appropriate
-- Use > for important callouts or quotes
-- Use emojis sparingly for warmth and visual appeal 😊
-- Keep paragraphs short and readable
-
-Format:
-REASONING: [your reasoning]
-ACTIONS: [action1, action2, ...]
-RESPONSE: [your well-formatted markdown response]"""
+Current user message: {request.message}"""
 
-        # Call Gemini
-        model = get_gemini_model()
-        response = model.generate_content(full_prompt)
-        
-        # Parse the response
-        response_text = response.text
+        # Mixed messages go to each matching agent at once; everything else to one agent
+        categories = fanout_categories(request.message) if CHAT_FANOUT else []
+        if len(categories) > 1:
+            reasoning, actions, content = await fanout_chat(categories, full_prompt, urgency)
+        else:
+            model = get_gemini_model(route="chat", category=category, urgency=urgency,
+                                     system_instruction=chat_system_instruction(category))
+            response = await model.generate_content_async(full_prompt)
+            reasoning, actions, content = parse_agent_reply(response.text)
         
-        reasoning = ""
-        actions = []
-        content = response_text
-        
-        if "REASONING:" in response_text:
-            parts = response_text.split("REASONING:")
-            if len(parts) > 1:
-                rest = parts[1]
-                if "ACTIONS:" in rest:
-                    reasoning = rest.split("ACTIONS:")[0].strip()
-                    rest = rest.split("ACTIONS:")[1]
-                    if "RESPONSE:" in rest:
-                        actions_text = rest.split("RESPONSE:")[0].strip()
-                        actions = [a.strip() for a in actions_text.split(",") if a.strip()]
-                        content = rest.split("RESPONSE:")[1].strip()
-                    else:
-                        content = rest.strip()
-                elif "RESPONSE:" in rest:
-                    reasoning = rest.split("RESPONSE:")[0].strip()
-                    content = rest.split("RESPONSE:")[1].strip()
+        remember_chat_turn(request, content, background_tasks, use_memory)
         
         return ChatResponse(
             content=content,
@@ -340,24 +967,108 @@ RESPONSE: [your well-formatted markdown response]"""
             actions=actions or [f"processed_{category}_query"],
             category=category,
             sentiment=sentiment,
-            urgency=urgency
+            urgency=urgency,
+            memory=use_memory
         )
         
     except Exception as e:
-        print(f"Chat error: {e}")
+        logger.exception("Chat error")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.delete("/api/chat/memory/{user_id}/{conversation_id}", dependencies=[Depends(require_service_caller)])
+async def forget_conversation(user_id: str, conversation_id: str):
+    """Drop the server-side memory of a conversation (called when it is deleted)"""
+    conversation_memory.forget(user_id, conversation_id)
+    return {"success": True}
+
+@app.get("/api/routing/metrics")
+async def routing_metrics():
+    """Per-route model choice, latency, error and estimated cost metrics for this worker"""
+    return {"success": True, **get_model_router().metrics(), "contextCache": context_caches.metrics()}
+
+@app.get("/api/deadlines/metrics")
+async def deadlines_metrics():
+    """Requests cancelled by deadline or disconnect and the LLM calls that saved, for this worker"""
+    return {"success": True, **deadline_metrics()}
+
+@app.get("/api/idempotency/metrics")
+async def idempotency_metrics():
+    """Idempotent requests generated, replayed from the store or attached to a running generation, for this worker"""
+    return {"success": True, **idempotency_stats()}
+
+@app.get("/api/fairness/metrics")
+async def fairness_metrics():
+    """LLM slot usage, queue depth, tracked users and rejections for this worker"""
+    return {"success": True, **fair_scheduler.metrics()}
+
+@app.get("/api/usage")
+async def usage_totals(userId: Optional[str] = None, route: Optional[str] = None, since: Optional[float] = None,
+                       until: Optional[float] = None, window: Optional[str] = None, groupBy: Optional[str] = None):
+    """LLM calls, tokens and estimated cost from the usage ledger, filtered by user, route and
+    time (since/until as Unix seconds, or the current hour/day/month), optionally grouped"""
+    if groupBy is not None and groupBy not in USAGE_GROUPS:
+        raise HTTPException(status_code=422, detail=f"groupBy must be one of {', '.join(USAGE_GROUPS)}")
+    if window is not None:
+        if window not in ("hour", "day", "month"):
+            raise HTTPException(status_code=422, detail="window must be hour, day or month")
+        since, until = window_bounds(window)
+    data = await asyncio.to_thread(usage_ledger.totals, userId, route, since, until, groupBy)
+    budget = None
+    if userId and USAGE_BUDGET_USD > 0:
+        start, end = window_bounds(USAGE_BUDGET_WINDOW)
+        spent = await asyncio.to_thread(usage_ledger.spent, userId, start)
+        budget = {"limitUsd": USAGE_BUDGET_USD, "window": USAGE_BUDGET_WINDOW,
+                  "spentUsd": round(spent, 6), "resetsAt": end}
+    return {"success": True, **data, "since": since, "until": until, "budget": budget}
+
+def mood_trend(user_id: Optional[str], scores: List[float]) -> Dict[str, Any]:
+    """Trend features for prompts: the user's stored series, seeded from the scores sent
+    the first time; without a user id the scores are summarised on the fly"""
+    if user_id:
+        trend = mood_series.features(user_id)
+        if trend is None and scores:
+            mood_series.record(user_id, scores)
+            trend = mood_series.features(user_id)
+        if trend:
+            return trend
+    return mood_features(mood_series.stats.replay(scores))
+
+@app.post("/api/moods/{user_id}", dependencies=[Depends(require_service_caller)])
+async def record_mood(user_id: str, entry: MoodEntryRequest):
+    """Add a check-in to the user's mood series; returns its flags and the updated trend"""
+    if not 1 <= entry.score <= 10:
+        raise HTTPException(status_code=422, detail="score must be between 1 and 10")
+    try:
+        if entry.history and mood_series.features(user_id) is None:
+            mood_series.record(user_id, [s for s in entry.history if 1 <= s <= 10])
+        flags = mood_series.record(user_id, [entry.score], entry.at)
+        return {"success": True, "flags": flags, "trend": mood_series.features(user_id)}
+    except Exception as e:
+        logger.exception("Record mood error")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/moods/{user_id}", dependencies=[Depends(require_service_caller)])
+async def get_mood_series(user_id: str, limit: int = 30):
+    """Trend features and the most recent check-ins"""
+    return {
+        "success": True,
+        "trend": mood_series.features(user_id) or {"count": 0},
+        "points": mood_series.points(user_id, max(0, min(limit, mood_series.keep_points)))
+    }
+
 @app.post("/api/analyze-mood")
-async def analyze_mood(request: MoodAnalysisRequest):
+async def analyze_mood(request: MoodAnalysisRequest, http_request: Request = None):
     """Analyze journal entry for mood and sentiment"""
     try:
-        model = get_gemini_model()
+        model = get_gemini_model(route="analyze-mood")
+        trend = mood_trend(request.userId if is_service_caller(http_request) else None, request.recentMoods or [])
+        logger.debug("Mood analysis", extra={"journalEntry": request.journalEntry, "trend": trend.get("trend")})
         
         prompt = f"""Analyze this journal entry for emotional content and provide supportive insights.
 
 Journal Entry: {request.journalEntry}
 
-Recent mood scores (1-10): {request.recentMoods}
+Mood trend: {describe_mood(trend)}
 
 Provide a warm, formatted response with:
 
@@ -378,21 +1089,135 @@ One helpful intervention or activity
 
 Use **bold** for emphasis, bullet points for lists, and keep the tone warm and supportive."""
 
-        response = model.generate_content(prompt)
-        
-        return {"success": True, "analysis": response.text}
+        similar = asyncio.create_task(asyncio.to_thread(_index_journal_entry, request)) \
+            if JOURNAL_INDEX and request.userId and is_service_caller(http_request) else None
+        response = await model.generate_content_async(prompt)
+        
+        result = {"success": True, "analysis": response.text, "trend": trend}
+        if similar is not None:
+            try:
+                result["similarEntries"] = await similar
+            except Exception as e:
+                logger.warning("Journal index error: %s", e)
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _index_journal_entry(request: MoodAnalysisRequest) -> List[Dict[str, Any]]:
+    """Earlier entries like this one, then add it to the user's journal index"""
+    entry_id = request.entryId or hashlib.sha256(request.journalEntry.encode()).hexdigest()[:16]
+    similar = get_journal_index().search(request.userId, text=request.journalEntry, k=3, min_score=0.2)
+    get_journal_index().add(request.userId, [{"entryId": entry_id, "text": request.journalEntry}])
+    return [entry for entry in similar if entry["entryId"] != entry_id]
+
+@app.post("/api/journal/{user_id}/entries", dependencies=[Depends(require_service_caller)])
+async def add_journal_entries(user_id: str, request: JournalEntriesRequest):
+    """Add entries to the user's journal index (backfill); ids already indexed are skipped"""
+    if len(request.entries) > JOURNAL_MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {JOURNAL_MAX_BATCH} entries per request")
+    try:
+        counts = await asyncio.to_thread(get_journal_index().add, user_id, [e.model_dump() for e in request.entries])
+        return {"success": True, **counts}
     except Exception as e:
+        logger.exception("Journal index error")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/journal/{user_id}/search", dependencies=[Depends(require_service_caller)])
+async def search_journal(user_id: str, request: JournalSearchRequest):
+    """The user's entries most similar to a text or to one of their indexed entries"""
+    if not (request.text or request.entryId):
+        raise HTTPException(status_code=422, detail="Send text or entryId")
+    results = await asyncio.to_thread(get_journal_index().search, user_id, request.text, request.entryId,
+                                      max(1, min(request.k, 50)), request.minScore)
+    if results is None:
+        raise HTTPException(status_code=404, detail="Entry not found in the journal index")
+    return {"success": True, "results": results}
+
+@app.post("/api/journal/themes", dependencies=[Depends(require_service_caller)])
+async def journal_themes(request: JournalThemesRequest):
+    """Recurring themes across a user's journal (clustering; also a job and batch kind)"""
+    themes = await asyncio.to_thread(get_journal_index().themes, request.userId,
+                                     max(1, min(request.maxClusters, 20)), max(1, request.minSize))
+    return {"success": True, **themes}
+
+@app.delete("/api/journal/{user_id}/entries/{entry_id}", dependencies=[Depends(require_service_caller)])
+async def remove_journal_entry(user_id: str, entry_id: str):
+    """Drop one entry from the index (its vector is zeroed)"""
+    if not await asyncio.to_thread(get_journal_index().remove, user_id, entry_id):
+        raise HTTPException(status_code=404, detail="Entry not found in the journal index")
+    return {"success": True}
+
+@app.delete("/api/journal/{user_id}", dependencies=[Depends(require_service_caller)])
+async def drop_journal_index(user_id: str):
+    """Delete the user's whole journal index"""
+    return {"success": True, "deleted": await asyncio.to_thread(get_journal_index().drop, user_id)}
+
+# Skill gaps, learning order and timeline come from the bundled taxonomy; the model only
+# writes micro-project ideas, cached per (skill, level) for SKILL_PROJECT_TTL seconds
+SKILLS_TAXONOMY_PATH = os.getenv("SKILLS_TAXONOMY",
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), "skills_taxonomy.json"))
+SKILL_PROJECTS_MAX = int(os.getenv("SKILL_PROJECTS_MAX", 5))
+SKILL_PROJECT_TTL = int(os.getenv("SKILL_PROJECT_TTL", 7 * 24 * 3600))
+@_lazy
+def get_skill_taxonomy():
+    """Load the skills taxonomy on first use"""
+    from skills import SkillTaxonomy
+    return SkillTaxonomy(SKILLS_TAXONOMY_PATH)
+
+async def _skill_project(skill: str, level: str) -> Optional[Dict[str, Any]]:
+    """A micro-project for learning `skill` from `level`; None when the answer is not valid JSON.
+    The prompt holds nothing but the skill and level, so answers are shared across students."""
+    model = get_gemini_model(cache_ttl=SKILL_PROJECT_TTL, route="skill-project")
+    
+    prompt = f"""Suggest one hands-on micro-project for a student at {level} level who wants to learn {skill}.
+It should take a few evenings, use only free tools, and end in something they can show in a portfolio.
+
+Return ONLY valid JSON:
+{{"name": "Project title", "description": "What they build and what it teaches (2 sentences)", "steps": ["Step 1", "Step 2", "Step 3"], "estimatedHours": 10}}"""
+
+    response = await model.generate_content_async(prompt)
+    response_text = response.text.strip()
+    
+    if "```json" in response_text:
+        response_text = response_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in response_text:
+        response_text = response_text.split("```")[1].split("```")[0].strip()
+    
+    try:
+        data = json.loads(response_text)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict) or not data.get("name"):
+        return None
+    return {"skill": skill, "level": level, **data}
+
 @app.post("/api/analyze-skills")
 async def analyze_skill_gaps(request: SkillGapRequest):
     """Analyze skill gaps for a target role"""
     try:
-        model = get_gemini_model()
-        
-        skills_text = ", ".join([f"{s['name']} ({s.get('level', 0)}%)" for s in request.currentSkills])
-        
-        prompt = f"""Analyze skill gaps for someone targeting: {request.targetRole}
+        analysis = get_skill_taxonomy().analyze(request.currentSkills, request.targetRole)
+        if analysis is None:
+            return {"success": True, "analysis": await _llm_skill_analysis(request)}
+
+        steps = analysis["learningPath"][:SKILL_PROJECTS_MAX]
+        projects = await asyncio.gather(*(_skill_project(step["skill"], step["level"]) for step in steps),
+                                        return_exceptions=True)
+        for step, project in zip(steps, projects):
+            if isinstance(project, Exception):
+                logger.warning("Skill project error for %s: %s", step["skill"], project)
+        analysis["projects"] = [p for p in projects if isinstance(p, dict)]
+        return {"success": True, "analysis": analysis}
+    except Exception as e:
+        logger.exception("Skill analysis error")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _llm_skill_analysis(request: SkillGapRequest) -> str:
+    """Whole analysis from the model, for roles the taxonomy does not cover"""
+    model = get_gemini_model(cache_ttl=RESPONSE_CACHE_TTL, route="analyze-skills")
+    
+    skills_text = ", ".join([f"{s['name']} ({s.get('level', 0)}%)" for s in request.currentSkills])
+    
+    prompt = f"""Analyze skill gaps for someone targeting: {request.targetRole}
 
 Current skills: {skills_text}
 
@@ -418,17 +1243,14 @@ Related roles to consider while building skills
 
 Use **bold** for skill names, bullet points for lists, and emojis for visual appeal."""
 
-        response = model.generate_content(prompt)
-        
-        return {"success": True, "analysis": response.text}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    response = await model.generate_content_async(prompt)
+    return response.text
 
 @app.post("/api/match-scholarships")
 async def match_scholarships(request: ScholarshipMatchRequest):
     """Find matching scholarships based on profile"""
     try:
-        model = get_gemini_model()
+        model = get_gemini_model(route="match-scholarships")
         
         prompt = f"""Based on this student profile, suggest relevant scholarships they might qualify for:
 
@@ -443,7 +1265,7 @@ Provide 5 types of scholarships they should look for, including:
 
 Format as JSON array of scholarship opportunities."""
 
-        response = model.generate_content(prompt)
+        response = await model.generate_content_async(prompt)
         
         return {"success": True, "scholarships": response.text}
     except Exception as e:
@@ -453,7 +1275,7 @@ Format as JSON array of scholarship opportunities."""
 async def search_scholarships(request: ScholarshipSearchRequest):
     """Search for real scholarships based on user criteria"""
     try:
-        model = get_gemini_model()
+        model = get_gemini_model(cache_ttl=RESPONSE_CACHE_TTL, route="search-scholarships")
         
         # Build a comprehensive prompt for scholarship search
         criteria_text = f"""
@@ -493,9 +1315,9 @@ Provide 5-8 scholarships in this JSON format (NO markdown, just pure JSON):
 
 Return ONLY valid JSON, no explanations or markdown."""
 
-        response = model.generate_content(prompt)
+        response = await model.generate_content_async(prompt)
         response_text = response.text
-        print(f"Gemini response: {response_text[:500]}")  # Debug log
+        logger.debug("Scholarship search response", extra={"response": response_text[:500]})
         
         # Try to parse as JSON
         import json
@@ -512,7 +1334,7 @@ Return ONLY valid JSON, no explanations or markdown."""
             parsed_data = json.loads(clean_text.strip())
             return {"success": True, "data": parsed_data}
         except json.JSONDecodeError as je:
-            print(f"JSON parse error: {je}")
+            logger.warning("Scholarship search JSON parse error: %s", je)
             # Return a fallback structure
             return {
                 "success": True, 
@@ -525,94 +1347,130 @@ Return ONLY valid JSON, no explanations or markdown."""
             }
             
     except Exception as e:
-        print(f"Search scholarship error: {e}")
+        logger.exception("Search scholarship error")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/distill-content")
 async def distill_content(request: ContentDistillRequest):
     """Distill learning content into preferred format"""
     try:
-        model = get_gemini_model()
-        
         # Support both format parameter and learningStyle for flexibility
         output_format = request.format or request.learningStyle
+        model = get_gemini_model(cache_ttl=RESPONSE_CACHE_TTL, route="distill-content",
+                                 system_instruction=distill_system_instruction(output_format))
         
-        format_instructions = {
-            "summary": "Create a concise summary with:\n### 📝 Key Summary\nUse **bold** for key terms, bullet points for main ideas, and a brief conclusion.",
-            "bullet-points": "Create a structured outline:\n### 📋 Main Topics\nUse • for main points, ◦ for sub-points, and **bold** for key terms.",
-            "flashcards": "Create 5-7 flashcard Q&A pairs:\n### 🎴 Flashcards\nFormat each as:\n**Q:** Question here\n**A:** Answer here\n---",
-            "mind-map": "Create a text-based mind map:\n### 🧠 Mind Map\nUse indentation and arrows (→) to show relationships between concepts.",
-            "quiz": "Create a 5-question quiz:\n### 📝 Quiz\n**Q1.** Question\na) Option b) Option c) Option d) Option\n✅ **Answer:** Correct option with explanation",
-            "visual": "Create visual-friendly content:\n### 👁️ Visual Summary\nUse diagrams (described in text), **bold headers**, color-coded sections (🔴🟡🟢), and structured layouts.",
-            "auditory": "Write conversationally:\n### 🎧 Audio-Style Explanation\nUse 'Imagine...', 'Think of it like...', analogies, and a friendly tone as if explaining to a friend.",
-            "reading": "Provide detailed explanations:\n### 📖 Detailed Notes\nUse headers, **bold definitions**, examples in *italics*, and numbered references.",
-            "kinesthetic": "Include hands-on content:\n### ✋ Practice Activities\nProvide exercises, step-by-step tutorials, and 'Try this:' prompts for active learning."
-        }
-        
-        instruction = format_instructions.get(output_format, format_instructions["summary"])
-        
-        prompt = f"""Distill this content for a student.
-
-Task: {instruction}
-
-Content to distill:
-{request.content[:4000]}
-
-Format your response using proper Markdown:
-- Use **bold** for key terms and concepts
-- Use bullet points (•) for lists
-- Use numbered lists (1. 2. 3.) for sequential steps
-- Use ### headers for sections
-- Use > blockquotes for important notes
-- Use `code` formatting for technical terms
+        prompt = f"""Content to distill:
+{request.content[:4000]}"""
 
-Provide clear, well-organized, visually appealing output that helps the student learn effectively."""
-
-        response = model.generate_content(prompt)
+        response = await model.generate_content_async(prompt)
         
         return {"success": True, "distilled": response.text}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _ethics_review(text: str, matches: List[Dict[str, Any]], ratio: float) -> Dict[str, Any]:
+    """Review built from the fingerprint matches alone"""
+    if not matches:
+        return {
+            "concerns": [],
+            "suggestions": ["Keep citing the sources you quote or paraphrase."],
+            "overallAssessment": "No passages overlap earlier submissions."
+        }
+    concerns = [
+        f"Passage at characters {p['start']}-{p['end']} matches an earlier submission: \"{text[p['start']:p['end']][:200]}\""
+        for match in matches for p in match["passages"]
+    ]
+    return {
+        "concerns": concerns[:10],
+        "suggestions": [
+            "Rewrite the flagged passages in your own words, or quote them and cite the source.",
+            "If you reused your own earlier work, say so."
+        ],
+        "overallAssessment": f"About {round(ratio * 100)}% of the submission overlaps earlier submissions."
+    }
+
+def _fingerprint_submission(doc_key: str, owner: Optional[str], text: str) -> List[Dict[str, Any]]:
+    """Earlier submissions overlapping this one, then index it (SQLite and hashing: run off the loop)"""
+    fingerprints = get_fingerprint_index().winnower.fingerprints(text)
+    matches = get_fingerprint_index().matches(fingerprints, doc_key=doc_key, exclude_owner=owner)
+    get_fingerprint_index().add(doc_key, owner, text, fingerprints)
+    return matches
+
 @app.post("/api/ethics-check")
 async def ethics_check(content: Dict[str, str]):
-    """Check content for academic integrity issues"""
+    """Check content for academic integrity issues.
+    The whole submission is matched against a winnowing index of earlier submissions; only
+    partial overlap, where quoting or common phrasing may explain it, is reviewed by Gemini."""
+    from fingerprints import covered
     try:
-        model = get_gemini_model()
+        text = content.get('text', '')
+        owner = content.get('userId')
+        doc_key = content.get('documentId') or hashlib.sha256(f"{owner}\0{text}".encode()).hexdigest()
+        matches = await asyncio.to_thread(_fingerprint_submission, doc_key, owner, text)
+        ratio = covered((p["start"], p["end"]) for m in matches for p in m["passages"]) / max(len(text), 1)
+        
+        overlap = {"ratio": round(ratio, 3), "matches": matches}
+        if ratio < ETHICS_OVERLAP_LOW or ratio >= ETHICS_OVERLAP_HIGH:
+            return {"success": True, "review": _ethics_review(text, matches, ratio), "overlap": overlap, "source": "index"}
         
-        prompt = f"""Review this student submission for academic integrity concerns:
+        model = get_gemini_model(route="ethics-check")
+        
+        passages = "\n\n".join(
+            f"[{p['start']}-{p['end']}] ...{text[max(0, p['start'] - 200):p['end'] + 200]}..."
+            for m in matches for p in m["passages"]
+        )[:4000]
+        prompt = f"""Review this student submission for academic integrity concerns.
+
+A fingerprint check found that about {round(ratio * 100)}% of it overlaps earlier submissions.
+The overlapping passages (character offsets, with surrounding context) are:
 
-{content.get('text', '')[:2000]}
+{passages}
 
 Check for:
-1. Signs of AI-generated content that should be disclosed
-2. Potential plagiarism patterns
-3. Over-reliance on external sources without proper citation
-4. Any ethical concerns
+1. Whether the overlap is properly quoted and cited, common phrasing, or likely copied
+2. Over-reliance on external sources without proper citation
+3. Any ethical concerns
 
 Provide constructive feedback, not accusations. Help the student improve their work's originality.
 
 Format: JSON with keys: concerns (array), suggestions (array), overallAssessment (string)"""
 
-        response = model.generate_content(prompt)
+        response = await model.generate_content_async(prompt)
+        response_text = response.text.strip()
+        if "```" in response_text:
+            response_text = response_text.split("```json")[-1] if "```json" in response_text else response_text.split("```")[1]
+            response_text = response_text.split("```")[0].strip()
+        try:
+            review = json.loads(response_text)
+        except json.JSONDecodeError:
+            review = response.text
         
-        return {"success": True, "review": response.text}
+        return {"success": True, "review": review, "overlap": overlap, "source": "llm"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/generate-flashcards")
-async def generate_flashcards(request: FlashcardGenerateRequest):
-    """Generate AI flashcards for a given topic"""
-    try:
-        model = get_gemini_model()
-        
-        prompt = f"""Generate {request.count} educational flashcards about: {request.topic}
+def _generate_flashcard_chunk(topic: str, count: int, avoid: List[str], part: int = 0, parts: int = 1) -> List[Dict[str, Any]]:
+    """One Gemini call for `count` cards; [] when the answer is not a valid JSON array"""
+    import json
+    import re
+    model = get_gemini_model(route="generate-flashcards")
+    
+    avoid_block = ""
+    if avoid:
+        listed = "\n".join(f"- {q}" for q in avoid)
+        avoid_block = f"\n\nThe deck already has these questions, do NOT repeat or rephrase them:\n{listed}"
+    focus = ""
+    if parts > 1:
+        focus = (f"\n\nThis is batch {part + 1} of {parts} generated in parallel: if the topic were taught from"
+                 f" basics to advanced material in {parts} equal parts, cover part {part + 1}.")
+    
+    prompt = f"""Generate {count} educational flashcards about: {topic}
 
 Each flashcard should:
 1. Have a clear, specific question
 2. Have a comprehensive but concise answer
 3. Cover different aspects of the topic
-4. Be suitable for studying/revision
+4. Be suitable for studying/revision{avoid_block}{focus}
 
 Return ONLY a valid JSON array with this exact format (no markdown, no code blocks):
 [
@@ -620,38 +1478,75 @@ Return ONLY a valid JSON array with this exact format (no markdown, no code bloc
   {{"question": "How does...?", "answer": "By..."}}
 ]
 
-Generate exactly {request.count} flashcards covering key concepts of {request.topic}."""
+Generate exactly {count} flashcards covering key concepts of {topic}."""
 
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        # Clean up response - remove markdown code blocks if present
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
-        
-        import json
+    response_text = model.generate_content(prompt).text.strip()
+    
+    # Clean up response - remove markdown code blocks if present
+    if "```json" in response_text:
+        response_text = response_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in response_text:
+        response_text = response_text.split("```")[1].split("```")[0].strip()
+    
+    try:
+        cards = json.loads(response_text)
+    except json.JSONDecodeError:
+        # Try to extract JSON array from response
+        match = re.search(r'\[[\s\S]*\]', response_text)
+        if not match:
+            return []
         try:
-            flashcards = json.loads(response_text)
-            return {"success": True, "flashcards": flashcards, "topic": request.topic}
+            cards = json.loads(match.group())
         except json.JSONDecodeError:
-            # Try to extract JSON array from response
-            import re
-            match = re.search(r'\[[\s\S]*\]', response_text)
-            if match:
-                flashcards = json.loads(match.group())
-                return {"success": True, "flashcards": flashcards, "topic": request.topic}
-            
-            # Fallback: return raw text
-            return {
-                "success": False, 
-                "error": "Failed to parse flashcards",
-                "raw": response_text
-            }
+            return []
+    return cards if isinstance(cards, list) else []
+
+def _flashcard_slice(request: FlashcardGenerateRequest) -> Tuple[str, int, int]:
+    """Deck key, card count and offset a flashcard request reads"""
+    return (get_flashcard_decks().topic_key(request.topic), min(max(request.count, 1), FLASHCARD_MAX_COUNT),
+            max(request.offset, 0))
+
+@app.post("/api/generate-flashcards")
+async def generate_flashcards(request: FlashcardGenerateRequest):
+    """Generate AI flashcards for a given topic.
+    Cards live in a per-topic deck: a request returns deck[offset:offset + count] and only
+    generates what the deck is missing, split into chunks that run concurrently."""
+    try:
+        topic, count, offset = _flashcard_slice(request)
+        decks = get_flashcard_decks()  # SQLite: every call below runs off the event loop
+        
+        # A second round tops up cards dropped as near-duplicates
+        for _ in range(2):
+            missing = offset + count - await asyncio.to_thread(decks.count, topic)
+            if missing <= 0:
+                break
+            sizes = [FLASHCARD_CHUNK_SIZE] * (missing // FLASHCARD_CHUNK_SIZE)
+            if missing % FLASHCARD_CHUNK_SIZE:
+                sizes.append(missing % FLASHCARD_CHUNK_SIZE)
+            avoid = await asyncio.to_thread(decks.questions, topic)
+            chunks = await asyncio.gather(*(
+                asyncio.to_thread(_generate_flashcard_chunk, request.topic, size, avoid, part, len(sizes))
+                for part, size in enumerate(sizes)
+            ), return_exceptions=True)
+            cards = [card for chunk in chunks if isinstance(chunk, list) for card in chunk]
+            if not cards and all(isinstance(chunk, Exception) for chunk in chunks):
+                raise chunks[0]
+            if not await asyncio.to_thread(decks.add, topic, cards):
+                break
+        
+        flashcards = await asyncio.to_thread(decks.slice, topic, offset, count)
+        if not flashcards:
+            return {"success": False, "error": "Failed to parse flashcards"}
+        return {
+            "success": True,
+            "flashcards": flashcards,
+            "topic": request.topic,
+            "offset": offset,
+            "deckSize": await asyncio.to_thread(decks.count, topic)
+        }
             
     except Exception as e:
-        print(f"Generate flashcards error: {e}")
+        logger.exception("Generate flashcards error")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -667,6 +1562,7 @@ class MockInterviewRequest(BaseModel):
     role: str
     experience: str = "entry"
     questionType: str = "behavioral"  # behavioral, technical, case
+    userId: Optional[str] = None  # lets the question bank skip questions this user has seen
 
 
 class ProjectForgeRequest(BaseModel):
@@ -685,6 +1581,8 @@ class MicroGigRequest(BaseModel):
     skills: list
     availability: str = "10-15 hours/week"
     preferredType: str = "online"  # "online", "offline", "both"
+    limit: int = 10
+    tips: bool = True  # personalised tips from the model; the catalog's general tips otherwise
 
 
 class SubscriptionAuditRequest(BaseModel):
@@ -705,6 +1603,19 @@ class StudyPlanRequest(BaseModel):
     goal: str = "exam-prep"  # exam-prep, deep-learning, quick-review, project-work
 
 
+class ScheduleRequest(BaseModel):
+    tasks: List[Dict[str, Any]]  # academic tasks: id, title, deadline, estimatedHours, priority, progress, cognitiveLoadScore
+    blocks: List[Dict[str, Any]]  # free time: {"start": ISO time, "end": ISO time}
+    options: Dict[str, Any] = {}  # strategy (slack/edf), maxSessionMinutes, breakMinutes, maxHardMinutesPerDay, ...
+    userId: Optional[str] = None
+    now: Optional[str] = None  # plan from this time instead of the first block
+
+
+class ScheduleTaskUpdate(BaseModel):
+    task: Dict[str, Any]
+    now: Optional[str] = None  # sessions that started before this stay where they are
+
+
 class DigitalDetoxRequest(BaseModel):
     screenTime: dict  # {"social": hours, "entertainment": hours, "productive": hours}
     goal: str = "moderate"  # gentle, moderate, aggressive
@@ -715,13 +1626,14 @@ class WellnessInsightsRequest(BaseModel):
     wellness: dict  # {"sleepHours": int, "waterGlasses": int, "exerciseMinutes": int, "stressLevel": int, "caffeine": int}
     moodHistory: list = []
     averageMood: float = None
+    userId: Optional[str] = None
 
 
 @app.post("/api/find-peer-matches")
 async def find_peer_matches(request: PeerMatchRequest):
     """AI-powered peer matchmaking based on interests and skills"""
     try:
-        model = get_gemini_model()
+        model = get_gemini_model(route="find-peer-matches")
         
         prompt = f"""As a peer matching AI for students, analyze this profile and suggest ideal peer matches:
 
@@ -745,7 +1657,7 @@ Return ONLY valid JSON (no markdown):
     ]
 }}"""
 
-        response = model.generate_content(prompt)
+        response = await model.generate_content_async(prompt)
         response_text = response.text.strip()
         
         # Clean markdown if present
@@ -770,19 +1682,17 @@ Return ONLY valid JSON (no markdown):
             }
             
     except Exception as e:
-        print(f"Peer match error: {e}")
+        logger.exception("Peer match error")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/mock-interview")
-async def mock_interview(request: MockInterviewRequest):
-    """Generate mock interview questions and evaluate responses"""
-    try:
-        model = get_gemini_model()
-        
-        prompt = f"""You are an expert interviewer for {request.role} positions.
+def _mock_interview_prompt(request: MockInterviewRequest, avoid: List[str] = None) -> str:
+    avoid_text = ""
+    if avoid:
+        avoid_text = "\nDo NOT repeat or paraphrase these existing questions:\n" + "\n".join(f"- {q}" for q in avoid) + "\n"
+    return f"""You are an expert interviewer for {request.role} positions.
 Generate 5 {request.questionType} interview questions for {request.experience}-level candidates.
-
+{avoid_text}
 For each question, provide:
 1. The interview question
 2. What the interviewer is looking for
@@ -802,23 +1712,73 @@ Return ONLY valid JSON:
     "tips": ["General tip 1", "General tip 2"]
 }}"""
 
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
-        
-        import json
-        try:
-            data = json.loads(response_text)
-            return {"success": True, "interview": data}
-        except json.JSONDecodeError:
-            return {"success": False, "error": "Failed to parse interview questions"}
+def _generate_interview(request: MockInterviewRequest, avoid: List[str] = None) -> Optional[Dict[str, Any]]:
+    """One Gemini call for 5 questions; None when the answer is not valid JSON"""
+    import json
+    model = get_gemini_model(route="mock-interview")
+    response_text = model.generate_content(_mock_interview_prompt(request, avoid)).text.strip()
+    
+    if "```json" in response_text:
+        response_text = response_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in response_text:
+        response_text = response_text.split("```")[1].split("```")[0].strip()
+    
+    try:
+        data = json.loads(response_text)
+        return data if isinstance(data, dict) else None
+    except json.JSONDecodeError:
+        return None
+
+def refill_question_bank(request: MockInterviewRequest, combo: str):
+    """Background task: grow a thin bank with fresh, non-duplicate questions"""
+    with _bank_refills_lock:
+        if combo in _bank_refills:
+            return
+        _bank_refills.add(combo)
+    try:
+        data = _generate_interview(request, avoid=get_question_bank().recent_questions(combo))
+        if data:
+            get_question_bank().add(combo, data.get("questions", []), data.get("tips"))
+    except Exception:
+        logger.exception("Question bank refill error for %s", combo)
+    finally:
+        with _bank_refills_lock:
+            _bank_refills.discard(combo)
+
+
+@app.post("/api/mock-interview")
+async def mock_interview(request: MockInterviewRequest, background_tasks: BackgroundTasks = None):
+    """Generate mock interview questions and evaluate responses.
+    Served from the question bank when it holds 5 questions this user has not seen."""
+    try:
+        bank = get_question_bank()  # SQLite: every call below runs off the event loop
+        combo = bank.combo(request.role, request.experience, request.questionType)
+        sampled = await asyncio.to_thread(bank.sample, combo, request.userId, 5)
+        
+        if len(sampled) < 5:
+            # Bank too thin for this user: generate now and keep the new questions
+            data = await asyncio.to_thread(_generate_interview, request)
+            if data is None:
+                return {"success": False, "error": "Failed to parse interview questions"}
+            new_ids = await asyncio.to_thread(bank.add, combo, data.get("questions", []), data.get("tips"))
+            if request.userId:
+                await asyncio.to_thread(bank.mark_served, request.userId, new_ids)
+            return {"success": True, "interview": data, "source": "generated"}
+        
+        if request.userId:
+            await asyncio.to_thread(bank.mark_served, request.userId, [qid for qid, _ in sampled])
+        if background_tasks is not None and await asyncio.to_thread(bank.count, combo) < QUESTION_BANK_TARGET:
+            background_tasks.add_task(refill_question_bank, request, combo)
+        
+        return {
+            "success": True,
+            "interview": {"questions": [question for _, question in sampled],
+                          "tips": await asyncio.to_thread(bank.tips, combo)},
+            "source": "bank"
+        }
             
     except Exception as e:
-        print(f"Mock interview error: {e}")
+        logger.exception("Mock interview error")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -826,7 +1786,7 @@ Return ONLY valid JSON:
 async def project_forge(request: ProjectForgeRequest):
     """Generate a micro-project to build a specific skill"""
     try:
-        model = get_gemini_model()
+        model = get_gemini_model(cache_ttl=RESPONSE_CACHE_TTL, route="project-forge")
         
         prompt = f"""Create a {request.timeframe} micro-project to help a {request.level} developer learn {request.skill}.
 
@@ -850,7 +1810,7 @@ Return ONLY valid JSON:
     "resources": ["Helpful links or docs"]
 }}"""
 
-        response = model.generate_content(prompt)
+        response = await model.generate_content_async(prompt)
         response_text = response.text.strip()
         
         if "```json" in response_text:
@@ -866,7 +1826,7 @@ Return ONLY valid JSON:
             return {"success": False, "error": "Failed to generate project"}
             
     except Exception as e:
-        print(f"Project forge error: {e}")
+        logger.exception("Project forge error")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -874,7 +1834,7 @@ Return ONLY valid JSON:
 async def debt_calculator(request: DebtCalculatorRequest):
     """Calculate optimal debt repayment strategy"""
     try:
-        model = get_gemini_model()
+        model = get_gemini_model(route="debt-calculator")
         
         loans_info = "\n".join([f"- {l.get('name', 'Loan')}: ₹{l.get('amount', 0)}, {l.get('interestRate', 0)}% APR, min ₹{l.get('minPayment', 0)}/month" 
                                 for l in request.loans])
@@ -908,7 +1868,7 @@ Return ONLY valid JSON:
     "debtFreeDate": "Month Year"
 }}"""
 
-        response = model.generate_content(prompt)
+        response = await model.generate_content_async(prompt)
         response_text = response.text.strip()
         
         if "```json" in response_text:
@@ -924,65 +1884,69 @@ Return ONLY valid JSON:
             return {"success": False, "error": "Failed to generate debt plan"}
             
     except Exception as e:
-        print(f"Debt calculator error: {e}")
+        logger.exception("Debt calculator error")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/micro-gigs")
-async def find_micro_gigs(request: MicroGigRequest):
-    """Find suitable micro-gigs based on skills and availability"""
-    try:
-        model = get_gemini_model()
-        
-        prompt = f"""You are a career advisor helping a college student find micro-gigs.
+# Gigs come from a curated catalog (GIG_CATALOG, re-read when the file changes) matched and
+# ranked locally; the model only writes tips for the top matches, cached for GIG_TIPS_TTL seconds
+GIG_CATALOG_PATH = os.getenv("GIG_CATALOG",
+                             os.path.join(os.path.dirname(os.path.abspath(__file__)), "gigs_catalog.json"))
+GIG_CATALOG_RELOAD = float(os.getenv("GIG_CATALOG_RELOAD", 5))
+GIG_TIPS_TTL = int(os.getenv("GIG_TIPS_TTL", 7 * 24 * 3600))
+@_lazy
+def get_gig_catalog():
+    """Load the gig catalog on first use"""
+    from gigs import GigCatalog
+    return GigCatalog(GIG_CATALOG_PATH, reload_interval=GIG_CATALOG_RELOAD)
+
+async def _gig_tips(gigs: list, hours: float) -> Optional[list]:
+    """Tips for getting started on the top matches; None when the answer is not valid JSON.
+    The prompt holds only catalog gigs, matched skills and hours, so answers are shared."""
+    model = get_gemini_model(cache_ttl=GIG_TIPS_TTL, route="gig-tips")
+    
+    gigs_text = "\n".join(f"- {g['title']} ({g['platform']}, {g['earningPotential']}); student has: "
+                          f"{', '.join(g['matchedSkills']) or 'no specific skills'}" for g in gigs)
+    prompt = f"""A college student with about {hours:g} hours a week is considering these micro-gigs:
+{gigs_text}
 
-STUDENT PROFILE:
-- Skills: {', '.join(request.skills)}
-- Availability: {request.availability}
-- Preference: {request.preferredType} work
+Write 4 short, specific tips to land the first paying client on these gigs and grow earnings
+without hurting their studies. Return ONLY valid JSON:
+{{"tips": ["Tip 1", "Tip 2", "Tip 3", "Tip 4"]}}"""
 
-Find 8-10 suitable micro-gig opportunities. Include:
-1. Platform-based gigs (Fiverr, Upwork, Toptal, etc.)
-2. Local opportunities (tutoring, freelance, etc.)
-3. Student-specific opportunities
+    response = await model.generate_content_async(prompt)
+    response_text = response.text.strip()
+    
+    if "```json" in response_text:
+        response_text = response_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in response_text:
+        response_text = response_text.split("```")[1].split("```")[0].strip()
+    
+    try:
+        data = json.loads(response_text)
+    except json.JSONDecodeError:
+        return None
+    tips = data.get("tips") if isinstance(data, dict) else None
+    return [str(t) for t in tips] if isinstance(tips, list) and tips else None
 
-Return ONLY valid JSON:
-{{
-    "gigs": [
-        {{
-            "title": "Gig title",
-            "platform": "Platform name or 'Local'",
-            "type": "online/offline",
-            "earningPotential": "₹X - ₹Y per hour/task",
-            "skillMatch": 85,
-            "requirements": ["Requirement 1"],
-            "howToStart": "Brief steps to get started",
-            "pros": ["Pro 1"],
-            "cons": ["Con 1"]
-        }}
-    ],
-    "topRecommendation": "Best gig based on profile",
-    "weeklyEarningEstimate": "₹X - ₹Y",
-    "tips": ["Tip for maximizing earnings"]
-}}"""
 
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
-        
-        import json
-        try:
-            data = json.loads(response_text)
-            return {"success": True, "gigs": data}
-        except json.JSONDecodeError:
-            return {"success": False, "error": "Failed to find gigs"}
+@app.post("/api/micro-gigs")
+async def find_micro_gigs(request: MicroGigRequest):
+    """Find suitable micro-gigs based on skills and availability"""
+    try:
+        result = get_gig_catalog().match(request.skills, request.availability, request.preferredType,
+                                         limit=max(1, min(request.limit, 25)))
+        if request.tips and result["gigs"]:
+            try:
+                tips = await _gig_tips(result["gigs"][:3], result["availableHours"])
+                if tips:
+                    result["tips"] = tips
+            except Exception as e:
+                logger.warning("Gig tips error, using catalog tips: %s", e)
+        return {"success": True, "gigs": result}
             
     except Exception as e:
-        print(f"Micro gigs error: {e}")
+        logger.exception("Micro gigs error")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -990,7 +1954,7 @@ Return ONLY valid JSON:
 async def subscription_audit(request: SubscriptionAuditRequest):
     """Audit subscriptions and suggest optimizations"""
     try:
-        model = get_gemini_model()
+        model = get_gemini_model(route="subscription-audit")
         
         subs_info = "\n".join([f"- {s.get('name', 'Sub')}: ₹{s.get('cost', 0)}/{s.get('frequency', 'monthly')}, Usage: {s.get('usage', 'medium')}" 
                                for s in request.subscriptions])
@@ -1029,7 +1993,7 @@ Return ONLY valid JSON:
     "studentDiscounts": ["Available student discounts"]
 }}"""
 
-        response = model.generate_content(prompt)
+        response = await model.generate_content_async(prompt)
         response_text = response.text.strip()
         
         if "```json" in response_text:
@@ -1045,17 +2009,75 @@ Return ONLY valid JSON:
             return {"success": False, "error": "Failed to audit subscriptions"}
             
     except Exception as e:
-        print(f"Subscription audit error: {e}")
+        logger.exception("Subscription audit error")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/grant-writer")
-async def grant_writer(request: GrantWriterRequest):
-    """AI-powered grant writing assistant"""
-    try:
-        model = get_gemini_model()
-        
-        prompt = f"""You are an expert grant writing consultant helping a student write a grant application.
+# Budget shares per grant type (percent, purpose); the budget is computed locally, not by Gemini
+GRANT_BUDGET_SPLITS = {
+    "research": [("Equipment & Software", 30, "instruments and computing the study depends on"),
+                 ("Personnel & Stipends", 25, "research assistants and participant compensation"),
+                 ("Materials & Consumables", 20, "lab supplies, datasets and printing"),
+                 ("Travel & Fieldwork", 15, "data collection visits and field trips"),
+                 ("Dissemination", 5, "conference fees and open-access publication"),
+                 ("Contingency", 5, "unforeseen costs")],
+    "project": [("Materials & Equipment", 35, "components and tools to build the project"),
+                ("Personnel", 25, "team member stipends"),
+                ("Software & Services", 15, "licences, hosting and subscriptions"),
+                ("Outreach & Documentation", 15, "demos, reports and presentation material"),
+                ("Contingency", 10, "unforeseen costs")],
+    "startup": [("Prototype Development", 35, "building and iterating on the first product"),
+                ("Team", 20, "founder and contributor stipends"),
+                ("Marketing & Customer Discovery", 20, "user research and launch campaigns"),
+                ("Equipment & Infrastructure", 15, "hardware, hosting and workspace"),
+                ("Legal & Registration", 5, "company registration and IP filings"),
+                ("Contingency", 5, "unforeseen costs")],
+    "community": [("Program Delivery", 40, "running sessions, events and activities"),
+                  ("Materials & Supplies", 20, "kits and resources for participants"),
+                  ("Outreach & Awareness", 15, "reaching the community the project serves"),
+                  ("Volunteers & Staff", 15, "coordinator stipends and volunteer support"),
+                  ("Monitoring & Evaluation", 5, "surveys and impact measurement"),
+                  ("Contingency", 5, "unforeseen costs")],
+    "education": [("Tuition & Course Fees", 50, "fees for the programme of study"),
+                  ("Books & Learning Materials", 15, "textbooks, courses and software"),
+                  ("Equipment", 15, "a laptop or other study equipment"),
+                  ("Living & Travel", 15, "commuting and accommodation during the programme"),
+                  ("Contingency", 5, "unforeseen costs")],
+}
+
+# Sections written in parallel: section -> (what it covers, JSON keys with an example of each)
+GRANT_SECTIONS = {
+    "abstract": ("the executive summary and problem statement",
+                 '{"executiveSummary": "150-word compelling summary", "problemStatement": "Clear problem definition"}'),
+    "objectives": ("the project objectives and expected outcomes",
+                   '{"objectives": ["Objective 1", "Objective 2"], "expectedOutcomes": ["Outcome 1"]}'),
+    "methodology": ("the methodology and timeline",
+                    '{"methodology": "Step-by-step approach", "timeline": [{"phase": "Phase 1", "duration": "X months", "activities": "..."}]}'),
+    "impact": ("the evaluation plan, sustainability and grant writing tips",
+               '{"evaluationPlan": "How success will be measured", "sustainability": "Long-term impact and sustainability", "tips": ["Grant writing tips"]}'),
+}
+
+def grant_budget(grant_type: str, requested_amount: float) -> List[Dict[str, Any]]:
+    """Split the requested amount by the grant type's shares, rounded to ₹100, summing exactly"""
+    split = GRANT_BUDGET_SPLITS.get(grant_type, GRANT_BUDGET_SPLITS["research"])
+    total = max(0, int(round(requested_amount)))
+    budget, allocated = [], 0
+    for i, (category, share, purpose) in enumerate(split):
+        amount = total - allocated if i == len(split) - 1 else int(total * share / 100 // 100 * 100)
+        allocated += amount
+        budget.append({"category": category, "amount": amount,
+                       "justification": f"{share}% of the requested ₹{total:,} for {purpose}."})
+    return budget
+
+async def _grant_section(request: GrantWriterRequest, name: str, budget: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """One section of the proposal; None when the answer is not valid JSON"""
+    import json
+    model = get_gemini_model(route="grant-writer")
+    scope, template = GRANT_SECTIONS[name]
+    outline = "\n".join(f"- {section}: {covers}" for section, (covers, _) in GRANT_SECTIONS.items())
+    budget_lines = "\n".join(f"- {b['category']}: ₹{b['amount']:,}" for b in budget)
+    
+    prompt = f"""You are an expert grant writing consultant helping a student write a grant application.
 
 PROJECT DETAILS:
 - Title: {request.projectTitle}
@@ -1063,59 +2085,168 @@ PROJECT DETAILS:
 - Grant Type: {request.grantType}
 - Requested Amount: ₹{request.requestedAmount}
 
-Generate a complete grant application framework with:
-1. Executive Summary
-2. Problem Statement
-3. Project Objectives
-4. Methodology
-5. Budget Justification
-6. Expected Outcomes
-7. Evaluation Plan
+PROPOSAL OUTLINE (each section is written separately; stay within yours):
+{outline}
+- budget (already fixed):
+{budget_lines}
 
-Return ONLY valid JSON:
-{{
-    "title": "{request.projectTitle}",
-    "executiveSummary": "150-word compelling summary",
-    "problemStatement": "Clear problem definition",
-    "objectives": ["Objective 1", "Objective 2"],
-    "methodology": "Step-by-step approach",
-    "timeline": [
-        {{"phase": "Phase 1", "duration": "X months", "activities": "..."}}
-    ],
-    "budgetBreakdown": [
-        {{"category": "Equipment", "amount": 0, "justification": "..."}}
-    ],
-    "expectedOutcomes": ["Outcome 1"],
-    "evaluationPlan": "How success will be measured",
-    "sustainability": "Long-term impact and sustainability",
-    "tips": ["Grant writing tips"]
-}}"""
+Write {scope} for this grant application section, consistent with the outline and budget.
 
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
-        
-        import json
+Return ONLY valid JSON with exactly these keys:
+{template}"""
+
+    response = await model.generate_content_async(prompt)
+    response_text = response.text.strip()
+    
+    if "```json" in response_text:
+        response_text = response_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in response_text:
+        response_text = response_text.split("```")[1].split("```")[0].strip()
+    
+    try:
+        data = json.loads(response_text)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    return {key: data[key] for key in json.loads(template) if key in data}
+
+async def grant_sections(request: GrantWriterRequest):
+    """Yield (section, data or None, error or None) as each section finishes; the budget comes first"""
+    budget = grant_budget(request.grantType, request.requestedAmount)
+    yield "budget", {"budgetBreakdown": budget}, None
+    
+    async def run(name):
         try:
-            data = json.loads(response_text)
-            return {"success": True, "grant": data}
-        except json.JSONDecodeError:
+            return name, await _grant_section(request, name, budget), None
+        except Exception as e:
+            return name, None, e
+    
+    for finished in asyncio.as_completed([run(name) for name in GRANT_SECTIONS]):
+        yield await finished
+
+def _grant_error(error: Optional[Exception]) -> str:
+    return str(error) if error else "Failed to parse section"
+
+@app.post("/api/grant-writer")
+async def grant_writer(request: GrantWriterRequest):
+    """AI-powered grant writing assistant.
+    Sections are generated concurrently from a shared outline; the budget is computed locally."""
+    try:
+        grant = {"title": request.projectTitle}
+        failed = {}
+        async for name, data, error in grant_sections(request):
+            if data is None:
+                failed[name] = error
+            else:
+                grant.update(data)
+        
+        if len(failed) == len(GRANT_SECTIONS):
+            errors = [e for e in failed.values() if e]
+            if errors:
+                raise errors[0]
             return {"success": False, "error": "Failed to generate grant"}
+        
+        result = {"success": True, "grant": grant}
+        if failed:
+            result["missingSections"] = sorted(failed)
+        return result
             
     except Exception as e:
-        print(f"Grant writer error: {e}")
+        logger.exception("Grant writer error")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/grant-writer/stream")
+async def grant_writer_stream(request: GrantWriterRequest):
+    """Same proposal as /api/grant-writer, streamed as NDJSON: one "section" event per
+    finished section, then "done" with the assembled grant"""
+    async def stream():
+        grant = {"title": request.projectTitle}
+        failed = []
+        async for name, data, error in grant_sections(request):
+            if data is None:
+                failed.append(name)
+                logger.warning("Grant writer section error (%s): %s", name, _grant_error(error))
+                event = {"event": "error", "section": name, "error": _grant_error(error)}
+            else:
+                grant.update(data)
+                event = {"event": "section", "section": name, "data": data}
+            yield json_line(event)
+        done = {"event": "done", "success": len(failed) < len(GRANT_SECTIONS), "grant": grant}
+        if failed:
+            done["missingSections"] = sorted(failed)
+        yield json_line(done)
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+def _schedule_response(plan_id: str, plan: Dict[str, Any], started: float, **extra) -> Dict[str, Any]:
+    from scheduler import ScheduleOptions, TaskScheduler
+    scheduler = TaskScheduler(plan["blocks"], ScheduleOptions.from_request(plan["options"]))
+    return {"success": True, "planId": plan_id, **scheduler.summary(plan["state"]), **extra,
+            "computeMs": round(1000 * (time.perf_counter() - started), 2)}
+
+@app.post("/api/schedule")
+async def create_schedule(request: ScheduleRequest):
+    """Plan tasks into the student's free time blocks by deadline, effort and cognitive load (no LLM)"""
+    from scheduler import ScheduleOptions, TaskScheduler, normalize_task, parse_time
+    started = time.perf_counter()
+    try:
+        scheduler = TaskScheduler(request.blocks, ScheduleOptions.from_request(request.options))
+        tasks = [normalize_task(t) for t in request.tasks]
+        if len({t["id"] for t in tasks}) != len(tasks):
+            raise ValueError("task ids must be unique")
+        state = scheduler.plan(tasks, parse_time(request.now) if request.now else None)
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid schedule request: {e}")
+    plan_id = uuid.uuid4().hex[:16]
+    plan = {"userId": request.userId, "blocks": request.blocks, "options": request.options, "state": state}
+    get_schedule_plans().put(plan_id, request.userId, plan)
+    return _schedule_response(plan_id, plan, started)
+
+@app.get("/api/schedule/{plan_id}")
+async def get_schedule(plan_id: str):
+    started = time.perf_counter()
+    plan = get_schedule_plans().get(plan_id)
+    if plan is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    return _schedule_response(plan_id, plan, started)
+
+def _replan(plan_id: str, task_id: str, task: Optional[Dict[str, Any]], now: Optional[str]) -> Dict[str, Any]:
+    from scheduler import ScheduleOptions, TaskScheduler, normalize_task, parse_time
+    started = time.perf_counter()
+
+    def change(plan: Dict[str, Any]) -> int:
+        try:
+            scheduler = TaskScheduler(plan["blocks"], ScheduleOptions.from_request(plan["options"]))
+            changed = normalize_task({**task, "id": task_id}) if task is not None else None
+            plan["state"], kept = scheduler.replan(plan["state"], task_id, changed, parse_time(now) if now else None)
+        except (KeyError, TypeError, ValueError) as e:
+            raise HTTPException(status_code=422, detail=f"Invalid task: {e}")
+        return kept
+
+    # Read-modify-write in one transaction: two edits to one plan must not drop each other's task
+    updated = get_schedule_plans().update(plan_id, change)
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    plan, kept = updated
+    return _schedule_response(plan_id, plan, started, keptSessions=kept)
+
+@app.put("/api/schedule/{plan_id}/tasks/{task_id}")
+async def update_schedule_task(plan_id: str, task_id: str, update: ScheduleTaskUpdate):
+    """Add or change one task and re-plan only the part of the schedule it can affect"""
+    return _replan(plan_id, task_id, update.task, update.now)
+
+@app.delete("/api/schedule/{plan_id}/tasks/{task_id}")
+async def remove_schedule_task(plan_id: str, task_id: str, now: Optional[str] = None):
+    """Drop a task (done or cancelled) and re-plan from its first session"""
+    return _replan(plan_id, task_id, None, now)
 
 @app.post("/api/study-plan")
 async def create_study_plan(request: StudyPlanRequest):
     """Create a personalized study plan with Pomodoro sessions"""
     try:
-        model = get_gemini_model()
+        model = get_gemini_model(cache_ttl=RESPONSE_CACHE_TTL, route="study-plan")
         
         prompt = f"""Create a structured study plan for a student.
 
@@ -1158,7 +2289,7 @@ Return ONLY valid JSON:
     "motivationalTip": "Encouraging message"
 }}"""
 
-        response = model.generate_content(prompt)
+        response = await model.generate_content_async(prompt)
         response_text = response.text.strip()
         
         if "```json" in response_text:
@@ -1174,7 +2305,7 @@ Return ONLY valid JSON:
             return {"success": False, "error": "Failed to generate study plan"}
             
     except Exception as e:
-        print(f"Study plan error: {e}")
+        logger.exception("Study plan error")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -1182,7 +2313,7 @@ Return ONLY valid JSON:
 async def digital_detox(request: DigitalDetoxRequest):
     """Generate a personalized digital detox plan"""
     try:
-        model = get_gemini_model()
+        model = get_gemini_model(route="digital-detox")
         
         total_screen = sum(request.screenTime.values())
         
@@ -1216,7 +2347,7 @@ Return ONLY valid JSON:
     "expectedBenefits": ["Better sleep", "Improved focus"]
 }}"""
 
-        response = model.generate_content(prompt)
+        response = await model.generate_content_async(prompt)
         response_text = response.text.strip()
         
         if "```json" in response_text:
@@ -1232,17 +2363,20 @@ Return ONLY valid JSON:
             return {"success": False, "error": "Failed to generate detox plan"}
             
     except Exception as e:
-        print(f"Digital detox error: {e}")
+        logger.exception("Digital detox error")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/wellness-insights")
-async def wellness_insights(request: WellnessInsightsRequest):
+async def wellness_insights(request: WellnessInsightsRequest, http_request: Request = None):
     """Analyze wellness data and provide personalized insights"""
     try:
-        model = get_gemini_model()
+        model = get_gemini_model(route="wellness-insights")
         
         wellness = request.wellness
+        scores = [m.get("score") if isinstance(m, dict) else m for m in request.moodHistory]
+        user_id = request.userId if is_service_caller(http_request) else None
+        trend = mood_trend(user_id, [s for s in scores if isinstance(s, (int, float))])
         
         prompt = f"""Analyze this student's wellness data and provide personalized mental health insights.
 
@@ -1254,7 +2388,7 @@ WELLNESS DATA:
 - Stress Level: {wellness.get('stressLevel', 5)}/10
 - Average Mood Score: {request.averageMood or 'Unknown'}/10
 
-Recent Mood History: {request.moodHistory}
+Mood Trend: {describe_mood(trend)}
 
 Provide a comprehensive wellness analysis with:
 1. Overall wellness score (0-100)
@@ -1276,7 +2410,7 @@ Return ONLY valid JSON:
     "dailyGoals": ["Get to bed by 11 PM", "Drink water before meals"]
 }}"""
 
-        response = model.generate_content(prompt)
+        response = await model.generate_content_async(prompt)
         response_text = response.text.strip()
         
         if "```json" in response_text:
@@ -1287,15 +2421,200 @@ Return ONLY valid JSON:
         import json
         try:
             data = json.loads(response_text)
-            return {"success": True, "insights": data}
+            return {"success": True, "insights": data, "trend": trend}
         except json.JSONDecodeError:
             return {"success": False, "error": "Failed to generate wellness insights"}
             
     except Exception as e:
-        print(f"Wellness insights error: {e}")
+        logger.exception("Wellness insights error")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Background jobs for long-running generators: submit, then poll or subscribe for the result.
+# Besides the global cap, each client (fairness key) may have only so many jobs queued or running.
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", 1000))
+JOB_MAX_PER_USER = int(os.getenv("JOB_MAX_PER_USER", 5))
+JOB_MAX_PER_ADDRESS = int(os.getenv("JOB_MAX_PER_ADDRESS", 20))
+
+# Kinds that read or write a user's stored mood or journal data: jobs and bulk runs of them are
+# for the backend only
+USER_DATA_KINDS = {"analyze-mood", "wellness-insights", "journal-themes"}
+
+JOB_KINDS = {
+    "grant-writer": (GrantWriterRequest, grant_writer),
+    "project-forge": (ProjectForgeRequest, project_forge),
+    "study-plan": (StudyPlanRequest, create_study_plan),
+    "distill-content": (ContentDistillRequest, distill_content),
+    "journal-themes": (JournalThemesRequest, journal_themes),
+}
+
+def _job_handler(request_model, endpoint):
+    # Runs on the runner's loop: the endpoints already make their LLM calls off it, and a job
+    # cancelled by stop() stops with its task instead of generating on in another thread
+    async def handler(payload: Dict[str, Any]):
+        return await endpoint(request_model(**payload))
+    return handler
+
+@_lazy
+def get_job_runner():
+    from jobs import JobRunner, JobStore
+    runner = JobRunner(
+        JobStore(os.getenv("JOBS_DB_PATH", os.path.join(DATA_DIR, "jobs.db"))),
+        workers=int(os.getenv("JOB_WORKERS", 2)),
+        lease=float(os.getenv("JOB_LEASE_SECONDS", 300))
+    )
+    for kind, (request_model, endpoint) in JOB_KINDS.items():
+        runner.register(kind, _job_handler(request_model, endpoint))
+    return runner
+
+
+@app.post("/api/jobs/{kind}", status_code=202)
+async def submit_job(kind: str, payload: Dict[str, Any], request: Request):
+    """Queue a long-running generation; returns a job id to poll"""
+    if kind not in JOB_KINDS:
+        raise HTTPException(status_code=404, detail=f"Unknown job kind '{kind}'. Options: {', '.join(JOB_KINDS)}")
+    if kind in USER_DATA_KINDS:
+        require_service_caller(request)
+    client = client_key(request.scope, payload.get("userId"), is_service_caller(request))
+    request_model = JOB_KINDS[kind][0]
+    try:
+        payload = request_model(**payload).model_dump()
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    from jobs import QueueFullError
+    try:
+        job_id = get_job_runner().store.submit(
+            kind, payload, JOB_MAX_QUEUED, client=client,
+            max_per_client=JOB_MAX_PER_ADDRESS if client.startswith("ip:") else JOB_MAX_PER_USER)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    get_job_runner().notify()
+    return {
+        "success": True,
+        "jobId": job_id,
+        "status": "queued",
+        "statusUrl": f"/api/jobs/{job_id}",
+        "eventsUrl": f"/api/jobs/{job_id}/events"
+    }
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status; includes the endpoint's usual response as `result` once done"""
+    job = get_job_runner().store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "job": job}
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent events: a `status` event on every change, then `done` or `failed` with the job"""
+    if not get_job_runner().store.get(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        last_status = None
+        while True:
+            job = await asyncio.to_thread(get_job_runner().store.get, job_id)
+            if job is None:
+                yield "event: failed\ndata: {\"error\": \"Job not found\"}\n\n"
+                return
+            if job["status"] in ("done", "failed"):
+                yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+                return
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield f"event: status\ndata: {json.dumps({'id': job_id, 'status': last_status})}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(1.0)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+# Bulk generation (also used by `python batch.py`); packable kinds share one LLM call per few items
+BATCH_RPM = float(os.getenv("BATCH_RPM", 60))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", 4))
+batch_limiter = RateLimiter(BATCH_RPM, burst=BATCH_MAX_CONCURRENCY)
+
+async def _finish_packed_mood(request: MoodAnalysisRequest, result: Dict[str, Any]) -> Dict[str, Any]:
+    """What analyze_mood returns for an analysis written in a packed call"""
+    result["trend"] = await asyncio.to_thread(mood_trend, request.userId, request.recentMoods or [])
+    if JOURNAL_INDEX and request.userId:
+        try:
+            result["similarEntries"] = await asyncio.to_thread(_index_journal_entry, request)
+        except Exception as e:
+            logger.warning("Journal index error: %s", e)
+    return result
+
+async def _finish_packed_flashcards(request: FlashcardGenerateRequest, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Add packed cards to the topic's deck and answer from it like generate_flashcards; None when
+    the deck still lacks the requested slice (the endpoint then tops it up)"""
+    topic, count, offset = _flashcard_slice(request)
+    decks = get_flashcard_decks()
+    await asyncio.to_thread(decks.add, topic, result["flashcards"])
+    flashcards = await asyncio.to_thread(decks.slice, topic, offset, count)
+    if len(flashcards) < count:
+        return None
+    return {"success": True, "flashcards": flashcards, "topic": request.topic, "offset": offset,
+            "deckSize": await asyncio.to_thread(decks.count, topic)}
+
+BATCH_KINDS = {
+    "analyze-mood": BatchKind(MoodAnalysisRequest, analyze_mood, route="analyze-mood",
+                              pack_prompt=lambda items: pack_mood_analyses(
+                                  items, lambda r: mood_trend(r.userId, r.recentMoods or [])),
+                              unpack=unpack_mood_analyses, finish=_finish_packed_mood),
+    "generate-flashcards": BatchKind(FlashcardGenerateRequest, generate_flashcards, route="generate-flashcards",
+                                     pack_prompt=pack_flashcards, unpack=unpack_flashcards,
+                                     finish=_finish_packed_flashcards),
+    "analyze-skills": BatchKind(SkillGapRequest, analyze_skill_gaps, route="analyze-skills"),
+    "match-scholarships": BatchKind(ScholarshipMatchRequest, match_scholarships, route="match-scholarships"),
+    "search-scholarships": BatchKind(ScholarshipSearchRequest, search_scholarships, route="search-scholarships"),
+    "distill-content": BatchKind(ContentDistillRequest, distill_content, route="distill-content"),
+    "find-peer-matches": BatchKind(PeerMatchRequest, find_peer_matches, route="find-peer-matches"),
+    "mock-interview": BatchKind(MockInterviewRequest, mock_interview, route="mock-interview"),
+    "project-forge": BatchKind(ProjectForgeRequest, project_forge, route="project-forge"),
+    "debt-calculator": BatchKind(DebtCalculatorRequest, debt_calculator, route="debt-calculator"),
+    "micro-gigs": BatchKind(MicroGigRequest, find_micro_gigs, route="micro-gigs"),
+    "subscription-audit": BatchKind(SubscriptionAuditRequest, subscription_audit, route="subscription-audit"),
+    "grant-writer": BatchKind(GrantWriterRequest, grant_writer, route="grant-writer"),
+    "study-plan": BatchKind(StudyPlanRequest, create_study_plan, route="study-plan"),
+    "digital-detox": BatchKind(DigitalDetoxRequest, digital_detox, route="digital-detox"),
+    "wellness-insights": BatchKind(WellnessInsightsRequest, wellness_insights, route="wellness-insights"),
+    "journal-themes": BatchKind(JournalThemesRequest, journal_themes, route="journal-themes"),
+}
+
+async def batch_llm_call(prompt: str, route: str) -> str:
+    return await asyncio.to_thread(get_gemini_response, prompt, 0, route)
+
+
+@app.post("/api/batch/{kind}")
+async def run_batch_requests(kind: str, request: Request, packSize: int = 8, concurrency: int = 4):
+    """Bulk-run an NDJSON body of requests; results stream back as NDJSON in completion order"""
+    if kind not in BATCH_KINDS:
+        raise HTTPException(status_code=404, detail=f"Unknown batch kind '{kind}'. Options: {', '.join(BATCH_KINDS)}")
+    if kind in USER_DATA_KINDS:
+        require_service_caller(request)
+    try:
+        items = read_requests((await request.body()).decode("utf-8").splitlines())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid NDJSON: {e}")
+
+    async def stream():
+        async for record in run_batch(BATCH_KINDS[kind], items, batch_llm_call,
+                                      min(max(1, concurrency), BATCH_MAX_CONCURRENCY), batch_limiter, packSize):
+            yield json_line(record)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 8000)))
+    # WORKERS > 1 forks that many processes; they share the response cache through SQLite
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", 8000)),
+        workers=int(os.getenv("WORKERS", 1))
+    )
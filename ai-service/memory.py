@@ -0,0 +1,122 @@
+"""
+Ascendra - Conversation memory
+Per-user conversation store: a bounded ring of recent turns plus a rolling summary
+of everything older, so /api/chat prompts stay roughly constant in size.
+"""
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+from storage import SQLiteStore
+
+
+class ConversationMemory(SQLiteStore):
+    """Turns live in SQLite until they are folded into the conversation summary"""
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS turns ("
+        " conv TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL,"
+        " PRIMARY KEY (conv, seq))",
+        "CREATE TABLE IF NOT EXISTS summaries ("
+        " conv TEXT PRIMARY KEY, summary TEXT NOT NULL DEFAULT '', upto INTEGER NOT NULL DEFAULT 0,"
+        " updated_at REAL NOT NULL)",
+    )
+
+    def __init__(self, path: str, recent_turns: int = 6, fold_batch: int = 4):
+        super().__init__(path)
+        self.recent_turns = recent_turns
+        self.fold_batch = fold_batch
+
+    @staticmethod
+    def _key(user_id: str, conversation_id: str) -> str:
+        # Scoped by user so a conversation id alone never reaches another student's memory
+        return f"{user_id}:{conversation_id}"
+
+    def exists(self, user_id: str, conversation_id: str) -> bool:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT 1 FROM summaries WHERE conv = ?", (self._key(user_id, conversation_id),)
+            ).fetchone()
+        return row is not None
+
+    def append(self, user_id: str, conversation_id: str, turns: List[Dict[str, str]]):
+        """Append turns ({'role', 'content'}) to the conversation, creating it if needed"""
+        conv = self._key(user_id, conversation_id)
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR IGNORE INTO summaries (conv, updated_at) VALUES (?, ?)", (conv, time.time())
+                )
+                last = conn.execute(
+                    "SELECT COALESCE(MAX(seq), (SELECT upto FROM summaries WHERE conv = ?)) FROM turns WHERE conv = ?",
+                    (conv, conv),
+                ).fetchone()[0] or 0
+                conn.executemany(
+                    "INSERT INTO turns (conv, seq, role, content) VALUES (?, ?, ?, ?)",
+                    [(conv, last + i + 1, t.get("role", "user"), t.get("content", "")) for i, t in enumerate(turns)],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def context(self, user_id: str, conversation_id: str) -> Tuple[str, List[Dict[str, str]]]:
+        """Return (summary, most recent turns) for prompt building"""
+        conv = self._key(user_id, conversation_id)
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT summary FROM summaries WHERE conv = ?", (conv,)).fetchone()
+            rows = conn.execute(
+                "SELECT role, content FROM turns WHERE conv = ? ORDER BY seq DESC LIMIT ?",
+                (conv, self.recent_turns),
+            ).fetchall()
+        turns = [{"role": role, "content": content} for role, content in reversed(rows)]
+        return (row[0] if row else ""), turns
+
+    def pending_fold(self, user_id: str, conversation_id: str) -> Optional[Tuple[str, int, List[Dict[str, str]]]]:
+        """Turns that fell out of the recent ring and should be folded into the summary.
+        Returns (current summary, its upto seq, turns) or None when there is not enough to fold."""
+        conv = self._key(user_id, conversation_id)
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT summary, upto FROM summaries WHERE conv = ?", (conv,)).fetchone()
+            if not row:
+                return None
+            rows = conn.execute(
+                "SELECT seq, role, content FROM turns WHERE conv = ? ORDER BY seq DESC LIMIT -1 OFFSET ?",
+                (conv, self.recent_turns),
+            ).fetchall()
+        if len(rows) < self.fold_batch:
+            return None
+        summary, upto = row
+        turns = [{"seq": seq, "role": role, "content": content} for seq, role, content in reversed(rows)]
+        return summary, upto, turns
+
+    def store_summary(self, user_id: str, conversation_id: str, expected_upto: int, new_upto: int, summary: str) -> bool:
+        """Save a new summary covering turns up to new_upto and drop those turns.
+        Compare-and-set on the previous upto, so concurrent folds from other workers lose cleanly."""
+        conv = self._key(user_id, conversation_id)
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                updated = conn.execute(
+                    "UPDATE summaries SET summary = ?, upto = ?, updated_at = ? WHERE conv = ? AND upto = ?",
+                    (summary, new_upto, time.time(), conv, expected_upto),
+                ).rowcount
+                if updated:
+                    conn.execute("DELETE FROM turns WHERE conv = ? AND seq <= ?", (conv, new_upto))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return bool(updated)
+
+    def forget(self, user_id: str, conversation_id: str):
+        conv = self._key(user_id, conversation_id)
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM turns WHERE conv = ?", (conv,))
+            conn.execute("DELETE FROM summaries WHERE conv = ?", (conv,))
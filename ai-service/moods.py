@@ -0,0 +1,176 @@
+"""
+Ascendra - Mood time series
+Per-user mood scores (1-10) summarised incrementally: every check-in updates a fast and a
+slow EWMA, an exponentially weighted variance and a two-sided CUSUM in O(1), so trend,
+volatility, anomalies and change points are read without replaying the history.
+"""
+
+import math
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from storage import SQLiteStore
+
+_STATE_FIELDS = ("n", "latest", "fast", "slow", "var", "cusum_up", "cusum_down", "last_change", "last_change_seq",
+                 "updated_at")
+
+
+class MoodStats:
+    """Online statistics for one series; `update` is O(1)"""
+
+    def __init__(self, fast_alpha: float = 0.3, slow_alpha: float = 0.1, anomaly_z: float = 2.5,
+                 cusum_k: float = 0.5, cusum_h: float = 4.0, cusum_clip: float = 3.0, min_std: float = 0.75,
+                 warmup: int = 5):
+        self.fast_alpha = fast_alpha
+        self.slow_alpha = slow_alpha
+        self.anomaly_z = anomaly_z
+        self.cusum_k = cusum_k    # slack, in standard deviations, before drift accumulates
+        self.cusum_h = cusum_h    # accumulated drift that counts as a change point
+        self.cusum_clip = cusum_clip  # most one score adds to the drift, so an outlier alone is no change
+        self.min_std = min_std    # integer scores: don't let a flat streak make every move an anomaly
+        self.warmup = warmup
+
+    @staticmethod
+    def empty() -> Dict[str, Any]:
+        return {"n": 0, "latest": None, "fast": 0.0, "slow": 0.0, "var": 0.0, "cusum_up": 0.0, "cusum_down": 0.0,
+                "last_change": None, "last_change_seq": None, "updated_at": None}
+
+    def update(self, state: Dict[str, Any], score: float, at: Optional[float] = None) -> List[str]:
+        """Fold one score into state (in place); returns flags raised by it"""
+        flags = []
+        state["n"] += 1
+        state["latest"] = score
+        state["updated_at"] = at or time.time()
+        if state["n"] == 1:
+            state["fast"] = state["slow"] = float(score)
+            return flags
+
+        # Score against the baseline as it was before this point
+        std = max(math.sqrt(state["var"]), self.min_std)
+        z = (score - state["slow"]) / std
+        if state["n"] > self.warmup and abs(z) >= self.anomaly_z:
+            flags.append("anomaly-high" if z > 0 else "anomaly-low")
+
+        clipped = max(-self.cusum_clip, min(self.cusum_clip, z))
+        state["cusum_up"] = max(0.0, state["cusum_up"] + clipped - self.cusum_k)
+        state["cusum_down"] = max(0.0, state["cusum_down"] - clipped - self.cusum_k)
+        if state["n"] > self.warmup and max(state["cusum_up"], state["cusum_down"]) >= self.cusum_h:
+            direction = "up" if state["cusum_up"] >= state["cusum_down"] else "down"
+            flags.append(f"change-{direction}")
+            state["last_change"], state["last_change_seq"] = direction, state["n"]
+            state["cusum_up"] = state["cusum_down"] = 0.0
+
+        state["fast"] += self.fast_alpha * (score - state["fast"])
+        diff = score - state["slow"]
+        increment = self.slow_alpha * diff
+        state["slow"] += increment
+        state["var"] = (1 - self.slow_alpha) * (state["var"] + diff * increment)
+        if state["last_change_seq"] == state["n"]:
+            # Restart both averages at the new level so one shift is reported once
+            state["fast"] = state["slow"] = float(score)
+        return flags
+
+    def replay(self, scores: Iterable[float]) -> Dict[str, Any]:
+        """State for a series that is not stored (e.g. a client-sent list)"""
+        state = self.empty()
+        for score in scores:
+            self.update(state, score)
+        return state
+
+
+def features(state: Dict[str, Any], recent_flags: Optional[List[str]] = None) -> Dict[str, Any]:
+    if not state or not state["n"]:
+        return {"count": 0}
+    momentum = state["fast"] - state["slow"]
+    trend = "improving" if momentum >= 0.5 else "declining" if momentum <= -0.5 else "stable"
+    result = {
+        "count": state["n"],
+        "latest": state["latest"],
+        "smoothed": round(state["fast"], 2),
+        "baseline": round(state["slow"], 2),
+        "volatility": round(math.sqrt(state["var"]), 2),
+        "trend": trend,
+        "lastChange": None,
+        "recentAnomalies": sum(1 for f in recent_flags or [] if f.startswith("anomaly")),
+    }
+    if state["last_change"]:
+        result["lastChange"] = {"direction": state["last_change"], "checkInsAgo": state["n"] - state["last_change_seq"]}
+    return result
+
+
+def describe(feats: Dict[str, Any]) -> str:
+    """One prompt line instead of the raw score list"""
+    if not feats.get("count"):
+        return "No mood history yet."
+    text = (f"{feats['count']} check-ins on a 1-10 scale; latest {feats['latest']}, recent average "
+            f"{feats['smoothed']} vs longer-term {feats['baseline']} ({feats['trend']}), volatility {feats['volatility']}")
+    if feats.get("lastChange"):
+        change = feats["lastChange"]
+        text += f"; mood shifted {change['direction']} {change['checkInsAgo']} check-ins ago"
+    if feats.get("recentAnomalies"):
+        text += f"; {feats['recentAnomalies']} unusual score(s) in the last week of check-ins"
+    return text + "."
+
+
+class MoodSeriesStore(SQLiteStore):
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS mood_state ("
+        " user_id TEXT PRIMARY KEY, n INTEGER NOT NULL, latest REAL, fast REAL NOT NULL, slow REAL NOT NULL,"
+        " var REAL NOT NULL, cusum_up REAL NOT NULL, cusum_down REAL NOT NULL, last_change TEXT,"
+        " last_change_seq INTEGER, updated_at REAL)",
+        "CREATE TABLE IF NOT EXISTS mood_points ("
+        " user_id TEXT NOT NULL, seq INTEGER NOT NULL, score REAL NOT NULL, at REAL NOT NULL, flags TEXT NOT NULL,"
+        " PRIMARY KEY (user_id, seq))",
+    )
+
+    def __init__(self, path: str, stats: Optional[MoodStats] = None, keep_points: int = 90):
+        super().__init__(path)
+        self.stats = stats or MoodStats()
+        self.keep_points = keep_points
+
+    def _state(self, conn, user_id: str) -> Optional[Dict[str, Any]]:
+        row = conn.execute(f"SELECT {', '.join(_STATE_FIELDS)} FROM mood_state WHERE user_id = ?", (user_id,)).fetchone()
+        return dict(zip(_STATE_FIELDS, row)) if row else None
+
+    def record(self, user_id: str, scores: List[float], at: Optional[float] = None) -> List[str]:
+        """Append scores in order; returns the flags raised by the last one"""
+        flags = []
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                state = self._state(conn, user_id) or self.stats.empty()
+                for score in scores:
+                    flags = self.stats.update(state, score, at)
+                    conn.execute("INSERT OR REPLACE INTO mood_points (user_id, seq, score, at, flags) VALUES (?, ?, ?, ?, ?)",
+                                 (user_id, state["n"], score, state["updated_at"], ",".join(flags)))
+                conn.execute(f"INSERT OR REPLACE INTO mood_state (user_id, {', '.join(_STATE_FIELDS)})"
+                             f" VALUES (?, {', '.join('?' * len(_STATE_FIELDS))})",
+                             (user_id, *(state[f] for f in _STATE_FIELDS)))
+                conn.execute("DELETE FROM mood_points WHERE user_id = ? AND seq <= ?",
+                             (user_id, state["n"] - self.keep_points))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return flags
+
+    def features(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Trend features, or None when the user has no series"""
+        with self._lock:
+            conn = self._connection()
+            state = self._state(conn, user_id)
+            if state is None:
+                return None
+            recent = conn.execute("SELECT flags FROM mood_points WHERE user_id = ? ORDER BY seq DESC LIMIT 7",
+                                  (user_id,)).fetchall()
+        return features(state, [f for row in recent for f in row[0].split(",") if f])
+
+    def points(self, user_id: str, limit: int = 30) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT seq, score, at, flags FROM mood_points WHERE user_id = ? ORDER BY seq DESC LIMIT ?",
+                (user_id, limit),
+            ).fetchall()
+        return [{"seq": s, "score": score, "at": at, "flags": flags.split(",") if flags else []}
+                for s, score, at, flags in reversed(rows)]
@@ -0,0 +1,180 @@
+"""
+Ascendra - LLM providers
+Every model call goes through a provider picked per routing tier: Gemini, a llama.cpp server
+running a small model on the local CPU, or a cassette that records responses by prompt hash
+and replays them, so benchmarks and CI runs are deterministic and need no API key.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Optional
+
+
+class ProviderError(Exception):
+    pass
+
+
+class CassetteMissError(ProviderError):
+    pass
+
+
+@dataclass
+class Completion:
+    text: str
+    prompt_tokens: Optional[int] = None      # None when the backend does not report usage
+    completion_tokens: Optional[int] = None
+    cached_tokens: int = 0
+    replayed: bool = False                   # served from a cassette: nothing was billed
+
+    def usage(self) -> Dict[str, Any]:
+        return {"prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens,
+                "cached_tokens": self.cached_tokens}
+
+
+class LLMProvider:
+    name = "base"
+
+    def generate(self, model: str, prompt: str, system_instruction: Optional[str] = None,
+                 timeout: Optional[float] = None) -> Completion:
+        """timeout (seconds) is how long the caller can still wait, when it has a deadline"""
+        raise NotImplementedError
+
+
+class GeminiProvider(LLMProvider):
+    """google.genai models.generate_content; a static system_instruction is served from a
+    context cache when the manager has one"""
+    name = "gemini"
+
+    def __init__(self, client_factory: Callable[[], Any], context_caches=None):
+        self.client_factory = client_factory
+        self.context_caches = context_caches
+
+    @staticmethod
+    def _completion(response) -> Completion:
+        usage = getattr(response, "usage_metadata", None)
+        return Completion(response.text, getattr(usage, "prompt_token_count", None),
+                          getattr(usage, "candidates_token_count", None),
+                          getattr(usage, "cached_content_token_count", None) or 0)
+
+    def generate(self, model: str, prompt: str, system_instruction: Optional[str] = None,
+                 timeout: Optional[float] = None) -> Completion:
+        llm = self.client_factory()
+        config = None
+        if system_instruction:
+            cached_content = self.context_caches.cached_name(model, system_instruction) if self.context_caches else None
+            config = {"cached_content": cached_content} if cached_content else {"system_instruction": system_instruction}
+        if timeout is not None:
+            config = {**(config or {}), "http_options": {"timeout": max(1, int(1000 * timeout))}}
+        try:
+            return self._completion(llm.models.generate_content(model=model, contents=prompt, config=config))
+        except Exception as e:
+            if not (config and "cached_content" in config and ("NOT_FOUND" in str(e) or "404" in str(e))):
+                raise
+            # Cache expired or deleted elsewhere: forget it and send the prefix inline
+            self.context_caches.invalidate(model)
+            config = {**config, "system_instruction": system_instruction}
+            config.pop("cached_content")
+            return self._completion(llm.models.generate_content(model=model, contents=prompt, config=config))
+
+
+class LlamaCppProvider(LLMProvider):
+    """OpenAI-compatible chat endpoint of a llama.cpp server (llama-server -m model.gguf);
+    the routing tier's model name is passed through"""
+    name = "local"
+
+    def __init__(self, base_url: str, timeout: float = 60.0, max_tokens: int = 1024, temperature: float = 0.7):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self._http = None
+        self._lock = threading.Lock()
+
+    def _client(self):
+        if self._http is None:
+            with self._lock:
+                if self._http is None:
+                    import httpx
+                    self._http = httpx.Client(base_url=self.base_url, timeout=self.timeout)
+        return self._http
+
+    def generate(self, model: str, prompt: str, system_instruction: Optional[str] = None,
+                 timeout: Optional[float] = None) -> Completion:
+        messages = [{"role": "system", "content": system_instruction}] if system_instruction else []
+        messages.append({"role": "user", "content": prompt})
+        response = self._client().post("/v1/chat/completions", json={
+            "model": model, "messages": messages, "max_tokens": self.max_tokens, "temperature": self.temperature,
+        }, timeout=min(timeout, self.timeout) if timeout is not None else self.timeout)
+        if response.status_code != 200:
+            raise ProviderError(f"Local model error {response.status_code}: {response.text[:200]}")
+        data = response.json()
+        usage = data.get("usage") or {}
+        return Completion(data["choices"][0]["message"]["content"], usage.get("prompt_tokens"),
+                          usage.get("completion_tokens"))
+
+
+class Cassette:
+    """Prompt hash -> response, as an NDJSON file that can be committed next to a benchmark.
+    The model is not part of the key, so a replay does not depend on which tier the router picks.
+    Prompts carry student text, so only their hash is written; responses can still echo it."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, Completion] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = Completion(entry["response"], **(entry.get("usage") or {}))
+
+    @staticmethod
+    def key(prompt: str, system_instruction: Optional[str] = None) -> str:
+        return hashlib.sha256(f"{system_instruction or ''}\0{prompt}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Completion]:
+        return self._entries.get(key)
+
+    def put(self, key: str, completion: Completion, model: str):
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = completion
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "model": model, "response": completion.text,
+                                    "usage": completion.usage(), "recordedAt": time.time()}, ensure_ascii=False) + "\n")
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CassetteProvider(LLMProvider):
+    """Replays recorded responses; when recording, misses go to the wrapped provider and are
+    appended, otherwise a miss is an error"""
+    name = "cassette"
+
+    def __init__(self, cassette: Cassette, inner: Optional[LLMProvider] = None, record: bool = False):
+        self.cassette = cassette
+        self.inner = inner
+        self.record = record
+
+    def generate(self, model: str, prompt: str, system_instruction: Optional[str] = None,
+                 timeout: Optional[float] = None) -> Completion:
+        key = Cassette.key(prompt, system_instruction)
+        recorded = self.cassette.get(key)
+        if recorded is not None:
+            return replace(recorded, replayed=True)
+        if not self.record or self.inner is None:
+            raise CassetteMissError(f"No recorded response for prompt {key[:12]} in {self.cassette.path}")
+        completion = self.inner.generate(model, prompt, system_instruction, timeout)
+        if completion.text:
+            self.cassette.put(key, completion, model)
+        return completion
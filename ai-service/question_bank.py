@@ -0,0 +1,122 @@
+"""
+Ascendra - Interview question bank
+Pre-generated questions per (role, experience, questionType), de-duplicated with
+MinHash/LSH over the question and its model answer so paraphrases don't pile up, served per
+user without repeats for served_retention seconds.
+"""
+
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from lsh import MinHasher, NearDuplicates
+from storage import SQLiteStore
+
+
+class QuestionBank(SQLiteStore):
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS questions ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT, combo TEXT NOT NULL, data TEXT NOT NULL,"
+        " signature BLOB NOT NULL, created_at REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS questions_combo ON questions (combo)",
+        "CREATE TABLE IF NOT EXISTS question_bands (combo TEXT NOT NULL, band TEXT NOT NULL, question_id INTEGER NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS question_bands_lookup ON question_bands (combo, band)",
+        "CREATE TABLE IF NOT EXISTS question_tips (combo TEXT PRIMARY KEY, tips TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS question_served ("
+        " user_id TEXT NOT NULL, question_id INTEGER NOT NULL, served_at REAL NOT NULL,"
+        " PRIMARY KEY (user_id, question_id))",
+        "CREATE INDEX IF NOT EXISTS question_served_at ON question_served (served_at)",
+    )
+
+    def __init__(self, path: str, threshold: float = 0.8, hasher: Optional[MinHasher] = None,
+                 served_retention: float = 90 * 86400, purge_every: int = 200):
+        super().__init__(path)
+        self.duplicates = NearDuplicates("questions", "question_bands", "question_id", "combo", threshold, hasher)
+        self.served_retention = served_retention
+        self.purge_every = purge_every
+        self._marks = 0
+
+    @staticmethod
+    def _signed_text(item: Dict[str, Any]) -> str:
+        return f"{item['question']}\n{item.get('modelAnswer') or ''}"
+
+    @staticmethod
+    def combo(role: str, experience: str, question_type: str) -> str:
+        normalize = lambda value: " ".join(re.findall(r"[a-z0-9+#]+", value.lower()))
+        return f"{normalize(role)}|{normalize(experience)}|{normalize(question_type)}"
+
+    def count(self, combo: str) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM questions WHERE combo = ?", (combo,)).fetchone()[0]
+
+    def add(self, combo: str, questions: List[Dict[str, Any]], tips: Optional[List[str]] = None) -> List[int]:
+        """Store questions that are not near-duplicates of the bank; returns the new ids"""
+        added = []
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for item in questions:
+                    text = item.get("question") if isinstance(item, dict) else None
+                    if not text:
+                        continue
+                    signature, bands = self.duplicates.signature(self._signed_text(item))
+                    if self.duplicates.is_duplicate(conn, combo, signature, bands):
+                        continue
+                    cursor = conn.execute(
+                        "INSERT INTO questions (combo, data, signature, created_at) VALUES (?, ?, ?, ?)",
+                        (combo, json.dumps(item, ensure_ascii=False), self.duplicates.hasher.pack(signature), time.time()),
+                    )
+                    self.duplicates.index(conn, combo, cursor.lastrowid, bands)
+                    added.append(cursor.lastrowid)
+                if tips:
+                    conn.execute("INSERT OR REPLACE INTO question_tips (combo, tips) VALUES (?, ?)",
+                                 (combo, json.dumps(tips, ensure_ascii=False)))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def sample(self, combo: str, user_id: Optional[str], k: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """Up to k random (id, question) pairs this user has not been served yet. Nothing is
+        marked: call mark_served for the ones actually shown."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT id, data FROM questions WHERE combo = ? AND id NOT IN"
+                " (SELECT question_id FROM question_served WHERE user_id = ?)"
+                " ORDER BY RANDOM() LIMIT ?",
+                (combo, user_id or "", k),
+            ).fetchall()
+        return [(row[0], json.loads(row[1])) for row in rows]
+
+    def mark_served(self, user_id: str, question_ids: List[int]):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO question_served (user_id, question_id, served_at) VALUES (?, ?, ?)",
+                [(user_id, qid, now) for qid in question_ids],
+            )
+            self._marks += 1
+            if self._marks % self.purge_every == 0:
+                self.purge_served(now)
+
+    def purge_served(self, now: Optional[float] = None):
+        """Forget servings older than served_retention, so those questions can come round again"""
+        with self._lock:
+            self._connection().execute("DELETE FROM question_served WHERE served_at < ?",
+                                       ((now or time.time()) - self.served_retention,))
+
+    def tips(self, combo: str) -> List[str]:
+        with self._lock:
+            row = self._connection().execute("SELECT tips FROM question_tips WHERE combo = ?", (combo,)).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def recent_questions(self, combo: str, limit: int = 20) -> List[str]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT data FROM questions WHERE combo = ? ORDER BY id DESC LIMIT ?", (combo, limit)
+            ).fetchall()
+        return [json.loads(row[0]).get("question", "") for row in rows]
@@ -0,0 +1,220 @@
+"""
+Ascendra - Model router
+Chooses a Gemini model per request from a file-based policy (routing.json) plus live
+latency/error stats, and keeps per-route metrics for tuning cost against p95.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("ascendra.router")
+
+
+def _percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100.0 * len(ordered))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+
+class _Window:
+    """Recent outcomes of one model or route: latencies (seconds) and failures"""
+
+    def __init__(self, size: int):
+        self.latencies = deque(maxlen=size)
+        self.failures = deque(maxlen=size)
+
+    def record(self, latency: float, ok: bool):
+        self.latencies.append(latency)
+        self.failures.append(0 if ok else 1)
+
+    @property
+    def error_rate(self) -> float:
+        return sum(self.failures) / len(self.failures) if self.failures else 0.0
+
+
+class ModelRouter:
+    """Rule-based tier selection with health-based fallback.
+
+    Rules are checked in order; the first whose conditions all match picks the tier.
+    Supported conditions: routes, categories, urgency (lists) and minInputChars /
+    maxInputChars. A tier whose model is unhealthy (error rate or p95 over the limits
+    in "health") is skipped in favour of its "fallback" tier, except for one probe
+    request every health.probeIntervalS seconds; a probe that succeeds within maxP95Ms
+    clears the model's stats so it takes traffic again. Each tier names the provider
+    serving it ("gemini" unless set) and may name a "failover" tier to retry a failed
+    call on.
+    """
+
+    def __init__(self, path: str, default_model: str, reload_interval: float = 5.0):
+        self.path = path
+        self.default_model = default_model
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self.policy: Dict[str, Any] = {}
+        self._models: Dict[str, _Window] = {}
+        self._probe_at: Dict[str, float] = {}  # unhealthy model -> when it may be probed next
+        self._probing = set()
+        self._routes: Dict[tuple, Dict[str, Any]] = {}
+        self._reload()
+
+    def _reload(self):
+        """(Re)load the policy file when it changed; a missing or broken file keeps the default model"""
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime and self.policy:
+            return
+        policy = {"tiers": {"standard": {"model": "default"}}, "defaultTier": "standard", "rules": []}
+        if mtime is not None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    policy = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error("Routing policy error, keeping previous policy: %s", e)
+                if self.policy:
+                    return
+        self.policy, self._mtime = policy, mtime
+
+    def _model_for(self, tier: str) -> str:
+        model = self.policy["tiers"].get(tier, {}).get("model", "default")
+        return self.default_model if model == "default" else model
+
+    def _choice(self, tier: str, rule_name: str) -> Dict[str, str]:
+        return {"tier": tier, "model": self._model_for(tier), "rule": rule_name,
+                "provider": self.policy["tiers"].get(tier, {}).get("provider", "gemini")}
+
+    def _healthy(self, model: str) -> bool:
+        health = self.policy.get("health", {})
+        window = self._models.get(model)
+        if window is None or len(window.latencies) < health.get("minSamples", 10):
+            return True
+        if window.error_rate > health.get("maxErrorRate", 0.5):
+            return False
+        return _percentile(window.latencies, 95) * 1000 <= health.get("maxP95Ms", float("inf"))
+
+    def _probe(self, model: str) -> bool:
+        """Half-open: whether this request may try an unhealthy model"""
+        now = time.monotonic()
+        interval = self.policy.get("health", {}).get("probeIntervalS", 30)
+        if now < self._probe_at.setdefault(model, now + interval):
+            return False
+        self._probe_at[model] = now + interval
+        self._probing.add(model)
+        return True
+
+    def choose(self, route: str, input_chars: int = 0, category: Optional[str] = None,
+               urgency: Optional[str] = None) -> Dict[str, str]:
+        """Return {'tier', 'model', 'rule', 'provider'} for a request"""
+        with self._lock:
+            if time.monotonic() - self._checked_at > self.reload_interval:
+                self._reload()
+            tier, rule_name = self.policy.get("defaultTier", "standard"), "default"
+            for rule in self.policy.get("rules", []):
+                if "routes" in rule and route not in rule["routes"]:
+                    continue
+                if "categories" in rule and category not in rule["categories"]:
+                    continue
+                if "urgency" in rule and urgency not in rule["urgency"]:
+                    continue
+                if input_chars < rule.get("minInputChars", 0):
+                    continue
+                if input_chars > rule.get("maxInputChars", float("inf")):
+                    continue
+                tier, rule_name = rule["tier"], rule.get("name", rule["tier"])
+                break
+
+            seen = set()
+            while tier not in seen:
+                seen.add(tier)
+                model = self._model_for(tier)
+                fallback = self.policy["tiers"].get(tier, {}).get("fallback")
+                if self._healthy(model):
+                    self._probe_at.pop(model, None)
+                    break
+                if not fallback:
+                    break
+                if self._probe(model):
+                    rule_name = f"{rule_name}->probe"
+                    break
+                tier, rule_name = fallback, f"{rule_name}->fallback"
+            return self._choice(tier, rule_name)
+
+    def failover(self, choice: Dict[str, str]) -> Optional[Dict[str, str]]:
+        """Where to retry a call that failed on choice's tier, or None"""
+        with self._lock:
+            tier = self.policy["tiers"].get(choice["tier"], {}).get("failover")
+            if not tier or tier not in self.policy["tiers"]:
+                return None
+            return self._choice(tier, f"{choice['rule']}->failover")
+
+    def estimate_cost(self, tier: str, input_tokens: float, output_tokens: float, cached_tokens: float = 0) -> float:
+        """USD for one call at the tier's prices; cached input is billed at cachedInputPricePerMTok
+        (a quarter of the input price unless set)"""
+        prices = self.policy["tiers"].get(tier, {})
+        input_price = prices.get("inputPricePerMTok", 0)
+        cached_price = prices.get("cachedInputPricePerMTok", input_price / 4)
+        return ((input_tokens - cached_tokens) * input_price + cached_tokens * cached_price
+                + output_tokens * prices.get("outputPricePerMTok", 0)) / 1_000_000
+
+    def record(self, route: str, model: str, tier: str, latency: float, ok: bool,
+               input_chars: int = 0, output_chars: int = 0, prompt_tokens: Optional[int] = None,
+               completion_tokens: Optional[int] = None, cached_tokens: int = 0) -> float:
+        """Feed the outcome of an LLM call back into health stats and route metrics; returns
+        its estimated cost. Token counts come from the response's usage metadata; without them
+        characters approximate tokens at ~4 chars each."""
+        health = self.policy.get("health", {})
+        size = health.get("window", 100)
+        input_tokens = input_chars / 4 if prompt_tokens is None else prompt_tokens
+        output_tokens = output_chars / 4 if completion_tokens is None else completion_tokens
+        cost = self.estimate_cost(tier, input_tokens, output_tokens, cached_tokens)
+        with self._lock:
+            window = self._models.setdefault(model, _Window(size))
+            if model in self._probing:
+                self._probing.discard(model)
+                if ok and latency * 1000 <= health.get("maxP95Ms", float("inf")):
+                    window = self._models[model] = _Window(size)  # recovered: start over
+                    self._probe_at.pop(model, None)
+            window.record(latency, ok)
+            metrics = self._routes.setdefault((route, model), {
+                "route": route, "model": model, "tier": tier, "calls": 0, "errors": 0,
+                "inputChars": 0, "outputChars": 0, "estimatedCostUsd": 0.0, "window": _Window(500),
+            })
+            metrics["calls"] += 1
+            metrics["errors"] += 0 if ok else 1
+            metrics["inputChars"] += input_chars
+            metrics["outputChars"] += output_chars
+            metrics["estimatedCostUsd"] += cost
+            metrics["window"].record(latency, ok)
+        return cost
+
+    def metrics(self) -> Dict[str, Any]:
+        """Per-route, per-model metrics (this worker process only)"""
+        with self._lock:
+            routes = []
+            for metrics in self._routes.values():
+                window = metrics["window"]
+                row = {k: v for k, v in metrics.items() if k != "window"}
+                row["estimatedCostUsd"] = round(row["estimatedCostUsd"], 6)
+                row["p50Ms"] = round(_percentile(window.latencies, 50) * 1000, 1)
+                row["p95Ms"] = round(_percentile(window.latencies, 95) * 1000, 1)
+                row["recentErrorRate"] = round(window.error_rate, 3)
+                routes.append(row)
+            models = {
+                model: {"healthy": self._healthy(model), "errorRate": round(w.error_rate, 3),
+                        "p95Ms": round(_percentile(w.latencies, 95) * 1000, 1)}
+                for model, w in self._models.items()
+            }
+        return {"routes": sorted(routes, key=lambda r: (r["route"], r["model"])), "models": models,
+                "policyFile": self.path, "pid": os.getpid()}
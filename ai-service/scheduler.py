@@ -0,0 +1,337 @@
+"""
+Ascendra - Deadline-aware task scheduler
+Packs academic tasks into the student's free time blocks without the LLM. At every decision
+point the ready task with the least slack (or the earliest deadline) gets the next session;
+both keys are measured in available minutes rather than wall-clock time, so they do not move
+as the clock advances and a heap serves hundreds of tasks in milliseconds. Cognitively heavy
+tasks are capped per day unless they would otherwise miss their deadline. A plan remembers
+the key behind every session, so when one task changes only the part of the plan it can
+affect is recomputed.
+"""
+
+import bisect
+import heapq
+import json
+import math
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from storage import SQLiteStore
+
+PRIORITY_WEIGHTS = {"low": 1, "medium": 2, "high": 3, "urgent": 4}
+EPSILON = 0.01  # minutes; plan times are minutes since the epoch, so sums drift in the last digits
+
+
+@dataclass
+class ScheduleOptions:
+    strategy: str = "slack"            # "slack" (least slack first) or "edf" (earliest deadline first)
+    max_session: float = 90            # minutes of one task before switching or a break
+    min_session: float = 25            # shorter leftovers at the end of a block stay free
+    break_minutes: float = 10
+    hard_load: int = 7                 # cognitiveLoadScore (1-10) from which a task counts as heavy
+    max_hard_per_day: float = 180      # minutes of heavy work per day unless a deadline forces more
+    priority_credit: float = 60        # available minutes of head start per priority step
+
+    @classmethod
+    def from_request(cls, options: Dict[str, Any]) -> "ScheduleOptions":
+        names = {"strategy": "strategy", "maxSessionMinutes": "max_session", "minSessionMinutes": "min_session",
+                 "breakMinutes": "break_minutes", "hardLoad": "hard_load", "maxHardMinutesPerDay": "max_hard_per_day",
+                 "priorityCreditMinutes": "priority_credit"}
+        values = {names[k]: v for k, v in (options or {}).items() if k in names}
+        parsed = cls(**values)
+        if parsed.strategy not in ("slack", "edf"):
+            raise ValueError("strategy must be 'slack' or 'edf'")
+        if parsed.min_session <= 0 or parsed.max_session < parsed.min_session:
+            raise ValueError("need 0 < minSessionMinutes <= maxSessionMinutes")
+        return parsed
+
+
+def parse_time(value: Any) -> float:
+    """ISO 8601 string (naive means UTC) or Unix seconds -> minutes since the epoch"""
+    if isinstance(value, (int, float)):
+        return value / 60
+    moment = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp() / 60
+
+
+def format_time(minutes: float) -> str:
+    return datetime.fromtimestamp(minutes * 60, timezone.utc).isoformat(timespec="minutes").replace("+00:00", "Z")
+
+
+def _day(value: Any) -> str:
+    """Calendar day of a block in the time zone it was given in (for the heavy-work cap)"""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, timezone.utc).date().isoformat()
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).date().isoformat()
+
+
+def normalize_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields of the backend's academic task (deadline, estimatedHours, progress, priority,
+    cognitiveLoadScore) or their minute-based equivalents"""
+    task_id = str(task.get("id") or task.get("_id") or "")
+    if not task_id:
+        raise ValueError("every task needs an id")
+    if task.get("effortMinutes") is not None:
+        effort = float(task["effortMinutes"])
+    else:
+        effort = 60 * float(task.get("estimatedHours") or 1)
+    progress = min(100.0, max(0.0, float(task.get("progress") or 0)))
+    priority = task.get("priority", "medium")
+    weight = PRIORITY_WEIGHTS.get(priority, 2) if isinstance(priority, str) else float(priority)
+    deadline = task.get("deadline") or task.get("dueDate")
+    return {
+        "id": task_id,
+        "title": task.get("title") or task_id,
+        "deadline": parse_time(deadline) if deadline else math.inf,
+        "remaining": max(0.0, effort * (1 - progress / 100)),
+        "weight": weight,
+        "load": float(task.get("cognitiveLoadScore") or 5),
+    }
+
+
+class TaskScheduler:
+    """Free time blocks plus options; plan() and replan() work on plan states (plain dicts
+    that round-trip through JSON)"""
+
+    def __init__(self, blocks: List[Dict[str, Any]], options: Optional[ScheduleOptions] = None):
+        self.options = options or ScheduleOptions()
+        spans = sorted((parse_time(b["start"]), parse_time(b["end"]), _day(b["start"])) for b in blocks)
+        merged: List[List[Any]] = []
+        for start, end, day in spans:
+            if end <= start:
+                continue
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end, day])
+        self.starts = [b[0] for b in merged]
+        self.ends = [b[1] for b in merged]
+        self.days = [b[2] for b in merged]
+        self.prefix = [0.0]  # available minutes before each block
+        for start, end in zip(self.starts, self.ends):
+            self.prefix.append(self.prefix[-1] + end - start)
+
+    def capacity(self, t: float) -> float:
+        """Available minutes before t"""
+        if t == math.inf:
+            return self.prefix[-1]
+        i = bisect.bisect_right(self.starts, t) - 1
+        if i < 0:
+            return 0.0
+        return self.prefix[i] + min(t, self.ends[i]) - self.starts[i]
+
+    def key(self, task: Dict[str, Any], remaining: float) -> float:
+        """Smaller goes first. Slack is capacity(deadline) - capacity(now) - remaining; the
+        capacity(now) term is shared by every task, so it is left out and keys stay fixed."""
+        credit = self.options.priority_credit * (task["weight"] - PRIORITY_WEIGHTS["medium"])
+        deadline = self.capacity(task["deadline"]) if task["deadline"] != math.inf else self.prefix[-1] + 1e6
+        if self.options.strategy == "edf":
+            return deadline - credit
+        return deadline - remaining - credit
+
+    def plan(self, tasks: List[Dict[str, Any]], now: Optional[float] = None) -> Dict[str, Any]:
+        """Schedule normalized tasks from `now` (minutes; default the first block)"""
+        remaining = {t["id"]: t["remaining"] for t in tasks}
+        sessions, skips, cursor = self._run(tasks, remaining, {}, now if now is not None else -math.inf)
+        return {"tasks": tasks, "sessions": sessions, "skips": skips, "cursor": cursor}
+
+    def replan(self, state: Dict[str, Any], task_id: str, task: Optional[Dict[str, Any]],
+               now: Optional[float] = None) -> Tuple[Dict[str, Any], int]:
+        """Plan state with task_id replaced by `task` (or removed when None), recomputing only
+        from the first session the change can affect; returns it and how many sessions were kept.
+        Sessions that started before `now` are never moved."""
+        tasks = [t for t in state["tasks"] if t["id"] != task_id]
+        if task is not None:
+            tasks.append(task)
+        sessions = state["sessions"]
+        new_key = self.key(task, task["remaining"]) if task is not None else None
+
+        # The greedy pick at each session was the smallest key among eligible tasks; the plan up to
+        # the first session that used this task, or whose key the changed task now beats, stands
+        keep = len(sessions)
+        for i, (sid, _, _, key, _, _) in enumerate(sessions):
+            if sid == task_id or (new_key is not None and new_key <= key):
+                keep = i
+                break
+        resume = sessions[keep][1] if keep < len(sessions) else state["cursor"]
+        # Time left free (a short leftover, or a day's capped heavy work) might now fit the changed
+        # task; a removed task only mattered where it was the heavy work being capped
+        for skipped, room in state["skips"]:
+            if skipped >= resume:
+                break
+            if (task["remaining"] <= room) if task is not None else room == math.inf:
+                keep, resume = bisect.bisect_left([s[1] for s in sessions], skipped), skipped
+                break
+        if now is not None and now > resume:
+            keep = max(keep, sum(1 for s in sessions if s[1] < now))
+            resume = max(now, sessions[keep][1] if keep < len(sessions) else state["cursor"])
+
+        kept = sessions[:keep]
+        if task is not None:
+            # Its remaining effort is counted from now; sessions already under way stay on the plan
+            task["remaining"] += sum(end - start for sid, start, end, *_ in kept if sid == task_id)
+        remaining = {t["id"]: t["remaining"] for t in tasks}
+        hard_used: Dict[str, float] = {}
+        for sid, start, end, _, hard, day in kept:
+            if sid in remaining:
+                remaining[sid] -= end - start
+            if hard:
+                hard_used[day] = hard_used.get(day, 0.0) + end - start
+        skips = [s for s in state["skips"] if s[0] < resume]
+        new_sessions, new_skips, cursor = self._run(tasks, remaining, hard_used, resume)
+        return {"tasks": tasks, "sessions": kept + new_sessions, "skips": skips + new_skips, "cursor": cursor}, keep
+
+    def _run(self, tasks: List[Dict[str, Any]], remaining: Dict[str, float], hard_used: Dict[str, float],
+             t: float) -> Tuple[List[list], List[float], float]:
+        """Greedy simulation from time t; sessions are [task id, start, end, key, heavy, day] and
+        skips [time, minutes] where time was left free (minutes is inf when heavy work was capped)"""
+        opts = self.options
+        by_id = {task["id"]: task for task in tasks}
+        heap = [(self.key(task, remaining[task["id"]]), task["deadline"], task["id"])
+                for task in tasks if remaining.get(task["id"], 0) > EPSILON]
+        heapq.heapify(heap)
+        sessions: List[list] = []
+        skips: List[float] = []
+        b = max(0, bisect.bisect_right(self.ends, t))
+        while heap and b < len(self.starts):
+            t = max(t, self.starts[b])
+            day = self.days[b]
+            if self.ends[b] - t < opts.min_session and all(remaining[e[2]] > self.ends[b] - t for e in heap):
+                skips.append([t, self.ends[b] - t])
+                b += 1
+                continue
+
+            deferred = []
+            chosen = None
+            while heap:
+                entry = heapq.heappop(heap)
+                task = by_id[entry[2]]
+                rem = remaining[task["id"]]
+                room = self.ends[b] - t
+                if rem > room and room < opts.min_session:
+                    deferred.append(entry)  # only a short leftover of this block; a smaller task may fit
+                    continue
+                if task["load"] >= opts.hard_load:
+                    slack = self.capacity(task["deadline"]) - self.capacity(t) - rem
+                    hard_room = opts.max_hard_per_day - hard_used.get(day, 0.0)
+                    if slack > 0 and hard_room < min(opts.min_session, rem):
+                        deferred.append(entry)
+                        continue
+                    room = room if slack <= 0 else min(room, hard_room)
+                chosen = (entry, task, min(rem, opts.max_session, room))
+                break
+            for entry in deferred:
+                heapq.heappush(heap, entry)
+
+            if chosen is None:
+                # Nothing may run here: skip to the next day, or to the next block after a short leftover
+                next_b = b + 1
+                if any(by_id[e[2]]["load"] >= opts.hard_load for e in deferred):
+                    skips.append([t, math.inf])
+                    while next_b < len(self.starts) and self.days[next_b] == day:
+                        next_b += 1
+                else:
+                    skips.append([t, self.ends[b] - t])
+                b = next_b
+                continue
+
+            (key, _, task_id), task, minutes = chosen
+            heavy = task["load"] >= opts.hard_load
+            sessions.append([task_id, t, t + minutes, key, int(heavy), day])
+            remaining[task_id] -= minutes
+            if heavy:
+                hard_used[day] = hard_used.get(day, 0.0) + minutes
+            if remaining[task_id] > EPSILON:
+                heapq.heappush(heap, (self.key(task, remaining[task_id]), task["deadline"], task_id))
+            t += minutes + opts.break_minutes
+            if t >= self.ends[b]:
+                b += 1
+        return sessions, skips, t
+
+    def summary(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Response shape: sessions in order and per-task totals, finish times and lateness"""
+        scheduled: Dict[str, float] = {}
+        finish: Dict[str, float] = {}
+        for sid, start, end, _, _, _ in state["sessions"]:
+            scheduled[sid] = scheduled.get(sid, 0.0) + end - start
+            finish[sid] = end
+        titles = {t["id"]: t["title"] for t in state["tasks"]}
+        tasks = []
+        for task in sorted(state["tasks"], key=lambda t: (t["deadline"], t["id"])):
+            left = max(0.0, task["remaining"] - scheduled.get(task["id"], 0.0))
+            done_at = finish.get(task["id"])
+            on_time = left < 0.5 and (done_at is None or done_at <= task["deadline"])
+            tasks.append({
+                "taskId": task["id"],
+                "title": task["title"],
+                "deadline": format_time(task["deadline"]) if task["deadline"] != math.inf else None,
+                "scheduledMinutes": round(scheduled.get(task["id"], 0.0)),
+                "unscheduledMinutes": round(left),
+                "finishesAt": format_time(done_at) if done_at is not None else None,
+                "onTime": on_time,
+            })
+        return {
+            "sessions": [{"taskId": sid, "title": titles.get(sid, sid), "start": format_time(start),
+                          "end": format_time(end), "minutes": round(end - start), "heavy": bool(heavy)}
+                         for sid, start, end, _, heavy, _ in state["sessions"]],
+            "tasks": tasks,
+            "lateTasks": [t["taskId"] for t in tasks if not t["onTime"]],
+            "feasible": all(t["onTime"] for t in tasks),
+            "freeMinutes": round(self.prefix[-1] - sum(scheduled.values())),
+        }
+
+
+class PlanStore(SQLiteStore):
+    """Plans by id (inputs, options and the plan state), shared by all workers so any of
+    them can re-plan"""
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS plans ("
+        " id TEXT PRIMARY KEY, user_id TEXT, data TEXT NOT NULL, updated_at REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS plans_updated ON plans (updated_at)",
+    )
+
+    def __init__(self, path: str, retention: float = 30 * 24 * 3600):
+        super().__init__(path)
+        self.retention = retention
+
+    def get(self, plan_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection().execute("SELECT data FROM plans WHERE id = ?", (plan_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, plan_id: str, user_id: Optional[str], plan: Dict[str, Any]):
+        now = time.time()
+        data = json.dumps(plan)
+        with self._lock:
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO plans (id, user_id, data, updated_at) VALUES (?, ?, ?, ?)",
+                         (plan_id, user_id, data, now))
+            conn.execute("DELETE FROM plans WHERE updated_at < ?", (now - self.retention,))
+
+    def update(self, plan_id: str, change: Callable[[Dict[str, Any]], Any]) -> Optional[Tuple[Dict[str, Any], Any]]:
+        """Read, change (in place) and write a plan in one write transaction, so concurrent
+        re-plans in any worker apply one after the other instead of overwriting each other.
+        Returns (plan, whatever change returned), or None when there is no such plan; an
+        exception from change leaves the plan as it was."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT data FROM plans WHERE id = ?", (plan_id,)).fetchone()
+                if row is None:
+                    conn.execute("ROLLBACK")
+                    return None
+                plan = json.loads(row[0])
+                result = change(plan)
+                conn.execute("UPDATE plans SET data = ?, updated_at = ? WHERE id = ?",
+                             (json.dumps(plan), time.time(), plan_id))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return plan, result
@@ -0,0 +1,209 @@
+"""
+Ascendra - Response serialization
+JSON bodies are rendered with orjson when it is installed. Clients that send
+`Accept: application/msgpack` (the Node backend) get MessagePack: rendered directly by
+FastJSONResponse, or converted from a JSON body (a stored idempotent response, an error) on
+the way out. Bodies above a size threshold are compressed with brotli or gzip as
+Accept-Encoding allows. Streamed responses (NDJSON, server-sent events) pass through
+untouched so every event is still flushed at once.
+"""
+
+import asyncio
+import contextvars
+import functools
+import gzip
+import json
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the standard library encoder
+    orjson = None
+try:
+    import msgpack
+except ImportError:  # optional: msgpack requests are answered with JSON
+    msgpack = None
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+COMPRESSIBLE_TYPES = ("application/json", "application/msgpack", "text/")
+
+# Body format the current request asked for, set per request by EncodingMiddleware
+_wants_msgpack = contextvars.ContextVar("wants_msgpack", default=False)
+
+
+def render_json():
+    """Render JSON in the current context whatever the client asked for, for a response that
+    is kept and later served to other clients; EncodingMiddleware converts it per client"""
+    _wants_msgpack.set(False)
+
+
+def loads(body: bytes) -> Any:
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_line(content: Any) -> str:
+    """One NDJSON line"""
+    return dumps(content).decode("utf-8") + "\n"
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: orjson (or json) bytes, or MessagePack when negotiated"""
+
+    def render(self, content: Any) -> bytes:
+        if msgpack is not None and _wants_msgpack.get():
+            self.media_type = MSGPACK_TYPES[0]
+            return msgpack.packb(content, use_bin_type=True)
+        return dumps(content)
+
+
+class FastJSONRoute(APIRoute):
+    """Route class whose endpoints' plain dict/list results go straight to FastJSONResponse.
+    FastAPI otherwise walks every result with jsonable_encoder first, which costs far more
+    than rendering; results orjson cannot handle, and routes with a response_model, take
+    the usual path."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs):
+        response_model = kwargs.get("response_model")
+        if asyncio.iscoroutinefunction(endpoint) and (response_model is None or isinstance(response_model, DefaultPlaceholder)):
+            endpoint = self._direct(endpoint, kwargs.get("status_code") or 200)
+        super().__init__(path, endpoint, **kwargs)
+
+    @staticmethod
+    def _direct(endpoint: Callable[..., Any], status_code: int):
+        @functools.wraps(endpoint)  # FastAPI reads parameters and return annotation through __wrapped__
+        async def wrapper(*args, **kwargs):
+            result = await endpoint(*args, **kwargs)
+            if type(result) in (dict, list):
+                try:
+                    return FastJSONResponse(result, status_code=status_code)
+                except TypeError:
+                    pass
+            return result
+        return wrapper
+
+
+def _accepts(header: str, options: Iterable[str]) -> Optional[str]:
+    """First of options listed in an Accept / Accept-Encoding header with a non-zero q"""
+    accepted = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name.strip().lower()] = q
+    for option in options:
+        if accepted.get(option, 0) > 0:
+            return option
+    return None
+
+
+def _with_vary(headers, names: Tuple[str, ...]) -> List[Tuple[bytes, bytes]]:
+    """headers with `names` merged into its Vary header"""
+    listed, rest = [], []
+    for name, value in headers:
+        if name.lower() == b"vary":
+            listed += [v.strip() for v in value.decode("latin-1").split(",") if v.strip()]
+        else:
+            rest.append((name, value))
+    known = {v.lower() for v in listed}
+    listed += [n for n in names if n.lower() not in known]
+    return rest + [(b"vary", ", ".join(listed).encode("latin-1"))]
+
+
+class EncodingMiddleware:
+    """ASGI middleware negotiating MessagePack bodies and brotli/gzip compression. Every HTTP
+    response carries Vary: Accept, Accept-Encoding, negotiated or not, so shared caches never
+    hand one client's encoding to another."""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.vary = ("Accept", "Accept-Encoding") if msgpack is not None else ("Accept-Encoding",)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = {name: value.decode("latin-1") for name, value in scope.get("headers", [])}
+        wants_msgpack = msgpack is not None and _accepts(headers.get(b"accept", ""), MSGPACK_TYPES) is not None
+        token = _wants_msgpack.set(wants_msgpack)
+        encodings = ("br", "gzip") if brotli is not None else ("gzip",)
+        encoding = _accepts(headers.get(b"accept-encoding", ""), encodings)
+        try:
+            if encoding is None and not wants_msgpack:
+                await self.app(scope, receive, self._vary_send(send))
+            else:
+                await self.app(scope, receive, self._encoding_send(send, encoding, wants_msgpack))
+        finally:
+            _wants_msgpack.reset(token)
+
+    def _vary_send(self, send):
+        async def wrapped(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": _with_vary(message.get("headers", []), self.vary)}
+            await send(message)
+
+        return wrapped
+
+    def _encoding_send(self, send, encoding: Optional[str], wants_msgpack: bool):
+        start = None
+        passthrough = False
+
+        async def wrapped(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                # held until the first body chunk shows whether it streams
+                start = {**message, "headers": _with_vary(message.get("headers", []), self.vary)}
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            body = message.get("body", b"")
+            response_headers = {name.lower(): value for name, value in start["headers"]}
+            content_type = response_headers.get(b"content-type", b"").decode("latin-1")
+            if message.get("more_body") or b"content-encoding" in response_headers:
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            headers = start["headers"]
+            if wants_msgpack and content_type.startswith("application/json") and body:
+                body = msgpack.packb(loads(body), use_bin_type=True)
+                content_type = MSGPACK_TYPES[0]
+                headers = [(name, value) for name, value in headers if name.lower() not in (b"content-type", b"content-length")]
+                headers += [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())]
+            if encoding is None or len(body) < self.minimum_size or not content_type.startswith(COMPRESSIBLE_TYPES):
+                await send({**start, "headers": headers})
+                await send({"type": "http.response.body", "body": body})
+                return
+            if encoding == "br":
+                body = brotli.compress(body, quality=self.brotli_quality)
+            else:
+                body = gzip.compress(body, compresslevel=self.gzip_level)
+            headers = [(name, value) for name, value in headers if name.lower() != b"content-length"]
+            headers += [(b"content-encoding", encoding.encode()), (b"content-length", str(len(body)).encode())]
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        return wrapped
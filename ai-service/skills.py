@@ -0,0 +1,237 @@
+"""
+Ascendra - Skills taxonomy
+A bundled graph of skills (synonyms, prerequisites, learning hours) and an index of what each
+role requires, loaded once into integer-indexed tables. Skill gaps, gap percentages and a
+learning order that respects prerequisites are computed locally; only the micro-project
+ideas need the LLM.
+"""
+
+import heapq
+import json
+import math
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+IMPORTANCE_WEIGHTS = {"critical": 3, "important": 2, "nice": 1}
+IMPORTANCE_LABELS = {"critical": "🔴 Critical", "important": "🟡 Important", "nice": "🟢 Nice-to-have",
+                     "prerequisite": "⚪ Prerequisite"}
+NAMED_LEVELS = {"beginner": 25, "intermediate": 50, "advanced": 75, "expert": 95}
+
+
+def normalize(name: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w+#./ ]", " ", name.lower())).strip()
+
+
+def level_bucket(level: float) -> str:
+    """Coarse level used to key cached project ideas"""
+    return "beginner" if level < 35 else "intermediate" if level < 70 else "advanced"
+
+
+class SkillTaxonomy:
+    """Skills and roles from skills_taxonomy.json.
+
+    A skill a student lists implies its prerequisites at implied_ratio of its level
+    (someone at React 70 knows some JavaScript). Prerequisites of a skill to learn are
+    added to the path when below prerequisite_level.
+    """
+
+    def __init__(self, path: str, prerequisite_level: int = 50, implied_ratio: float = 0.8,
+                 hours_per_week: int = 10):
+        self.prerequisite_level = prerequisite_level
+        self.implied_ratio = implied_ratio
+        self.hours_per_week = hours_per_week
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        skills = data["skills"]
+        self.ids: List[str] = list(skills)
+        index = {skill_id: i for i, skill_id in enumerate(self.ids)}
+        self.names: List[str] = [skills[s]["name"] for s in self.ids]
+        self.hours: List[int] = [skills[s].get("hours", 20) for s in self.ids]
+        self.prerequisites: List[Tuple[int, ...]] = [tuple(index[p] for p in skills[s].get("prerequisites", ()))
+                                                     for s in self.ids]
+        self.aliases: Dict[str, int] = {}
+        for i, skill_id in enumerate(self.ids):
+            for alias in (skill_id, skills[skill_id]["name"], *skills[skill_id].get("aliases", ())):
+                self.aliases.setdefault(normalize(alias), i)
+        self.order = self._topological_order()
+
+        self.roles: Dict[str, Dict[str, Any]] = {}
+        self.role_aliases: Dict[str, str] = {}
+        for role_id, role in data["roles"].items():
+            requirements = tuple((index[s], IMPORTANCE_WEIGHTS[imp], imp, level)
+                                 for s, (imp, level) in role["skills"].items())
+            self.roles[role_id] = {"name": role["name"], "requirements": requirements}
+            for alias in (role_id, role["name"], *role.get("aliases", ())):
+                self.role_aliases.setdefault(normalize(alias), role_id)
+
+    def _topological_order(self) -> List[int]:
+        """Rank of each skill in a prerequisites-first order; raises on a cycle"""
+        dependents = [[] for _ in self.ids]
+        pending = [len(p) for p in self.prerequisites]
+        for i, prerequisites in enumerate(self.prerequisites):
+            for p in prerequisites:
+                dependents[p].append(i)
+        ready = [i for i, n in enumerate(pending) if n == 0]
+        rank = [0] * len(self.ids)
+        position = 0
+        while ready:
+            i = ready.pop()
+            rank[i] = position
+            position += 1
+            for d in dependents[i]:
+                pending[d] -= 1
+                if pending[d] == 0:
+                    ready.append(d)
+        if position != len(self.ids):
+            raise ValueError("skills taxonomy has a prerequisite cycle")
+        return rank
+
+    def resolve(self, name: str) -> Optional[int]:
+        key = normalize(name)
+        if key in self.aliases:
+            return self.aliases[key]
+        # "React.js developer" or "Python (pandas)": fall back to the longest known alias inside
+        words = f" {key} "
+        found = [(len(alias), i) for alias, i in self.aliases.items() if len(alias) > 2 and f" {alias} " in words]
+        return max(found)[1] if found else None
+
+    def match_role(self, target: str) -> Optional[str]:
+        key = normalize(target)
+        if key in self.role_aliases:
+            return self.role_aliases[key]
+        tokens = set(key.split())
+        best, best_score = None, 0.0
+        for alias, role_id in self.role_aliases.items():
+            alias_tokens = set(alias.split())
+            score = len(tokens & alias_tokens) / len(tokens | alias_tokens)
+            if alias_tokens <= tokens:
+                score = max(score, 0.5)  # "senior data analyst (remote)"
+            if score > best_score:
+                best, best_score = role_id, score
+        return best if best_score >= 0.5 else None
+
+    def levels(self, current_skills: List[Dict[str, Any]]) -> Tuple[Dict[int, float], List[str]]:
+        """Skill index -> level (0-100) with implied prerequisites, and names not in the taxonomy"""
+        levels: Dict[int, float] = {}
+        unknown = []
+        for entry in current_skills:
+            name = str(entry.get("name", "")).strip()
+            if not name:
+                continue
+            skill = self.resolve(name)
+            if skill is None:
+                unknown.append(name)
+                continue
+            level = entry.get("level", 0)
+            level = NAMED_LEVELS.get(level.lower(), 0) if isinstance(level, str) else float(level or 0)
+            levels[skill] = max(levels.get(skill, 0), min(100.0, level))
+        # Dependents rank after their prerequisites, so one pass from the top covers chains
+        for skill in sorted(levels, key=lambda i: -self.order[i]):
+            stack = [skill]
+            while stack:
+                s = stack.pop()
+                implied = levels[s] * self.implied_ratio
+                for p in self.prerequisites[s]:
+                    if levels.get(p, 0) < implied:
+                        levels[p] = implied
+                        stack.append(p)
+        return levels, unknown
+
+    def coverage(self, role_id: str, levels: Dict[int, float]) -> float:
+        requirements = self.roles[role_id]["requirements"]
+        total = sum(w for _, w, _, _ in requirements)
+        return sum(w * min(1.0, levels.get(s, 0) / target) for s, w, _, target in requirements) / total
+
+    def analyze(self, current_skills: List[Dict[str, Any]], target_role: str,
+                alternatives: int = 3) -> Optional[Dict[str, Any]]:
+        """Gap analysis for a role in the index; None when the role is not known"""
+        role_id = self.match_role(target_role)
+        if role_id is None:
+            return None
+        levels, unknown = self.levels(current_skills)
+        role = self.roles[role_id]
+
+        gaps = {}  # skill -> (weight, importance, current, target, gap fraction)
+        total_weight = weighted_gap = 0.0
+        for skill, weight, importance, target in role["requirements"]:
+            current = levels.get(skill, 0)
+            gap = max(0.0, target - current) / target
+            total_weight += weight
+            weighted_gap += weight * gap
+            if gap > 0:
+                gaps[skill] = (weight, importance, current, target, gap)
+
+        # Pull in prerequisites the student is still weak in, weighted like their heaviest dependent
+        stack = list(gaps)
+        while stack:
+            skill = stack.pop()
+            for p in self.prerequisites[skill]:
+                current = levels.get(p, 0)
+                if current >= self.prerequisite_level:
+                    continue
+                weight = gaps[skill][0]
+                if p not in gaps:
+                    gaps[p] = (weight, "prerequisite", current, self.prerequisite_level,
+                               (self.prerequisite_level - current) / self.prerequisite_level)
+                    stack.append(p)
+                elif gaps[p][0] < weight:
+                    gaps[p] = (weight, *gaps[p][1:])
+                    stack.append(p)
+
+        path = self._learning_order(gaps)
+        hours = {s: math.ceil(self.hours[s] * gaps[s][4]) for s in path}
+        total_hours = sum(hours.values())
+        weeks = max(1, math.ceil(total_hours / self.hours_per_week)) if total_hours else 0
+
+        skill_gaps = [
+            {"skill": self.names[s], "importance": gaps[s][1], "currentLevel": round(gaps[s][2]),
+             "requiredLevel": gaps[s][3], "gapPercent": round(100 * gaps[s][4]),
+             "status": "missing" if gaps[s][2] == 0 else "developing"}
+            for s in sorted((s for s in gaps if gaps[s][1] != "prerequisite"), key=lambda s: (-gaps[s][0], -gaps[s][4]))
+        ]
+        learning_path = [
+            {"skill": self.names[s], "importance": gaps[s][1], "hours": hours[s], "level": level_bucket(gaps[s][2]),
+             "prerequisites": [self.names[p] for p in self.prerequisites[s] if p in gaps]}
+            for s in path
+        ]
+        others = sorted(((self.coverage(r, levels), r) for r in self.roles if r != role_id), reverse=True)
+        gap_percent = round(100 * weighted_gap / total_weight) if total_weight else 0
+        return {
+            "role": role["name"],
+            "gapPercent": gap_percent,
+            "readiness": 100 - gap_percent,
+            "skillGaps": skill_gaps,
+            "missingSkills": [g["skill"] for g in skill_gaps],
+            "learningPath": learning_path,
+            "priorities": [f"{step['skill']} ({IMPORTANCE_LABELS[step['importance']]}, ~{step['hours']}h)"
+                           for step in learning_path],
+            "totalHours": total_hours,
+            "timeEstimate": (f"About {weeks} week{'s' if weeks != 1 else ''} (~{total_hours} hours at "
+                             f"{self.hours_per_week} h/week)" if total_hours else "You already meet this role's core skills"),
+            "alternativeRoles": [self.roles[r]["name"] for c, r in others[:alternatives] if c >= 0.3],
+            "alternativeRoleCoverage": [{"role": self.roles[r]["name"], "coveragePercent": round(100 * c)}
+                                        for c, r in others[:alternatives] if c >= 0.3],
+            "unrecognizedSkills": unknown,
+        }
+
+    def _learning_order(self, gaps: Dict[int, Tuple]) -> List[int]:
+        """Kahn's algorithm over the gap subgraph: prerequisites first, then heavier and
+        wider gaps first among the skills that are ready"""
+        pending = {s: sum(1 for p in self.prerequisites[s] if p in gaps) for s in gaps}
+        dependents: Dict[int, List[int]] = {s: [] for s in gaps}
+        for s in gaps:
+            for p in self.prerequisites[s]:
+                if p in gaps:
+                    dependents[p].append(s)
+        ready = [(-gaps[s][0], -gaps[s][4], self.order[s], s) for s, n in pending.items() if n == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            s = heapq.heappop(ready)[3]
+            order.append(s)
+            for d in dependents[s]:
+                pending[d] -= 1
+                if pending[d] == 0:
+                    heapq.heappush(ready, (-gaps[d][0], -gaps[d][4], self.order[d], d))
+        return order
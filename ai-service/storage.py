@@ -0,0 +1,35 @@
+"""
+Ascendra - Local SQLite storage
+Base class for the small on-disk stores shared by all uvicorn worker processes
+"""
+
+import os
+import sqlite3
+import threading
+
+
+class SQLiteStore:
+    """Lazily opened SQLite (WAL mode) connection that is safe across forks and threads.
+    Subclasses list their CREATE statements in SCHEMA."""
+
+    SCHEMA: tuple = ()
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork, so reopen when running in a new worker process
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
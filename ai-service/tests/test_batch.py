@@ -0,0 +1,98 @@
+import asyncio
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from batch import BatchKind, RateLimiter, current_limiter, run_batch
+
+
+class Item(BaseModel):
+    text: str
+
+
+def collect(kind, items, llm, **kwargs):
+    async def scenario():
+        return [record async for record in run_batch(kind, items, llm, **kwargs)]
+    return {record["id"]: record for record in asyncio.run(scenario())}
+
+
+def test_limiter_spaces_calls_after_the_burst():
+    limiter = RateLimiter(per_minute=600, burst=2)  # one token per 0.1s
+    waits = [limiter.reserve() for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert 0.09 <= waits[2] <= 0.11 and 0.19 <= waits[3] <= 0.21
+
+
+def test_unlimited_limiter_never_waits():
+    assert RateLimiter(0).reserve() == 0.0
+
+
+def test_provider_calls_see_the_batch_limiter():
+    limiter = RateLimiter(per_minute=6000)
+    seen = []
+
+    def provider_call():
+        seen.append(current_limiter.get())
+
+    async def run_one(request):
+        # endpoints fan out to threads; the limiter must follow
+        await asyncio.gather(asyncio.to_thread(provider_call), asyncio.to_thread(provider_call))
+        return {"success": True}
+
+    kind = BatchKind(Item, run_one)
+    collect(kind, [("1", {"text": "a"}), ("2", {"text": "b"})], llm=None, limiter=limiter)
+    assert seen == [limiter] * 4
+    assert current_limiter.get() is None
+
+
+def packed_kind(finish, calls: List[str]):
+    async def run_one(request):
+        calls.append(request.text)
+        return {"success": True, "answer": request.text.upper(), "via": "endpoint"}
+
+    return BatchKind(
+        Item, run_one,
+        pack_prompt=lambda items: "|".join(i.text for i in items),
+        unpack=lambda text, items: [{"success": True, "answer": part} for part in text.split("|")],
+        finish=finish,
+    )
+
+
+def test_packed_results_go_through_finish():
+    stored = []
+
+    async def finish(request, result):
+        stored.append(request.text)
+        return {**result, "stored": True}
+
+    async def llm(prompt, route):
+        return prompt.upper()
+
+    calls: List[str] = []
+    records = collect(packed_kind(finish, calls), [(str(i), {"text": t}) for i, t in enumerate("abc")], llm)
+    assert sorted(stored) == ["a", "b", "c"] and calls == []
+    assert all(r["packed"] and r["result"]["stored"] for r in records.values())
+
+
+def test_finish_returning_none_falls_back_to_the_endpoint():
+    async def finish(request, result) -> Optional[dict]:
+        return None if request.text == "b" else result
+
+    async def llm(prompt, route):
+        return prompt.upper()
+
+    calls: List[str] = []
+    records = collect(packed_kind(finish, calls), [(str(i), {"text": t}) for i, t in enumerate("abc")], llm)
+    assert calls == ["b"]
+    assert records["1"]["result"]["via"] == "endpoint" and not records["1"]["packed"]
+    assert records["0"]["packed"] and records["2"]["packed"]
+
+
+def test_failed_pack_runs_items_one_by_one():
+    async def llm(prompt, route):
+        raise RuntimeError("provider down")
+
+    calls: List[str] = []
+    records = collect(packed_kind(None, calls), [("1", {"text": "a"}), ("2", {"text": "b"})], llm)
+    assert sorted(calls) == ["a", "b"]
+    assert all(r["ok"] and not r["packed"] for r in records.values())
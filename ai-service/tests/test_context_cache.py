@@ -0,0 +1,95 @@
+import datetime
+import threading
+import time
+from types import SimpleNamespace
+
+from context_cache import DISPLAY_PREFIX, ContextCacheManager, prefix_hash
+
+PREFIX = "You are Ascendra's study coach. " * 200
+
+
+class FakeCaches:
+    def __init__(self, existing=(), delay=0.0):
+        self.live = {c.name: c for c in existing}
+        self.delay = delay
+        self.created, self.deleted = [], []
+        self._seq = 0
+
+    def create(self, model, config):
+        time.sleep(self.delay)
+        self._seq += 1
+        cache = SimpleNamespace(name=f"cachedContents/own-{self._seq}", display_name=config.display_name,
+                                model=f"models/{model}", expire_time=None)
+        self.live[cache.name] = cache
+        self.created.append(cache.name)
+        return cache
+
+    def update(self, name, config):
+        pass
+
+    def delete(self, name):
+        self.deleted.append(name)
+        self.live.pop(name, None)
+
+    def list(self):
+        return list(self.live.values())
+
+
+def manager(caches, **kwargs):
+    client = SimpleNamespace(caches=caches)
+    return ContextCacheManager(lambda: client, min_chars=100, **kwargs)
+
+
+def foreign(name, digest, model="gemini-2.5-flash"):
+    return SimpleNamespace(name=name, display_name=DISPLAY_PREFIX + digest, model=f"models/{model}",
+                           expire_time=datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1))
+
+
+def test_concurrent_callers_create_one_cache_without_waiting():
+    caches = FakeCaches(delay=0.2)
+    mgr = manager(caches)
+    names = []
+    first = threading.Thread(target=lambda: names.append(mgr.cached_name("gemini-2.5-flash", PREFIX)))
+    first.start()
+    time.sleep(0.05)
+    start = time.monotonic()
+    assert mgr.cached_name("gemini-2.5-flash", PREFIX) is None  # sent inline meanwhile
+    assert time.monotonic() - start < 0.1
+    assert mgr.metrics()["enabled"]  # the lock is free during the create call
+    first.join()
+    assert caches.created == names and mgr.cached_name("gemini-2.5-flash", PREFIX) == names[0]
+
+
+def test_sync_adopts_current_prefixes_and_never_deletes_foreign_caches():
+    current, stale = prefix_hash(PREFIX), prefix_hash("old prompt " * 50)
+    caches = FakeCaches([foreign("cachedContents/a", current), foreign("cachedContents/b", stale)])
+    mgr = manager(caches)
+    mgr.sync([PREFIX])
+    assert caches.deleted == []
+    assert mgr.cached_name("gemini-2.5-flash", PREFIX) == "cachedContents/a"
+
+
+def test_invalidate_deletes_only_caches_this_process_created():
+    caches = FakeCaches([foreign("cachedContents/a", prefix_hash(PREFIX))])
+    mgr = manager(caches)
+    mgr.sync([PREFIX])
+    own = mgr.cached_name("gemini-2.5-pro", PREFIX)
+    mgr.invalidate()
+    assert caches.deleted == [own]
+    assert mgr.metrics()["caches"] == []
+
+
+def test_failed_create_is_retried_later():
+    class Failing(FakeCaches):
+        def create(self, model, config):
+            raise RuntimeError("quota")
+
+    mgr = manager(Failing(), retry_after=600)
+    assert mgr.cached_name("gemini-2.5-flash", PREFIX) is None
+    assert mgr.metrics()["caches"][0]["name"] is None
+
+
+def test_short_prefixes_are_sent_inline():
+    caches = FakeCaches()
+    assert manager(caches).cached_name("gemini-2.5-flash", "short") is None
+    assert caches.created == []
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from fairness import ClassQuota, FairScheduler, RateLimitedError, client_key
+
+
+def scheduler(capacity=1, max_in_flight=10, **kwargs):
+    return FairScheduler(capacity, {"default": ClassQuota(max_in_flight=max_in_flight, cost=1)},
+                         queue_timeout=5, **kwargs)
+
+
+def test_backlogged_user_does_not_starve_others():
+    sched = scheduler()
+    order = []
+
+    async def request(user, name, hold):
+        async with sched.slot(user, "default"):
+            order.append(name)
+            await hold.wait()
+
+    async def scenario():
+        hold = asyncio.Event()
+        tasks = [asyncio.create_task(request("user:a", f"a{i}", hold)) for i in range(4)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(request("user:b", "b0", hold)))
+        await asyncio.sleep(0)
+        hold.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    # a0 took the only slot; b0 queued last but its finish tag (1) is ahead of a1..a3 (2..4)
+    assert order == ["a0", "b0", "a1", "a2", "a3"]
+
+
+def test_in_flight_quota_is_per_user():
+    sched = scheduler(capacity=4, max_in_flight=1)
+
+    async def scenario():
+        async with sched.slot("user:a", "default"):
+            async with sched.slot("user:b", "default"):
+                with pytest.raises(RateLimitedError):
+                    async with sched.slot("user:a", "default"):
+                        pass
+
+    asyncio.run(scenario())
+    assert sched.stats["rejected_in_flight"] == 1
+
+
+def test_anonymous_clients_use_their_own_quota():
+    sched = scheduler(capacity=8, max_in_flight=1,
+                      anonymous_quotas={"default": ClassQuota(max_in_flight=3, cost=1)})
+
+    async def hold(client, entered, release):
+        async with sched.slot(client, "default"):
+            entered.set()
+            await release.wait()
+
+    async def scenario():
+        release = asyncio.Event()
+        tasks = []
+        for _ in range(3):
+            entered = asyncio.Event()
+            tasks.append(asyncio.create_task(hold("ip:10.0.0.1", entered, release)))
+            await entered.wait()
+        with pytest.raises(RateLimitedError, match="per address"):
+            async with sched.slot("ip:10.0.0.1", "default"):
+                pass
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_is_rate_limited():
+    sched = FairScheduler(1, {"default": ClassQuota(max_in_flight=5)}, queue_timeout=0.01)
+
+    async def scenario():
+        async with sched.slot("user:a", "default"):
+            with pytest.raises(RateLimitedError):
+                async with sched.slot("user:b", "default"):
+                    pass
+
+    asyncio.run(scenario())
+    assert sched.metrics()["active"] == 0
+
+
+def test_idle_users_are_evicted():
+    sched = scheduler(idle_ttl=0)
+
+    async def scenario():
+        for user in ("user:a", "user:b", "user:c"):
+            async with sched.slot(user, "default"):
+                pass
+
+    asyncio.run(scenario())
+    assert sched.metrics()["users"] <= 1
+
+
+def test_user_claims_need_a_trusted_caller():
+    scope = {"headers": [(b"x-user-id", b"alice")], "client": ("10.0.0.1", 5000)}
+    assert client_key(scope, "bob", trusted=True) == "user:alice"
+    assert client_key({"client": ("10.0.0.1", 5000)}, "bob", trusted=True) == "user:bob"
+    assert client_key(scope, "bob") == "ip:10.0.0.1"
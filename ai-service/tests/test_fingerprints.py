@@ -0,0 +1,72 @@
+import random
+
+from fingerprints import FingerprintIndex, Winnower, covered
+
+WORDS = ("river delta sediment carbon policy market student library engine protein orbit ledger "
+         "harvest signal theorem village climate budget museum lattice").split()
+
+
+def essay(seed, n=120):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) + str(rng.randint(0, 99)) for _ in range(n))
+
+
+def test_shared_run_of_guaranteed_length_is_found():
+    winnower = Winnower(k=5, window=4)
+    shared = essay("shared", winnower.guarantee)
+    a = essay(1) + " " + shared + " " + essay(2)
+    b = essay(3) + " " + shared
+    assert {h for h, _, _ in winnower.fingerprints(a)} & {h for h, _, _ in winnower.fingerprints(b)}
+
+
+def test_fingerprints_carry_character_spans():
+    text = essay(4, 30)
+    for h, start, end in Winnower().fingerprints(text):
+        assert 0 <= start < end <= len(text)
+        assert len(text[start:end].split()) == 5
+
+
+def test_short_text_has_no_fingerprints():
+    assert Winnower(k=5).fingerprints("too short to hash") == []
+
+
+def test_copied_passage_matches_with_offsets(tmp_path):
+    index = FingerprintIndex(str(tmp_path / "fp.db"))
+    source = essay(5)
+    index.add("source", "alice", source)
+    copied = essay(6, 40) + " " + source[:400]
+    fingerprints = index.winnower.fingerprints(copied)
+    matches = index.matches(fingerprints, doc_key="copy", exclude_owner="bob")
+    assert [m["documentId"] for m in matches] == ["source"]
+    passage = matches[0]["passages"][0]
+    assert source[passage["sourceStart"]:passage["sourceEnd"]] in copied
+
+
+def test_resubmission_does_not_match_itself(tmp_path):
+    index = FingerprintIndex(str(tmp_path / "fp.db"))
+    text = essay(7)
+    index.add("doc-1", "alice", text)
+    fingerprints = index.winnower.fingerprints(text)
+    assert index.matches(fingerprints, doc_key="doc-1") == []
+    assert [m["documentId"] for m in index.matches(fingerprints)] == ["doc-1"]
+
+
+def test_own_earlier_work_is_excluded_by_owner(tmp_path):
+    index = FingerprintIndex(str(tmp_path / "fp.db"))
+    text = essay(8)
+    index.add("draft", "alice", text)
+    assert index.matches(index.winnower.fingerprints(text), doc_key="final", exclude_owner="alice") == []
+
+
+def test_boilerplate_hashes_are_ignored(tmp_path):
+    index = FingerprintIndex(str(tmp_path / "fp.db"), max_df=3)
+    boilerplate = essay("template", 40)
+    for i in range(5):
+        index.add(f"doc-{i}", f"user-{i}", boilerplate + " " + essay(100 + i))
+    fingerprints = index.winnower.fingerprints(boilerplate + " " + essay(200))
+    assert index.matches(fingerprints, doc_key="new") == []
+
+
+def test_covered_merges_overlapping_intervals():
+    assert covered([(0, 10), (5, 15), (20, 25)]) == 20
+    assert covered([]) == 0
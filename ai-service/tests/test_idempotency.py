@@ -0,0 +1,178 @@
+import asyncio
+import json
+
+from idempotency import IdempotencyMiddleware, IdempotencyStore
+
+
+class Endpoint:
+    """ASGI app answering with the next queued status, counting how often it ran"""
+
+    def __init__(self, *statuses, delay=0.0):
+        self.statuses = list(statuses)
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self, scope, receive, send):
+        await receive()
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        body = json.dumps({"call": self.calls}).encode()
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+
+def middleware(tmp_path, app, **kwargs):
+    store = IdempotencyStore(str(tmp_path / "idempotency.db"))
+    return IdempotencyMiddleware(app, store, applies=lambda path: True, poll_interval=0.01, **kwargs)
+
+
+async def post(mw, key="k1", body=b'{"userId": "u1", "topic": "graphs"}'):
+    scope = {"type": "http", "method": "POST", "path": "/api/generate", "client": ("127.0.0.1", 1),
+             "headers": [(b"idempotency-key", key.encode()), (b"content-type", b"application/json")]}
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    await mw(scope, receive, send)
+    headers = dict(sent[0]["headers"])
+    return sent[0]["status"], json.loads(sent[1]["body"]), headers.get(b"idempotent-replayed") == b"true"
+
+
+def test_success_is_replayed(tmp_path):
+    app = Endpoint(200)
+    mw = middleware(tmp_path, app)
+
+    async def scenario():
+        return await post(mw), await post(mw)
+
+    first, second = asyncio.run(scenario())
+    assert first == (200, {"call": 1}, False)
+    assert second == (200, {"call": 1}, True)
+    assert app.calls == 1
+
+
+def test_429_is_not_stored_so_retry_runs_again(tmp_path):
+    app = Endpoint(429, 200)
+    mw = middleware(tmp_path, app)
+
+    async def scenario():
+        return await post(mw), await post(mw), await post(mw)
+
+    rejected, retried, replayed = asyncio.run(scenario())
+    assert rejected == (429, {"call": 1}, False)
+    assert retried == (200, {"call": 2}, False)
+    assert replayed == (200, {"call": 2}, True)
+    assert app.calls == 2
+
+
+def test_timeouts_and_server_errors_are_not_stored(tmp_path):
+    app = Endpoint(408, 503, 200)
+    mw = middleware(tmp_path, app)
+
+    async def scenario():
+        return [await post(mw) for _ in range(3)]
+
+    statuses = [status for status, _, _ in asyncio.run(scenario())]
+    assert statuses == [408, 503, 200]
+
+
+def test_validation_error_is_stored(tmp_path):
+    app = Endpoint(422, 200)
+    mw = middleware(tmp_path, app)
+
+    async def scenario():
+        return await post(mw), await post(mw)
+
+    first, second = asyncio.run(scenario())
+    assert second == (422, {"call": 1}, True)
+
+
+def test_concurrent_retry_attaches_to_running_generation(tmp_path):
+    app = Endpoint(200, delay=0.05)
+    mw = middleware(tmp_path, app)
+
+    async def scenario():
+        return await asyncio.gather(post(mw), post(mw))
+
+    first, second = asyncio.run(scenario())
+    assert app.calls == 1
+    assert first[:2] == second[:2] == (200, {"call": 1})
+    assert second[2]
+
+
+def test_key_reused_with_different_body_conflicts(tmp_path):
+    mw = middleware(tmp_path, Endpoint(200))
+
+    async def scenario():
+        await post(mw)
+        return await post(mw, body=b'{"userId": "u1", "topic": "trees"}')
+
+    status, _, _ = asyncio.run(scenario())
+    assert status == 422
+
+
+def test_keys_are_scoped_per_user(tmp_path):
+    app = Endpoint(200)
+    mw = middleware(tmp_path, app, trusted=lambda scope: True)
+
+    async def scenario():
+        await post(mw, body=b'{"userId": "u1"}')
+        return await post(mw, body=b'{"userId": "u2"}')
+
+    assert asyncio.run(scenario()) == (200, {"call": 2}, False)
+
+
+def test_untrusted_user_ids_share_the_address_scope(tmp_path):
+    app = Endpoint(200)
+    mw = middleware(tmp_path, app)
+
+    async def scenario():
+        await post(mw, body=b'{"userId": "u1"}')
+        return await post(mw, body=b'{"userId": "u2"}')
+
+    assert asyncio.run(scenario())[0] == 422
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    store = IdempotencyStore(str(tmp_path / "idempotency.db"))
+    assert store.begin("k", "f", lease=0.0, ttl=60)[0] == "run"
+    assert store.begin("k", "f", lease=60, ttl=60)[0] == "run"
+    assert store.begin("k", "f", lease=60, ttl=60)[0] == "wait"
+    store.abandon("k")
+    assert store.begin("k", "f", lease=60, ttl=60)[0] == "run"
+
+
+def test_generation_outlives_the_callers_deadline(tmp_path):
+    app = Endpoint(200, delay=0.2)
+    mw = middleware(tmp_path, app)
+
+    async def scenario():
+        try:
+            await asyncio.wait_for(post(mw), 0.05)  # the client's deadline passes first
+        except asyncio.TimeoutError:
+            pass
+        return await post(mw)
+
+    assert asyncio.run(scenario()) == (200, {"call": 1}, True)
+    assert app.calls == 1
+
+
+def test_generation_timeout_bounds_a_detached_generation(tmp_path):
+    app = Endpoint(200, delay=0.2)
+    mw = middleware(tmp_path, app, generation_timeout=0.05)
+
+    async def scenario():
+        return await post(mw), await post(mw)
+
+    timed_out, retried = asyncio.run(scenario())
+    assert timed_out == (504, {"detail": "Generation timed out"}, False)
+    assert retried[0] == 504 and app.calls == 2  # not stored: the retry ran again
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from jobs import JobRunner, JobStore, QueueFullError
+
+
+def runner(tmp_path, handler):
+    job_runner = JobRunner(JobStore(str(tmp_path / "jobs.db")), workers=1, poll_interval=0.01)
+    job_runner.register("echo", handler)
+    return job_runner
+
+
+async def wait_for_status(store, job_id, *statuses):
+    while store.get(job_id)["status"] not in statuses:
+        await asyncio.sleep(0.01)
+
+
+def test_job_result_is_stored(tmp_path):
+    async def echo(payload):
+        return {"success": True, "topic": payload["topic"]}
+
+    job_runner = runner(tmp_path, echo)
+
+    async def scenario():
+        job_runner.start()
+        job_id = job_runner.store.submit("echo", {"topic": "graphs"}, max_queued=10)
+        job_runner.notify()
+        await asyncio.wait_for(wait_for_status(job_runner.store, job_id, "done"), 5)
+        await job_runner.stop()
+        return job_runner.store.get(job_id)
+
+    job = asyncio.run(scenario())
+    assert job["result"] == {"success": True, "topic": "graphs"} and job["attempts"] == 1
+
+
+def test_stop_requeues_and_stops_the_running_job(tmp_path):
+    steps = []
+
+    async def slow(payload):
+        for step in range(50):
+            steps.append(step)
+            await asyncio.sleep(0.01)
+        return {"success": True}
+
+    job_runner = runner(tmp_path, slow)
+
+    async def scenario():
+        job_runner.start()
+        job_id = job_runner.store.submit("echo", {}, max_queued=10)
+        job_runner.notify()
+        await asyncio.wait_for(wait_for_status(job_runner.store, job_id, "running"), 5)
+        await asyncio.sleep(0.05)
+        await job_runner.stop()
+        stopped_at = len(steps)
+        await asyncio.sleep(0.1)
+        return job_id, stopped_at
+
+    job_id, stopped_at = asyncio.run(scenario())
+    assert len(steps) == stopped_at < 50  # nothing keeps generating after stop()
+    job = job_runner.store.get(job_id)
+    assert job["status"] == "queued" and job["attempts"] == 0
+
+
+def test_per_client_cap_leaves_room_for_others(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    for _ in range(2):
+        store.submit("echo", {}, 10, client="ip:1.2.3.4", max_per_client=2)
+    with pytest.raises(QueueFullError):
+        store.submit("echo", {}, 10, client="ip:1.2.3.4", max_per_client=2)
+    store.submit("echo", {}, 10, client="user:b", max_per_client=2)
+
+    job = store.claim(lease=60)
+    store.finish(job["id"], result={})
+    store.submit("echo", {}, 10, client="ip:1.2.3.4", max_per_client=2)  # a finished job frees a place
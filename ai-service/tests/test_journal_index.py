@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+import journal_index
+from journal_index import JournalIndex
+
+EXAMS = [
+    "Stressed about my calculus exam tomorrow, studying derivatives all night",
+    "Another calculus exam next week and I keep failing the derivatives practice",
+    "Revising calculus derivatives again, the exam panic is back",
+]
+SLEEP = [
+    "Could not sleep again, insomnia keeps me awake until four",
+    "Tired all day because insomnia kept me awake, need better sleep",
+    "Slept badly, woke at three with insomnia and stayed awake",
+]
+
+
+def entries(texts, prefix):
+    return [{"entryId": f"{prefix}{i}", "text": text, "at": 1000.0 + i} for i, text in enumerate(texts)]
+
+
+@pytest.fixture(params=["numpy", "pure"])
+def index(request, tmp_path, monkeypatch):
+    if request.param == "pure":
+        monkeypatch.setattr(journal_index, "numpy", None)
+    elif journal_index.numpy is None:
+        pytest.skip("numpy not installed")
+    return JournalIndex(str(tmp_path / "journal.db"), str(tmp_path / "vectors"), dim=128)
+
+
+def test_add_skips_known_ids_and_short_entries(index):
+    assert index.add("u1", entries(EXAMS, "e")) == {"added": 3, "skipped": 0}
+    counts = index.add("u1", entries(EXAMS[:1], "e") + [{"entryId": "short", "text": "Mood logged: Happy"}])
+    assert counts == {"added": 0, "skipped": 2}
+
+
+def test_search_ranks_the_same_topic_first(index):
+    index.add("u1", entries(EXAMS, "e") + entries(SLEEP, "s"))
+    results = index.search("u1", text="worried about the calculus exam and derivatives", k=3)
+    assert [r["entryId"][0] for r in results] == ["e", "e", "e"]
+
+    by_entry = index.search("u1", entry_id="s0", k=2)
+    assert {r["entryId"] for r in by_entry} == {"s1", "s2"}
+    assert index.search("u1", entry_id="missing") is None
+
+
+def test_search_is_per_user(index):
+    index.add("u1", entries(EXAMS, "e"))
+    assert index.search("u2", text="calculus exam") == []
+
+
+def test_remove_hides_the_entry(index):
+    index.add("u1", entries(EXAMS, "e"))
+    assert index.remove("u1", "e1")
+    assert not index.remove("u1", "e1")
+    assert "e1" not in {r["entryId"] for r in index.search("u1", text="calculus exam derivatives", k=5)}
+    assert index.search("u1", entry_id="e1") is None
+
+
+def test_drop_deletes_the_vectors_file(index, tmp_path):
+    index.add("u1", entries(EXAMS, "e"))
+    assert os.listdir(tmp_path / "vectors")
+    assert index.drop("u1")
+    assert not os.listdir(tmp_path / "vectors")
+    assert index.search("u1", text="calculus exam") == []
+    assert not index.drop("u1")
+
+
+def test_themes_separate_topics(index):
+    index.add("u1", entries(EXAMS, "e") + entries(SLEEP, "s"))
+    result = index.themes("u1", max_clusters=2, min_size=2)
+    assert result["entries"] == 6
+    groups = sorted(sorted(e["entryId"][0] for e in theme["entries"]) for theme in result["themes"])
+    assert groups == [["e", "e", "e"], ["s", "s", "s"]]
+    labels = " ".join(theme["label"] for theme in result["themes"])
+    assert "calculus" in labels or "exam" in labels
+    assert index.themes("u1", max_clusters=2, min_size=2) == result  # seeded per user
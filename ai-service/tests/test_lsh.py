@@ -0,0 +1,83 @@
+from decks import DeckStore
+from lsh import MinHasher, NearDuplicates
+from storage import SQLiteStore
+
+
+def test_similarity_estimates_jaccard():
+    hasher = MinHasher(num_perm=128, bands=32)
+    a = hasher.signature("the quick brown fox jumps over the lazy dog")
+    b = hasher.signature("the quick brown fox jumps over the lazy cat")
+    c = hasher.signature("completely unrelated sentence about databases")
+    assert hasher.similarity(a, a) == 1.0
+    assert 0.5 <= hasher.similarity(a, b) < 1.0
+    assert hasher.similarity(a, c) < 0.2
+
+
+def test_signature_is_deterministic_and_packs():
+    hasher = MinHasher()
+    signature = hasher.signature("What is a binary search tree?")
+    assert signature == MinHasher().signature("what is a BINARY search tree")
+    assert hasher.unpack(hasher.pack(signature)) == signature
+    assert len(hasher.band_keys(signature)) == hasher.bands
+
+
+class Notes(SQLiteStore):
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS notes (id INTEGER PRIMARY KEY, folder TEXT, signature BLOB)",
+        "CREATE TABLE IF NOT EXISTS note_bands (folder TEXT, band TEXT, note_id INTEGER)",
+    )
+
+
+def test_near_duplicates_are_scoped_by_group(tmp_path):
+    store = Notes(str(tmp_path / "notes.db"))
+    duplicates = NearDuplicates("notes", "note_bands", "note_id", "folder")
+    conn = store._connection()
+
+    def add(folder, text):
+        signature, bands = duplicates.signature(text)
+        if duplicates.is_duplicate(conn, folder, signature, bands):
+            return False
+        cursor = conn.execute("INSERT INTO notes (folder, signature) VALUES (?, ?)",
+                              (folder, duplicates.hasher.pack(signature)))
+        duplicates.index(conn, folder, cursor.lastrowid, bands)
+        return True
+
+    assert add("bio", "Explain how photosynthesis converts light into chemical energy")
+    assert not add("bio", "Explain how photosynthesis converts light into chemical energy?")
+    assert add("bio", "Name the stages of cell division")
+    assert add("chem", "Explain how photosynthesis converts light into chemical energy")
+
+
+def test_deck_drops_paraphrased_cards(tmp_path):
+    decks = DeckStore(str(tmp_path / "decks.db"))
+    topic = decks.topic_key("  Binary Search-Trees!")
+    cards = [
+        {"question": "What is the time complexity of search in a balanced BST?", "answer": "O(log n)"},
+        {"question": "What is the time complexity of search in a balanced BST", "answer": "O(log n)"},
+        {"question": "What property do BST keys satisfy?", "answer": "left < node < right"},
+        {"question": "", "answer": "no question"},
+    ]
+    assert decks.add(topic, cards) == 2
+    assert decks.add(decks.topic_key("binary search trees"), cards[:1]) == 0
+    assert [card["answer"] for card in decks.slice(topic, 0, 10)] == ["O(log n)", "left < node < right"]
+
+
+def test_distinct_short_cards_survive(tmp_path):
+    decks = DeckStore(str(tmp_path / "decks.db"))
+    topic = decks.topic_key("data structures")
+    cards = [
+        {"question": "What is a stack?", "answer": "A last-in, first-out collection"},
+        {"question": "What is a queue?", "answer": "A first-in, first-out collection"},
+        {"question": "What is a heap?", "answer": "A tree where each parent orders before its children"},
+        {"question": "What is a binary tree?", "answer": "A tree where each node has at most two children"},
+        {"question": "What is a binary search tree?", "answer": "A binary tree with left keys < node < right keys"},
+        {"question": "What is a trie?", "answer": "A tree of characters used for prefix lookups"},
+    ]
+    assert decks.add(topic, cards) == 6
+    assert decks.add(topic, [{"question": "What is a stack", "answer": "A last-in first-out collection"}]) == 0
+
+
+def test_stopwords_are_not_shingled():
+    hasher = MinHasher()
+    assert hasher.shingles("What is a stack?") == {"stack"}
+    assert hasher.shingles("Who is it?") == {"who is", "is it"}  # nothing but stopwords: kept
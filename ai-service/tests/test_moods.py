@@ -0,0 +1,46 @@
+from moods import MoodSeriesStore, MoodStats, features
+
+
+def flags_for(scores, stats=None):
+    stats = stats or MoodStats()
+    state = stats.empty()
+    return state, [stats.update(state, score) for score in scores]
+
+
+def test_sustained_drop_is_one_change_point():
+    state, flags = flags_for([7, 7, 8, 7, 7, 8, 7, 7] + [4] * 8)
+    raised = [(i, f) for i, fs in enumerate(flags) for f in fs if f.startswith("change")]
+    assert len(raised) == 1 and raised[0][1] == "change-down"
+    assert 8 <= raised[0][0] <= 11  # found within a few check-ins of the shift
+    assert features(state)["lastChange"]["direction"] == "down"
+
+
+def test_noise_around_a_level_raises_no_change():
+    _, flags = flags_for([6, 7, 6, 7, 6, 7, 6, 7, 6, 7, 6, 7, 6, 7])
+    assert not any(f.startswith("change") for fs in flags for f in fs)
+
+
+def test_single_outlier_is_an_anomaly_not_a_change():
+    _, flags = flags_for([7, 7, 7, 7, 7, 7, 7, 1, 7, 7, 7])
+    assert "anomaly-low" in flags[7]
+    assert not any(f.startswith("change") for fs in flags for f in fs)
+
+
+def test_no_flags_during_warmup():
+    _, flags = flags_for([8, 8, 1, 1, 1])
+    assert flags == [[]] * 5
+
+
+def test_store_matches_replay_and_keeps_recent_points(tmp_path):
+    store = MoodSeriesStore(str(tmp_path / "moods.db"), keep_points=5)
+    scores = [7, 7, 8, 7, 7, 8, 7, 7, 4, 4, 4, 4]
+    for score in scores[:6]:
+        store.record("u1", [score])
+    store.record("u1", scores[6:])
+
+    stored = store.features("u1")
+    replayed = features(store.stats.replay(scores))
+    for key in ("count", "smoothed", "baseline", "volatility", "trend", "lastChange"):
+        assert stored[key] == replayed[key]
+    assert [p["score"] for p in store.points("u1")] == scores[-5:]
+    assert store.features("nobody") is None
@@ -0,0 +1,29 @@
+import pytest
+
+from providers import Cassette, CassetteMissError, CassetteProvider, Completion, LLMProvider
+
+
+class Echo(LLMProvider):
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, model, prompt, system_instruction=None, timeout=None):
+        self.calls += 1
+        return Completion(f"reply {self.calls}", prompt_tokens=12, completion_tokens=3)
+
+
+def test_cassette_records_then_replays_without_prompt_text(tmp_path):
+    path = tmp_path / "run.ndjson"
+    inner = Echo()
+    recording = CassetteProvider(Cassette(str(path)), inner, record=True)
+    first = recording.generate("m", "I failed my exam and feel awful")
+    assert not first.replayed
+    assert recording.generate("m", "I failed my exam and feel awful").replayed
+    assert inner.calls == 1
+    assert "exam" not in path.read_text()
+
+    replaying = CassetteProvider(Cassette(str(path)))
+    replayed = replaying.generate("other-model", "I failed my exam and feel awful")
+    assert (replayed.text, replayed.prompt_tokens, replayed.replayed) == ("reply 1", 12, True)
+    with pytest.raises(CassetteMissError):
+        replaying.generate("m", "a prompt never recorded")
@@ -0,0 +1,66 @@
+import time
+
+from question_bank import QuestionBank
+
+QUESTIONS = [
+    "Tell me about a time you disagreed with a teammate",
+    "How would you design a URL shortener",
+    "What is the difference between a process and a thread",
+    "Describe a project you are proud of and your role in it",
+    "How do you prioritise when every task is urgent",
+    "Explain how a hash map handles collisions",
+    "Why do you want to work at a startup",
+]
+
+
+def bank(tmp_path):
+    store = QuestionBank(str(tmp_path / "bank.db"))
+    combo = store.combo("Software Engineer", "entry", "behavioral")
+    store.add(combo, [{"question": q} for q in QUESTIONS])
+    return store, combo
+
+
+def test_sample_does_not_mark_questions_served(tmp_path):
+    store, combo = bank(tmp_path)
+    assert len(store.sample(combo, "u1", 5)) == 5
+    # Not shown (e.g. the bank was too thin and the caller generated instead): still unseen
+    assert len(store.sample(combo, "u1", 10)) == len(QUESTIONS)
+
+
+def test_served_questions_are_not_repeated(tmp_path):
+    store, combo = bank(tmp_path)
+    first = store.sample(combo, "u1", 5)
+    store.mark_served("u1", [qid for qid, _ in first])
+    rest = store.sample(combo, "u1", 10)
+    assert len(rest) == len(QUESTIONS) - 5
+    assert not {qid for qid, _ in first} & {qid for qid, _ in rest}
+    assert len(store.sample(combo, "u2", 10)) == len(QUESTIONS)
+
+
+def test_paraphrases_are_not_banked(tmp_path):
+    store, combo = bank(tmp_path)
+    added = store.add(combo, [{"question": "Tell me about a time you disagreed with your teammate"},
+                              {"question": "What motivates you to learn new programming languages"}])
+    assert len(added) == 1
+    assert store.count(combo) == len(QUESTIONS) + 1
+
+
+def test_near_template_questions_are_all_kept(tmp_path):
+    store = QuestionBank(str(tmp_path / "bank.db"))
+    combo = store.combo("Product Manager", "junior", "behavioral")
+    endings = ["you led a team", "you failed", "you resolved a conflict", "you missed a deadline",
+               "you changed someone's mind", "you received tough feedback", "you handled ambiguity"]
+    added = store.add(combo, [{"question": f"Tell me about a time {ending}.",
+                               "modelAnswer": "Use the STAR method: situation, task, action, result."}
+                              for ending in endings])
+    assert len(added) == len(endings)
+
+
+def test_old_servings_are_purged(tmp_path):
+    store, combo = bank(tmp_path)
+    store.served_retention = 60
+    store.mark_served("u1", [qid for qid, _ in store.sample(combo, "u1", 3)])
+    store.purge_served()
+    assert len(store.sample(combo, "u1", 10)) == len(QUESTIONS) - 3
+    store.purge_served(now=time.time() + 120)
+    assert len(store.sample(combo, "u1", 10)) == len(QUESTIONS)
@@ -0,0 +1,61 @@
+import json
+
+from router import ModelRouter
+
+POLICY = {
+    "defaultTier": "lite",
+    "tiers": {"lite": {"model": "flash-lite", "fallback": "standard"}, "standard": {"model": "default"}},
+    "health": {"window": 20, "minSamples": 5, "maxErrorRate": 0.3, "maxP95Ms": 1000, "probeIntervalS": 0},
+    "rules": [],
+}
+
+
+def router(tmp_path, **health):
+    path = tmp_path / "routing.json"
+    path.write_text(json.dumps({**POLICY, "health": {**POLICY["health"], **health}}))
+    return ModelRouter(str(path), default_model="flash")
+
+
+def fail(r, model, n):
+    for _ in range(n):
+        r.record("chat", model, "lite", 0.1, ok=False)
+
+
+def test_unhealthy_tier_falls_back(tmp_path):
+    r = router(tmp_path, probeIntervalS=3600)
+    assert r.choose("chat")["model"] == "flash-lite"
+    fail(r, "flash-lite", 10)
+    choice = r.choose("chat")
+    assert (choice["tier"], choice["model"], choice["rule"]) == ("standard", "flash", "default->fallback")
+
+
+def test_probe_that_succeeds_readmits_the_model(tmp_path):
+    r = router(tmp_path)
+    fail(r, "flash-lite", 10)
+    probe = r.choose("chat")
+    assert probe["model"] == "flash-lite" and probe["rule"].endswith("->probe")
+    r.record("chat", "flash-lite", "lite", 0.2, ok=True)
+    assert r.choose("chat")["rule"] == "default"
+    assert r.metrics()["models"]["flash-lite"]["healthy"]
+
+
+def test_failed_probe_keeps_the_fallback(tmp_path):
+    r = router(tmp_path)
+    fail(r, "flash-lite", 10)
+    assert r.choose("chat")["rule"].endswith("->probe")
+    fail(r, "flash-lite", 1)
+    assert not r.metrics()["models"]["flash-lite"]["healthy"]
+
+
+def test_one_probe_per_interval(tmp_path):
+    r = router(tmp_path, probeIntervalS=3600)
+    fail(r, "flash-lite", 10)
+    assert all(r.choose("chat")["model"] == "flash" for _ in range(20))
+
+
+def test_slow_probe_does_not_readmit(tmp_path):
+    r = router(tmp_path)
+    fail(r, "flash-lite", 10)
+    assert r.choose("chat")["rule"].endswith("->probe")
+    r.record("chat", "flash-lite", "lite", 5.0, ok=True)
+    assert not r.metrics()["models"]["flash-lite"]["healthy"]
@@ -0,0 +1,73 @@
+import json
+import threading
+
+from scheduler import PlanStore, TaskScheduler, normalize_task
+
+BLOCKS = [{"start": f"2026-10-{day:02d}T16:00:00Z", "end": f"2026-10-{day:02d}T20:00:00Z"} for day in range(19, 26)]
+
+
+def tasks():
+    return [normalize_task({"id": f"t{i}", "deadline": f"2026-10-{20 + i % 5:02d}T23:00:00Z",
+                            "estimatedHours": 1 + i % 3, "priority": ("low", "medium", "high")[i % 3],
+                            "cognitiveLoadScore": 3 + 2 * (i % 4)}) for i in range(12)]
+
+
+def round_trip(state):
+    return json.loads(json.dumps(state))
+
+
+def test_replan_matches_planning_from_scratch():
+    scheduler = TaskScheduler(BLOCKS)
+    state = round_trip(scheduler.plan(tasks()))
+    changed = normalize_task({"id": "t5", "deadline": "2026-10-19T19:00:00Z", "estimatedHours": 2, "priority": "urgent"})
+
+    replanned, kept = scheduler.replan(state, "t5", dict(changed))
+    fresh = scheduler.plan([t for t in tasks() if t["id"] != "t5"] + [dict(changed)])
+
+    assert kept < len(state["sessions"])
+    assert [s[:3] for s in replanned["sessions"]] == [s[:3] for s in fresh["sessions"]]
+
+
+def test_removing_a_task_frees_its_sessions():
+    scheduler = TaskScheduler(BLOCKS)
+    state = round_trip(scheduler.plan(tasks()))
+    replanned, _ = scheduler.replan(state, "t0", None)
+    assert "t0" not in {s[0] for s in replanned["sessions"]}
+    assert [s[:3] for s in replanned["sessions"]] == [s[:3] for s in scheduler.plan(tasks()[1:])["sessions"]]
+
+
+def test_concurrent_updates_keep_every_change(tmp_path):
+    store = PlanStore(str(tmp_path / "plans.db"))
+    scheduler = TaskScheduler(BLOCKS)
+    store.put("p1", "u1", {"state": round_trip(scheduler.plan(tasks()[:2]))})
+
+    def add(i):  # each with its own connection, like separate workers
+        def change(plan):
+            task = normalize_task({"id": f"new{i}", "deadline": "2026-10-24T23:00:00Z"})
+            plan["state"], _ = scheduler.replan(plan["state"], task["id"], task)
+        PlanStore(store.path).update("p1", change)
+
+    threads = [threading.Thread(target=add, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ids = {t["id"] for t in store.get("p1")["state"]["tasks"]}
+    assert ids == {"t0", "t1"} | {f"new{i}" for i in range(8)}
+
+
+def test_failed_change_leaves_the_plan_and_missing_plan_is_none(tmp_path):
+    store = PlanStore(str(tmp_path / "plans.db"))
+    store.put("p1", "u1", {"state": {"tasks": []}})
+
+    def fail(plan):
+        plan["state"] = None
+        raise ValueError("bad task")
+
+    try:
+        store.update("p1", fail)
+    except ValueError:
+        pass
+    assert store.get("p1") == {"state": {"tasks": []}}
+    assert store.update("missing", fail) is None
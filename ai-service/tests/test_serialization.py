@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import msgpack
+
+from idempotency import IdempotencyMiddleware, IdempotencyStore
+from serialization import EncodingMiddleware, FastJSONResponse
+
+
+class Endpoint:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, scope, receive, send):
+        await receive()
+        self.calls += 1
+        await FastJSONResponse({"call": self.calls, "topic": "graphs"})(scope, receive, send)
+
+
+def stack(tmp_path, app):
+    store = IdempotencyStore(str(tmp_path / "idempotency.db"))
+    idempotent = IdempotencyMiddleware(app, store, applies=lambda path: True, poll_interval=0.01)
+    return EncodingMiddleware(idempotent, minimum_size=1 << 20)
+
+
+async def post(asgi, accept=b"application/json", key=b"k1"):
+    scope = {"type": "http", "method": "POST", "path": "/api/generate", "client": ("127.0.0.1", 1),
+             "headers": [(b"idempotency-key", key), (b"accept", accept), (b"content-type", b"application/json")]}
+    messages = [{"type": "http.request", "body": b'{"userId": "u1"}', "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi(scope, receive, send)
+    headers = dict(sent[0]["headers"])
+    return headers[b"content-type"], sent[1]["body"]
+
+
+def test_replay_is_encoded_for_the_client_asking(tmp_path):
+    app = Endpoint()
+    asgi = stack(tmp_path, app)
+
+    async def scenario():
+        return await post(asgi, accept=b"application/msgpack"), await post(asgi)
+
+    (packed_type, packed), (json_type, body) = asyncio.run(scenario())
+    assert packed_type == b"application/msgpack"
+    assert msgpack.unpackb(packed) == {"call": 1, "topic": "graphs"}
+    assert json_type == b"application/json"
+    assert json.loads(body) == {"call": 1, "topic": "graphs"}
+    assert app.calls == 1
+
+
+def test_plain_requests_still_render_msgpack_directly(tmp_path):
+    asgi = stack(tmp_path, Endpoint())
+    content_type, body = asyncio.run(post(asgi, accept=b"application/msgpack", key=b""))
+    assert content_type == b"application/msgpack"
+    assert msgpack.unpackb(body) == {"call": 1, "topic": "graphs"}
+
+
+def test_every_response_varies_on_accept_and_encoding():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json"), (b"vary", b"Origin")]})
+        await send({"type": "http.response.body", "body": b'{"ok": true}'})
+
+    async def vary(accept):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept", accept)]}
+        await EncodingMiddleware(app)(scope, None, send)
+        return [value for name, value in sent[0]["headers"] if name == b"vary"]
+
+    assert asyncio.run(vary(b"application/json")) == [b"Origin, Accept, Accept-Encoding"]
+    assert asyncio.run(vary(b"application/msgpack")) == [b"Origin, Accept, Accept-Encoding"]
@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+
+from usage import UsageLedger, UsageRecord, window_bounds
+
+
+def call(user_id, cost, at=None):
+    return UsageRecord(at=time.time() if at is None else at, user_id=user_id, route="chat", model="m", tier="fast",
+                       provider="gemini", prompt_tokens=10, completion_tokens=5, cached_tokens=0, latency_ms=1.0,
+                       cost_usd=cost, ok=True)
+
+
+def test_spend_is_read_once_then_kept_in_memory(tmp_path):
+    ledger = UsageLedger(str(tmp_path / "usage.db"))
+    since, _ = window_bounds("day")
+    ledger.record(call("u1", 0.5))
+    ledger.flush()
+
+    assert ledger.cached_spent("u1", since) is None
+    assert ledger.spent("u1", since) == 0.5
+    ledger.record(call("u1", 0.25))
+    ledger.record(call("u2", 1.0))
+    ledger.record(call("u1", 9.0, at=since - 1))  # before the window
+    assert ledger.cached_spent("u1", since) == 0.75
+    assert ledger.cached_spent("u2", since) is None
+
+
+def test_refresh_interval_rereads_the_ledger(tmp_path):
+    ledger = UsageLedger(str(tmp_path / "usage.db"), refresh_interval=0.0)
+    since, _ = window_bounds("day")
+    ledger.record(call("u1", 0.5))
+    assert ledger.spent("u1", since) == 0.5  # pending records count before they are written
+    assert ledger.cached_spent("u1", since) is None
+    ledger.flush()
+    assert ledger.spent("u1", since) == 0.5
+
+
+def test_cache_drops_stale_users_when_full(tmp_path):
+    ledger = UsageLedger(str(tmp_path / "usage.db"), refresh_interval=60.0, max_cached_users=2)
+    since, _ = window_bounds("day")
+    ledger.spent("u1", since)
+    ledger.spent("u2", since)
+    ledger._spend["u1"][since][1] -= 120  # loaded two minutes ago
+    ledger.spent("u3", since)
+    assert set(ledger._spend) == {"u2", "u3"}
+
+
+def test_flush_during_spent_is_not_double_counted(tmp_path):
+    ledger = UsageLedger(str(tmp_path / "usage.db"), refresh_interval=0.0)
+    since, _ = window_bounds("day")
+    ledger.record(call("u1", 1.0))
+    lock, reader = ledger._lock, threading.get_ident()
+
+    class FlushFirst:
+        """Before the reader takes the ledger lock, another thread gets a chance to flush"""
+        def __enter__(self):
+            if threading.get_ident() == reader:
+                flusher = threading.Thread(target=ledger.flush)
+                flusher.start()
+                flusher.join(0.2)
+            return lock.__enter__()
+
+        def __exit__(self, *exc):
+            return lock.__exit__(*exc)
+
+    ledger._lock = FlushFirst()
+    assert ledger.spent("u1", since) == 1.0
+    ledger._lock = lock
+    ledger.flush()
+    assert ledger.spent("u1", since) == 1.0
+
+
+def test_pending_records_are_capped_while_the_ledger_is_unwritable(tmp_path):
+    ledger = UsageLedger(str(tmp_path / "usage.db"), max_pending=3)
+
+    class Broken:
+        def executemany(self, *args):
+            raise OSError("disk full")
+
+    ledger._connection = lambda: Broken()
+    for cost in range(5):
+        ledger.record(call("u1", float(cost)))
+    with pytest.raises(OSError):
+        ledger.flush()
+    assert [r.cost_usd for r in ledger._pending] == [2.0, 3.0, 4.0]
+    assert ledger.dropped == 2
+    ledger._pending.clear()  # nothing left for the exit-time flush
@@ -0,0 +1,202 @@
+"""
+Ascendra - Usage ledger
+Every LLM call (user, endpoint, model, tokens, latency, estimated cost) is appended to a
+local SQLite ledger. Records are buffered and written in batches by a background thread, and
+per-user spend for budget checks is kept in memory and re-read from the ledger every
+refresh_interval seconds, so neither the LLM call nor the budget check waits on the disk.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from dataclasses import astuple, dataclass, fields
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from storage import SQLiteStore
+
+
+@dataclass
+class UsageRecord:
+    at: float
+    user_id: Optional[str]
+    route: str
+    model: str
+    tier: str
+    provider: str
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+    latency_ms: float
+    cost_usd: float
+    ok: bool
+    request_id: Optional[str] = None
+
+
+_COLUMNS = tuple(f.name for f in fields(UsageRecord))
+
+GROUPS = {
+    "user": "user_id",
+    "route": "route",
+    "model": "model",
+    "tier": "tier",
+    "provider": "provider",
+    "day": "strftime('%Y-%m-%d', at, 'unixepoch')",
+}
+
+
+def window_bounds(window: str, now: Optional[float] = None) -> Tuple[float, float]:
+    """(start, end) in UTC of the hour / day / month containing now"""
+    now = time.time() if now is None else now
+    t = time.gmtime(now)
+    if window == "hour":
+        start = now - now % 3600
+        return start, start + 3600
+    if window == "month":
+        year, month = (t.tm_year + 1, 1) if t.tm_mon == 12 else (t.tm_year, t.tm_mon + 1)
+        return (datetime(t.tm_year, t.tm_mon, 1, tzinfo=timezone.utc).timestamp(),
+                datetime(year, month, 1, tzinfo=timezone.utc).timestamp())
+    start = now - now % 86400
+    return start, start + 86400
+
+
+class UsageLedger(SQLiteStore):
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS usage ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT, at REAL NOT NULL, user_id TEXT, route TEXT NOT NULL,"
+        " model TEXT NOT NULL, tier TEXT NOT NULL, provider TEXT NOT NULL, prompt_tokens INTEGER NOT NULL,"
+        " completion_tokens INTEGER NOT NULL, cached_tokens INTEGER NOT NULL, latency_ms REAL NOT NULL,"
+        " cost_usd REAL NOT NULL, ok INTEGER NOT NULL, request_id TEXT)",
+        "CREATE INDEX IF NOT EXISTS usage_user_at ON usage (user_id, at)",
+        "CREATE INDEX IF NOT EXISTS usage_route_at ON usage (route, at)",
+        "CREATE INDEX IF NOT EXISTS usage_at ON usage (at)",
+    )
+
+    def __init__(self, path: str, flush_interval: float = 1.0, refresh_interval: float = 30.0,
+                 max_cached_users: int = 10_000, max_pending: int = 100_000,
+                 logger: Optional[logging.Logger] = None):
+        super().__init__(path)
+        self.flush_interval = flush_interval
+        self.refresh_interval = refresh_interval
+        self.max_cached_users = max_cached_users
+        self.max_pending = max_pending  # while the ledger cannot be written, older records beyond this are dropped
+        self.logger = logger or logging.getLogger("ascendra.usage")
+        self.dropped = 0
+        self._pending: List[UsageRecord] = []
+        self._pending_lock = threading.Lock()
+        self._spend: Dict[str, Dict[float, List[float]]] = {}  # user -> since -> [usd, loaded at]
+        self._flusher_pid = None
+        atexit.register(self.flush)
+
+    def record(self, record: UsageRecord):
+        """Queue one call for the ledger; cheap enough for the LLM call path"""
+        with self._pending_lock:
+            self._pending.append(record)
+            for since, entry in self._spend.get(record.user_id, {}).items():
+                if record.at >= since:
+                    entry[0] += record.cost_usd
+            if self._flusher_pid != os.getpid():
+                self._flusher_pid = os.getpid()
+                threading.Thread(target=self._flush_loop, name="usage-ledger", daemon=True).start()
+
+    def _flush_loop(self):
+        failing = False
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+                failing = False
+            except Exception:
+                if not failing:  # once per outage; the records stay pending for the next flush
+                    self.logger.exception("Usage ledger write failed, keeping records pending")
+                failing = True
+
+    def flush(self):
+        # The batch moves from pending to the table under the ledger lock, so spent() never
+        # sees it in both places or in neither
+        with self._lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                self._connection().executemany(
+                    f"INSERT INTO usage ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                    [astuple(r) for r in batch],
+                )
+            except Exception:
+                with self._pending_lock:
+                    self._pending[:0] = batch
+                    excess = len(self._pending) - self.max_pending
+                    if excess > 0:
+                        del self._pending[:excess]
+                        self.dropped += excess
+                if excess > 0:
+                    self.logger.warning("Usage ledger unwritable, dropped %d oldest records", excess)
+                raise
+
+    def cached_spent(self, user_id: str, since: float) -> Optional[float]:
+        """spent() from memory, or None when it needs the ledger (never touches the disk)"""
+        with self._pending_lock:
+            entry = self._spend.get(user_id, {}).get(since)
+            if entry and time.time() - entry[1] < self.refresh_interval:
+                return entry[0]
+        return None
+
+    def spent(self, user_id: str, since: float) -> float:
+        """USD spent by user_id since `since`; from memory unless refresh_interval has passed"""
+        cached = self.cached_spent(user_id, since)
+        if cached is not None:
+            return cached
+        now = time.time()
+        with self._lock:  # no flush can move records between the two reads
+            with self._pending_lock:
+                pending = sum(r.cost_usd for r in self._pending if r.user_id == user_id and r.at >= since)
+            row = self._connection().execute(
+                "SELECT COALESCE(SUM(cost_usd), 0) FROM usage WHERE user_id = ? AND at >= ?", (user_id, since)
+            ).fetchone()
+        with self._pending_lock:
+            if user_id not in self._spend and len(self._spend) >= self.max_cached_users:
+                for user in list(self._spend):
+                    windows = self._spend[user]
+                    for start in [s for s, entry in windows.items() if now - entry[1] >= self.refresh_interval]:
+                        del windows[start]
+                    if not windows:
+                        del self._spend[user]
+            self._spend.setdefault(user_id, {})[since] = [row[0] + pending, now]
+        return row[0] + pending
+
+    def totals(self, user_id: Optional[str] = None, route: Optional[str] = None, since: Optional[float] = None,
+               until: Optional[float] = None, group_by: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        """Calls, tokens, latency and cost matching the filters, overall and per group"""
+        self.flush()
+        where, params = [], []
+        for clause, value in (("user_id = ?", user_id), ("route = ?", route), ("at >= ?", since), ("at < ?", until)):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        condition = f" WHERE {' AND '.join(where)}" if where else ""
+        aggregates = ("COUNT(*), COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0),"
+                      " COALESCE(SUM(cached_tokens), 0), COALESCE(SUM(cost_usd), 0), COALESCE(SUM(1 - ok), 0),"
+                      " COALESCE(AVG(latency_ms), 0)")
+        with self._lock:
+            conn = self._connection()
+            overall = _summary(conn.execute(f"SELECT {aggregates} FROM usage{condition}", params).fetchone())
+            groups = []
+            if group_by:
+                column = GROUPS[group_by]
+                rows = conn.execute(
+                    f"SELECT {column}, {aggregates} FROM usage{condition} GROUP BY 1 ORDER BY 6 DESC LIMIT ?",
+                    (*params, limit),
+                ).fetchall()
+                groups = [{group_by: row[0], **_summary(row[1:])} for row in rows]
+        return {"totals": overall, "groups": groups}
+
+
+def _summary(row) -> Dict[str, Any]:
+    calls, prompt_tokens, completion_tokens, cached_tokens, cost, errors, latency = row
+    return {"calls": calls, "promptTokens": prompt_tokens, "completionTokens": completion_tokens,
+            "cachedTokens": cached_tokens, "estimatedCostUsd": round(cost, 6), "errors": errors,
+            "avgLatencyMs": round(latency, 1)}
@@ -42,6 +42,11 @@ const conversationSchema = new mongoose.Schema(
     },
     messages: [messageSchema],
     summary: String,
+    // True once the AI service holds this conversation's history server-side
+    aiMemorySynced: {
+      type: Boolean,
+      default: false,
+    },
     tags: [String],
     isActive: {
       type: Boolean,
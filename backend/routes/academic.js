@@ -294,12 +294,13 @@ router.post('/ethics-check', protect, async (req, res) => {
     const AI_SERVICE_URL = process.env.AI_SERVICE_URL || 'http://localhost:8000';
     
     const response = await axios.post(`${AI_SERVICE_URL}/api/ethics-check`, {
-      text: content
-    }, { timeout: 30000 });
+      text: content,
+      userId: req.user._id.toString()
+    }, { timeout: 30000, headers: { 'X-Request-Timeout-Ms': '28000' } });
     
-    res.json({ success: true, review: response.data.review });
+    res.json({ success: true, review: response.data.review, overlap: response.data.overlap });
   } catch (error) {
-    console.error('Ethics check error:', error.message);
+    console.error('Ethics check error:', error.response?.status === 504 ? 'AI service deadline exceeded' : error.message);
     // Return fallback response if AI service is unavailable
     res.json({ 
       success: true, 
@@ -134,19 +134,32 @@ router.post('/message', protect, async (req, res) => {
         {
           message,
           userId: req.user._id.toString(),
-          conversationHistory: conversation.messages.slice(-10), // Last 10 messages for context
+          conversationId: conversation._id.toString(),
+          // The AI service keeps the history; only seed it with earlier messages the first time
+          conversationHistory: conversation.aiMemorySynced ? [] : conversation.messages.slice(-11, -1),
           userProfile: {
             name: req.user.name,
             profile: req.user.profile,
             wellness: req.user.wellness,
           },
         },
-        { timeout: 30000 }
+        // Let the AI service give up (and stop its LLM calls) just before we stop waiting;
+        // the service token lets it use the conversation memory it keeps for this user
+        {
+          timeout: 30000,
+          headers: { 'X-Request-Timeout-Ms': '28000', 'X-Service-Token': process.env.AI_SERVICE_TOKEN || '' },
+        }
       );
 
       aiResponse = response.data;
+      // Only stop resending history once the service has actually kept the conversation
+      conversation.aiMemorySynced = Boolean(aiResponse.memory);
     } catch (aiError) {
-      console.error('AI service error:', aiError.message);
+      if (aiError.response?.status === 504) {
+        console.error('AI service deadline exceeded for chat message');
+      } else {
+        console.error('AI service error:', aiError.message);
+      }
       // Fallback response
       aiResponse = {
         content: "I'm here to help you with your academic journey, mental wellness, career planning, finances, and social connections. What would you like to discuss?",
@@ -203,6 +216,14 @@ router.delete('/conversations/:id', protect, async (req, res) => {
       return res.status(404).json({ message: 'Conversation not found' });
     }
 
+    // Best effort: drop the AI service's server-side memory of this conversation
+    axios
+      .delete(
+        `${process.env.AI_SERVICE_URL || 'http://localhost:8000'}/api/chat/memory/${req.user._id}/${conversation._id}`,
+        { timeout: 5000, headers: { 'X-Service-Token': process.env.AI_SERVICE_TOKEN || '' } }
+      )
+      .catch((aiError) => console.error('AI memory cleanup error:', aiError.message));
+
     res.json({
       success: true,
       message: 'Conversation deleted',
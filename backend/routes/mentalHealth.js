@@ -1,10 +1,19 @@
 const express = require('express');
 const jwt = require('jsonwebtoken');
+const axios = require('axios');
 const User = require('../models/User');
 const MentalHealth = require('../models/MentalHealth');
 
 const router = express.Router();
 
+// The AI service serves a user's stored mood series only to callers holding the service token,
+// so mood analysis goes through here with the authenticated user's id rather than from the browser.
+const AI_SERVICE_URL = process.env.AI_SERVICE_URL || 'http://localhost:8000';
+const aiServiceHeaders = () => ({
+  'X-Request-Timeout-Ms': '28000',
+  'X-Service-Token': process.env.AI_SERVICE_TOKEN || '',
+});
+
 // Auth middleware
 const protect = async (req, res, next) => {
   try {
@@ -86,12 +95,72 @@ router.post('/mood', protect, async (req, res) => {
       'wellness.lastCheckIn': new Date(),
     });
 
+    // Keep the AI service's mood series current (history seeds it the first time).
+    // Awaited so a mood analysis requested right after logging sees this check-in.
+    try {
+      await axios.post(
+        `${AI_SERVICE_URL}/api/moods/${req.user._id}`,
+        { score, history: data.moodHistory.slice(-8, -1).map((m) => m.score) },
+        { timeout: 5000, headers: { 'X-Service-Token': process.env.AI_SERVICE_TOKEN || '' } }
+      );
+    } catch (aiError) {
+      console.error('AI mood series error:', aiError.message);
+    }
+
     res.json({ success: true, moodEntry: data.moodHistory[data.moodHistory.length - 1] });
   } catch (error) {
     res.status(500).json({ message: 'Server error' });
   }
 });
 
+// @route   POST /api/mental-health/analyze-mood
+// @desc    AI reflection on a mood note, against the user's stored mood trend
+router.post('/analyze-mood', protect, async (req, res) => {
+  try {
+    const { journalEntry } = req.body;
+    if (!journalEntry) {
+      return res.status(400).json({ message: 'Journal entry is required' });
+    }
+
+    const data = await MentalHealth.findOne({ user: req.user._id });
+    const response = await axios.post(`${AI_SERVICE_URL}/api/analyze-mood`, {
+      journalEntry,
+      recentMoods: (data?.moodHistory || []).slice(-8).map((m) => m.score),
+      userId: req.user._id.toString(),
+    }, { timeout: 30000, headers: aiServiceHeaders() });
+
+    res.json(response.data);
+  } catch (error) {
+    console.error('Analyze mood error:', error.response?.status === 504 ? 'AI service deadline exceeded' : error.message);
+    res.status(502).json({ success: false, message: 'AI service unavailable' });
+  }
+});
+
+// @route   POST /api/mental-health/wellness-insights
+// @desc    AI wellness analysis, against the user's stored mood trend
+router.post('/wellness-insights', protect, async (req, res) => {
+  try {
+    const { wellness } = req.body;
+    if (!wellness) {
+      return res.status(400).json({ message: 'Wellness data is required' });
+    }
+
+    const data = await MentalHealth.findOne({ user: req.user._id });
+    const recent = (data?.moodHistory || []).slice(-7);
+    const response = await axios.post(`${AI_SERVICE_URL}/api/wellness-insights`, {
+      wellness,
+      moodHistory: recent.map((m) => ({ score: m.score, date: m.timestamp })),
+      averageMood: recent.length ? Math.round((recent.reduce((s, m) => s + m.score, 0) / recent.length) * 10) / 10 : null,
+      userId: req.user._id.toString(),
+    }, { timeout: 30000, headers: aiServiceHeaders() });
+
+    res.json(response.data);
+  } catch (error) {
+    console.error('Wellness insights error:', error.response?.status === 504 ? 'AI service deadline exceeded' : error.message);
+    res.status(502).json({ success: false, message: 'AI service unavailable' });
+  }
+});
+
 // @route   POST /api/mental-health/intervention
 // @desc    Log an intervention
 router.post('/intervention', protect, async (req, res) => {
@@ -126,9 +195,69 @@ router.post('/journal', protect, async (req, res) => {
     // AI reflection would come from the AI service
     data.journalEntries.push({ content, aiReflection: '' });
     await data.save();
+    const entry = data.journalEntries[data.journalEntries.length - 1];
+
+    // Best effort: add the entry to the AI service's journal similarity index
+    axios
+      .post(
+        `${AI_SERVICE_URL}/api/journal/${req.user._id}/entries`,
+        { entries: [{ entryId: entry._id.toString(), text: content || '', at: entry.timestamp.getTime() / 1000 }] },
+        { timeout: 5000, headers: { 'X-Service-Token': process.env.AI_SERVICE_TOKEN || '' } }
+      )
+      .catch((aiError) => console.error('AI journal index error:', aiError.message));
+
+    res.json({ success: true, entry });
+  } catch (error) {
+    res.status(500).json({ message: 'Server error' });
+  }
+});
+
+// @route   DELETE /api/mental-health/journal/:id
+// @desc    Delete a journal entry
+router.delete('/journal/:id', protect, async (req, res) => {
+  try {
+    const data = await MentalHealth.findOne({ user: req.user._id });
+    const entry = data?.journalEntries.id(req.params.id);
+    if (!entry) {
+      return res.status(404).json({ message: 'Journal entry not found' });
+    }
+
+    entry.deleteOne();
+    await data.save();
+
+    // Best effort: drop it from the AI service's journal index (404 = never indexed)
+    axios
+      .delete(`${AI_SERVICE_URL}/api/journal/${req.user._id}/entries/${req.params.id}`, {
+        timeout: 5000,
+        headers: { 'X-Service-Token': process.env.AI_SERVICE_TOKEN || '' },
+      })
+      .catch((aiError) => {
+        if (aiError.response?.status !== 404) console.error('AI journal index error:', aiError.message);
+      });
+
+    res.json({ success: true, message: 'Journal entry deleted' });
+  } catch (error) {
+    console.error('Delete journal entry error:', error);
+    res.status(500).json({ message: 'Server error' });
+  }
+});
+
+// @route   DELETE /api/mental-health
+// @desc    Delete all of the user's mental health data, including the AI service's journal index
+router.delete('/', protect, async (req, res) => {
+  try {
+    await MentalHealth.deleteOne({ user: req.user._id });
+
+    axios
+      .delete(`${AI_SERVICE_URL}/api/journal/${req.user._id}`, {
+        timeout: 5000,
+        headers: { 'X-Service-Token': process.env.AI_SERVICE_TOKEN || '' },
+      })
+      .catch((aiError) => console.error('AI journal index error:', aiError.message));
 
-    res.json({ success: true, entry: data.journalEntries[data.journalEntries.length - 1] });
+    res.json({ success: true, message: 'Mental health data deleted' });
   } catch (error) {
+    console.error('Delete mental health data error:', error);
     res.status(500).json({ message: 'Server error' });
   }
 });
@@ -62,6 +62,8 @@ export const mentalHealthAPI = {
   logMood: (data) => api.post('/mental-health/mood', data),
   logIntervention: (data) => api.post('/mental-health/intervention', data),
   addJournal: (content) => api.post('/mental-health/journal', { content }),
+  deleteJournal: (id) => api.delete(`/mental-health/journal/${id}`),
+  deleteData: () => api.delete('/mental-health'),
   getInsights: () => api.get('/mental-health/insights'),
 }
 
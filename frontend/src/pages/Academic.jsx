@@ -23,6 +23,7 @@ export default function Academic() {
   const [aiTopic, setAiTopic] = useState('')
   const [aiGenerating, setAiGenerating] = useState(false)
   const [generatedFlashcards, setGeneratedFlashcards] = useState([]) // Preview before saving
+  const [deckOffsets, setDeckOffsets] = useState({}) // Cards already previewed per topic, so "generate" pages through the deck
 
   // Form states
   const [taskForm, setTaskForm] = useState({ title: '', subject: '', dueDate: '', priority: 'medium', status: 'pending' })
@@ -117,15 +118,18 @@ export default function Academic() {
     globalLoader.show('AI is generating flashcards...')
     
     try {
+      const deckKey = aiTopic.trim().toLowerCase()
+      const offset = deckOffsets[deckKey] || 0
       const response = await fetch(`${AI_SERVICE_URL}/api/generate-flashcards`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ topic: aiTopic, count: 5 })
+        body: JSON.stringify({ topic: aiTopic, count: 5, offset })
       })
       
       const result = await response.json()
       
       if (result.success && result.flashcards) {
+        setDeckOffsets(prev => ({ ...prev, [deckKey]: offset + result.flashcards.length }))
         // Show preview - user can save individually
         setGeneratedFlashcards(result.flashcards.map((fc, i) => ({ ...fc, subject: aiTopic, id: i })))
         toast.success(`Generated ${result.flashcards.length} flashcards! Click to save the ones you want.`)
@@ -231,7 +235,8 @@ export default function Academic() {
     try {
       const response = await fetch(`${AI_SERVICE_URL}/api/study-plan`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        // One key per click: a retried request reuses the plan already being generated
+        headers: { 'Content-Type': 'application/json', 'Idempotency-Key': crypto.randomUUID() },
         body: JSON.stringify({
           topic: studyTopic,
           duration: studyDuration,
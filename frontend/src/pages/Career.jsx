@@ -454,6 +454,18 @@ export default function Career() {
                 </div>
               ) : (
                 <div className="space-y-4">
+                  {typeof skillAnalysis.readiness === 'number' && (
+                    <div>
+                      <div className="flex justify-between text-sm text-slate-600 mb-1">
+                        <span>Role readiness{skillAnalysis.role ? ` (${skillAnalysis.role})` : ''}</span>
+                        <span>{skillAnalysis.readiness}%</span>
+                      </div>
+                      <div className="h-2 bg-slate-200 rounded-full overflow-hidden">
+                        <div className="h-full bg-green-500" style={{ width: `${skillAnalysis.readiness}%` }} />
+                      </div>
+                    </div>
+                  )}
+
                   {skillAnalysis.missingSkills && (
                     <div>
                       <h4 className="font-medium text-red-400 mb-2">Missing Skills:</h4>
@@ -482,7 +494,7 @@ export default function Career() {
                       <ul className="space-y-2">
                         {(Array.isArray(skillAnalysis.projects) ? skillAnalysis.projects : [skillAnalysis.projects]).map((proj, i) => (
                           <li key={i} className="flex items-start gap-2 text-slate-600">
-                            <span className="text-blue-500">→</span> {typeof proj === 'object' ? proj.name || JSON.stringify(proj) : proj}
+                            <span className="text-blue-500">→</span> {typeof proj === 'object' ? (proj.skill ? `${proj.skill}: ${proj.name}` : proj.name || JSON.stringify(proj)) : proj}
                           </li>
                         ))}
                       </ul>
@@ -410,7 +410,8 @@ export default function Finance() {
     }
     setGrantLoading(true)
     try {
-      const response = await fetch(`${AI_SERVICE_URL}/api/grant-writer`, {
+      // Sections arrive as NDJSON lines as soon as each one is written
+      const response = await fetch(`${AI_SERVICE_URL}/api/grant-writer/stream`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
@@ -420,9 +421,30 @@ export default function Finance() {
           requestedAmount: parseFloat(grantForm.requestedAmount) || 0
         })
       })
-      const result = await response.json()
-      if (result.success) {
-        setGrantResult(result.grant)
+      if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`)
+      setGrantResult({ title: grantForm.projectTitle })
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffered = ''
+      let succeeded = false
+      while (true) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffered += decoder.decode(value, { stream: true })
+        const lines = buffered.split('\n')
+        buffered = lines.pop()
+        for (const line of lines) {
+          if (!line.trim()) continue
+          const event = JSON.parse(line)
+          if (event.event === 'section') {
+            setGrantResult(prev => ({ ...prev, ...event.data }))
+          } else if (event.event === 'done') {
+            succeeded = event.success
+            setGrantResult(event.grant)
+          }
+        }
+      }
+      if (succeeded) {
         toast.success('Grant application generated!')
       } else {
         toast.error('Failed to generate grant')
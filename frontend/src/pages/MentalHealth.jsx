@@ -115,22 +115,13 @@ export default function MentalHealth() {
     setShowFeedback(true)
     
     try {
-      const recentMoods = moodLogs.slice(-7).map(m => m.score)
-      recentMoods.push(currentScore)
-      
       const journalEntry = note || `Mood logged: ${moodEmojis[currentScore - 1].displayLabel}`
       
-      const response = await fetch(`${AI_SERVICE_URL}/api/analyze-mood`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          journalEntry,
-          recentMoods
-        })
+      // The backend adds this user's mood history and stored trend
+      const { data: result } = await api.post('/mental-health/analyze-mood', { journalEntry }, {
+        headers: { Authorization: `Bearer ${token}` }
       })
       
-      const result = await response.json()
-      
       if (result.success) {
         // Parse the AI response
         let analysis = result.analysis
@@ -237,16 +228,9 @@ export default function MentalHealth() {
   const getWellnessInsights = async () => {
     setWellnessLoading(true)
     try {
-      const response = await fetch(`${AI_SERVICE_URL}/api/wellness-insights`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          wellness: wellnessData,
-          moodHistory: moodLogs.slice(-7).map(m => ({ score: m.score, date: m.timestamp })),
-          averageMood: getAverageMood()
-        })
+      const { data: result } = await api.post('/mental-health/wellness-insights', { wellness: wellnessData }, {
+        headers: { Authorization: `Bearer ${token}` }
       })
-      const result = await response.json()
       if (result.success) {
         setWellnessInsights(result.insights)
         toast.success('Wellness analysis complete!')